@@ -1,25 +1,43 @@
 # __init__.py
 
 import os
-import torch
-from typing import List, Dict, Tuple
+import importlib
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
 import json
 import re
 import pickle
 from dotenv import load_dotenv
+from backend.registry import ModelRegistry, GB
 
-# Third-party imports
-from pydub import AudioSegment
-from pyannote.audio import Pipeline
-from faster_whisper import WhisperModel
-from docx import Document
-from docx.shared import RGBColor, Pt
-from transformers import (
-    AutoModelForCausalLM,
-    AutoTokenizer,
-    pipeline as hf_pipeline,
-    BitsAndBytesConfig,
-)
+# Third-party imports are resolved on first access (see __getattr__ below),
+# so importing the package or a single stage does not pull in torch,
+# pyannote, faster-whisper, transformers or python-docx up front.
+_LAZY_EXPORTS = {
+    "torch": ("torch", None),
+    "AudioSegment": ("pydub", "AudioSegment"),
+    "Pipeline": ("pyannote.audio", "Pipeline"),
+    "WhisperModel": ("faster_whisper", "WhisperModel"),
+    "Document": ("docx", "Document"),
+    "RGBColor": ("docx.shared", "RGBColor"),
+    "Pt": ("docx.shared", "Pt"),
+    "AutoModelForCausalLM": ("transformers", "AutoModelForCausalLM"),
+    "AutoTokenizer": ("transformers", "AutoTokenizer"),
+    "hf_pipeline": ("transformers", "pipeline"),
+    "BitsAndBytesConfig": ("transformers", "BitsAndBytesConfig"),
+}
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module_name, attr = _LAZY_EXPORTS[name]
+        module = importlib.import_module(module_name)
+        value = module if attr is None else getattr(module, attr)
+        globals()[name] = value  # cache: later lookups skip __getattr__
+        return value
+    if name == "_device":
+        return _get_device()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Expose key classes and modules
 __all__ = [
@@ -38,10 +56,14 @@ __all__ = [
     "json",
     "re",
     "pickle",
-    "get_pyannote_pipeline",
-    "get_levantine_whisper",
-    "get_large_whisper",
-    "get_text_gen_pipeline",
+    "get_registry",
+    "use_model",
+    "use_device",
+    "current_device",
+    "PYANNOTE_MODEL_ID",
+    "LEVANTINE_WHISPER_ID",
+    "LARGE_WHISPER_ID",
+    "TEXT_GEN_MODEL_ID",
 ]
 
 load_dotenv()
@@ -50,61 +72,140 @@ load_dotenv()
 # Lazy initialization globals
 # --------------------------
 _HF_TOKEN = os.environ.get("HF_TOKEN")  # you can set your token in env vars
-_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-_compute_type = "float16"  # adjust if needed
+_device_cache = None
+
+def _get_device():
+    """torch.device for model placement, resolved (and torch imported) on first use."""
+    global _device_cache
+    if _device_cache is None:
+        import torch
+        _device_cache = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    return _device_cache
+
+PYANNOTE_MODEL_ID = "pyannote/speaker-diarization-3.1"
+LEVANTINE_WHISPER_ID = "HebArabNlpProject/WhisperLevantine"
+LARGE_WHISPER_ID = "large-v3"
+TEXT_GEN_MODEL_ID = "ALLaM-AI/ALLaM-7B-Instruct-preview"
 
-_pyannote_pipeline = None
-_levantine_whisper = None
-_large_whisper = None
-_text_gen_pipeline = None
+# Estimated resident size of each model, used for the registry's memory budget
+MODEL_SIZES_GB = {
+    "pyannote": 0.5,
+    "levantine_whisper": 3.2,
+    "large_whisper": 3.2,
+    "text_gen": 7.5,  # ALLaM-7B in 8-bit
+    "text_gen_tokenizer": 0.01,
+}
+_MODEL_BUDGET_GB = float(os.environ.get("AREN_MODEL_BUDGET_GB", "0"))  # 0 = unlimited
 
 # --------------------------
-# Lazy initialization funcs
+# Model factories
 # --------------------------
 
-def get_pyannote_pipeline():
-    """Return a globally loaded PyAnnote speaker diarization pipeline."""
-    global _pyannote_pipeline
-    if _pyannote_pipeline is None:
-        _pyannote_pipeline = Pipeline.from_pretrained(
-            "pyannote/speaker-diarization-3.1",
-            use_auth_token=_HF_TOKEN
-        )
-        _pyannote_pipeline.to(_device)
-    return _pyannote_pipeline
-
-def get_levantine_whisper():
-    """Return the Levantine Whisper model."""
-    global _levantine_whisper
-    if _levantine_whisper is None:
-        _levantine_whisper = WhisperModel(
-            "HebArabNlpProject/WhisperLevantine",
-            device=_device,
-            compute_type=_compute_type
-        )
-    return _levantine_whisper
-
-def get_large_whisper():
-    """Return the large-v3 Whisper model."""
-    global _large_whisper
-    if _large_whisper is None:
-        _large_whisper = WhisperModel("large-v3", device=_device)
-    return _large_whisper
-
-def get_text_gen_pipeline():
-    """Return the HuggingFace text-generation pipeline with ALLaM-7B-Instruct-preview model."""
-    global _text_gen_pipeline
-    if _text_gen_pipeline is None:
-        bnb_config = BitsAndBytesConfig(load_in_8bit=True)
-        tokenizer = AutoTokenizer.from_pretrained("ALLaM-AI/ALLaM-7B-Instruct-preview")
-        model = AutoModelForCausalLM.from_pretrained(
-            "ALLaM-AI/ALLaM-7B-Instruct-preview",
-            device_map="auto",
-            quantization_config=bnb_config
-        )
-        _text_gen_pipeline = hf_pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tokenizer
-        )
-    return _text_gen_pipeline
+def _torch_device(device: Optional[str] = None):
+    """torch.device for an explicit device string, or the default device."""
+    if device is None:
+        return _get_device()
+    import torch
+    return torch.device(device)
+
+def _whisper_device(device: Optional[str] = None) -> Dict:
+    """faster-whisper takes the device type and index separately."""
+    dev = _torch_device(device)
+    return {"device": dev.type, "device_index": dev.index or 0}
+
+def _load_pyannote_pipeline(device: Optional[str] = None):
+    from pyannote.audio import Pipeline
+    pipeline = Pipeline.from_pretrained(
+        PYANNOTE_MODEL_ID,
+        use_auth_token=_HF_TOKEN
+    )
+    pipeline.to(_torch_device(device))
+    return pipeline
+
+def _whisper_kwargs(name: str, device: Optional[str] = None) -> Dict:
+    """Device plus the compute type and CPU threads tuned for this host (see backend.autotune)."""
+    from backend.autotune import whisper_settings
+    kwargs = _whisper_device(device)
+    settings = whisper_settings(name, kwargs["device"])
+    kwargs.update(compute_type=settings.compute_type, cpu_threads=settings.cpu_threads)
+    return kwargs
+
+def _load_levantine_whisper(device: Optional[str] = None):
+    from faster_whisper import WhisperModel
+    return WhisperModel(LEVANTINE_WHISPER_ID, **_whisper_kwargs("levantine_whisper", device))
+
+def _load_large_whisper(device: Optional[str] = None):
+    from faster_whisper import WhisperModel
+    return WhisperModel(LARGE_WHISPER_ID, **_whisper_kwargs("large_whisper", device))
+
+def _load_text_gen_pipeline(device: Optional[str] = None):
+    from transformers import (
+        AutoModelForCausalLM,
+        AutoTokenizer,
+        pipeline as hf_pipeline,
+        BitsAndBytesConfig,
+    )
+    bnb_config = BitsAndBytesConfig(load_in_8bit=True)
+    tokenizer = AutoTokenizer.from_pretrained(TEXT_GEN_MODEL_ID)
+    model = AutoModelForCausalLM.from_pretrained(
+        TEXT_GEN_MODEL_ID,
+        device_map={"": device} if device else "auto",
+        quantization_config=bnb_config
+    )
+    return hf_pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer
+    )
+
+def _load_text_gen_tokenizer(device: Optional[str] = None):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(TEXT_GEN_MODEL_ID)
+
+# --------------------------
+# Model registry
+# --------------------------
+_FACTORIES = {
+    "pyannote": _load_pyannote_pipeline,
+    "levantine_whisper": _load_levantine_whisper,
+    "large_whisper": _load_large_whisper,
+    "text_gen": _load_text_gen_pipeline,
+    "text_gen_tokenizer": _load_text_gen_tokenizer,
+}
+_registry = ModelRegistry(budget_bytes=int(_MODEL_BUDGET_GB * GB))
+for _name, _factory in _FACTORIES.items():
+    _registry.register(_name, _factory, int(MODEL_SIZES_GB[_name] * GB))
+
+# Per-thread device override: pipeline stage workers bound to a device load their own copies
+_device_local = threading.local()
+
+@contextmanager
+def use_device(device: Optional[str]):
+    """Route ``use_model`` calls on this thread to copies of the models on device (None = default)."""
+    previous = current_device()
+    _device_local.device = device
+    try:
+        yield device
+    finally:
+        _device_local.device = previous
+
+def current_device() -> Optional[str]:
+    return getattr(_device_local, "device", None)
+
+def _model_name(name: str) -> str:
+    """Registry name of a model for the current thread's device ("large_whisper@cuda:1")."""
+    device = current_device()
+    if device is None:
+        return name
+    variant = f"{name}@{device}"
+    if variant not in _registry:
+        _registry.register_once(variant, lambda: _FACTORIES[name](device), int(MODEL_SIZES_GB[name] * GB))
+    return variant
+
+def get_registry() -> ModelRegistry:
+    """Return the process-wide model registry."""
+    return _registry
+
+def use_model(name: str):
+    """Lease a registered model for a block: ``with use_model("large_whisper") as model: ...``."""
+    return _registry.use(_model_name(name))
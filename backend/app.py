@@ -1,19 +1,61 @@
 # backend/app.py
 import os
+import json
+import asyncio
 import shutil
 import uuid
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import queue
+import zipfile
+import threading
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from docx import Document
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from starlette.requests import ClientDisconnect
 
 # Import your pipeline functions (assumes diarize.py etc. are in same folder)
-from diarize import diarize_audio
-from transcribe_en import transcribe_english
+from diarize import diarize_audio, diarize_fast, diarize_stream, DIARIZATION_MODES, WINDOW_SECONDS
+from transcribe_en import transcribe_en_turns
 from transcribe_ar import transcribe_arabic
-from translate_ar import translate_arabic
+from translate_ar import translate_ar, DOCX_FONT_SIZE_PT
+from backend.pcm import SAMPLE_RATE, get_cached_pcm, file_digest, probe_duration
+from backend.jobs import JobQueue, QueueFull, estimate_cost
+from backend.result_cache import get_result_cache
+from backend.journal import open_journal, journal_path, replay as replay_journal
+from backend.docx_render import preview_text
+from backend.turn_store import MEDIA_TYPES, get_transcript_store
+from backend.http_files import file_response
+from backend.uploads import OffsetMismatch, TooManyUploads, UploadBusy, get_upload_manager
+from backend.executor import PipelinedExecutor, Stage, parse_stage_map
+from backend.batch import run_stage_major
+from backend.live import LiveSession
+from backend.autotune import CALIBRATION_CLIP, autotune, load_tunings, tuning_report
+from backend.vad import VAD_CONFIG
+from backend.speakers import SPEAKER_EMBEDDING
+from backend.metrics import Trace, use_trace, current_trace, span, finish_job, get_metrics, language_path
+from backend import get_registry, use_device
 
 TMP_DIR = "/tmp/aren_transcriber"
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Output_Template.docx")
+JOB_WORKERS = int(os.environ.get("AREN_JOB_WORKERS", "1"))  # one per GPU is a good start
+MAX_QUEUED_JOBS = int(os.environ.get("AREN_MAX_QUEUED_JOBS", "100"))
+EVENT_POLL_SECONDS = 0.25
+# Recordings at least this long are diarized in windows, overlapping with transcription
+WINDOWED_DIARIZATION_SECONDS = float(os.environ.get("AREN_WINDOWED_DIARIZATION_SECONDS", "1800"))
+# Models to load at startup, e.g. "pyannote,levantine_whisper,text_gen"
+PREWARM_MODELS = [m.strip() for m in os.environ.get("AREN_PREWARM", "").split(",") if m.strip()]
+# Tune Whisper compute type, threads and beam size on startup when this host has no tuning yet
+AUTOTUNE_ON_STARTUP = os.environ.get("AREN_AUTOTUNE", "0").lower() in ("1", "true", "yes")
+# Default for the per-request pack_segments flag (short turns share one Whisper window)
+PACK_SEGMENTS_DEFAULT = os.environ.get("AREN_PACK_SEGMENTS", "0").lower() in ("1", "true", "yes")
+# Default for the per-request vad flag (cut silence inside segments before Whisper). Only pays off
+# together with pack_segments: per segment, a trimmed clip is still padded to a full 30 s window,
+# so without packing VAD saves little more than the fully silent segments it skips.
+VAD_DEFAULT = os.environ.get("AREN_VAD", "0").lower() in ("1", "true", "yes")
+# Default for the per-request diarization mode: "full" (pyannote) or "tiered" (skip it for easy audio)
+DIARIZATION_DEFAULT = os.environ.get("AREN_DIARIZATION_MODE", "full")
 os.makedirs(TMP_DIR, exist_ok=True)
 
 app = FastAPI(title="aren-transcriber Backend")
@@ -23,13 +65,823 @@ app.add_middleware(
     allow_origins=["*"],  # tighten to your frontend origin in production
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Upload-Offset", "ETag", "Content-Range"],
 )
 
-def extract_text_from_docx(path: str) -> str:
-    """Simple extractor for preview in frontend."""
-    doc = Document(path)
-    paragraphs = [p.text for p in doc.paragraphs if p.text and p.text.strip()]
-    return "\n".join(paragraphs)
+def _no_emit(event_type: str, **data):
+    pass
+
+def _prefetch(blocks: Iterator, depth: int = 2) -> Iterator:
+    """Run a generator in a background thread, buffering up to depth items ahead of the consumer."""
+    buf: queue.Queue = queue.Queue(maxsize=depth)
+    done = object()
+    trace = current_trace()  # spans recorded on the producer thread belong to the same job
+
+    def produce():
+        try:
+            with use_trace(trace):
+                for block in blocks:
+                    buf.put(block)
+            buf.put(done)
+        except BaseException as e:
+            buf.put(e)
+
+    threading.Thread(target=produce, name="diarize-prefetch", daemon=True).start()
+    while True:
+        item = buf.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+# --------------------------
+# Pipeline stages
+# --------------------------
+# Each stage works on a job context dict in place, so the same functions run back to
+# back (run_pipeline) or on per-stage workers and devices (PipelinedExecutor).
+def _stage_decode(ctx: Dict):
+    # Decode once; every stage reads the same cached PCM
+    ctx["emit"]("stage", stage="decode")
+    with span("decode"):
+        ctx["audio_hash"], ctx["pcm"] = get_cached_pcm(ctx["in_path"], digest=ctx["audio_hash"])
+    ctx["audio_seconds"] = len(ctx["pcm"]) / SAMPLE_RATE
+
+def _stage_diarize(ctx: Dict, stream: bool = True):
+    # Long recordings are diarized in windows; when streaming, transcription starts on the first window
+    ctx["emit"]("stage", stage="diarize")
+    kwargs = dict(moderator_first=ctx["moderator_first"], speakers=ctx["speakers"], audio_hash=ctx["audio_hash"])
+    if ctx["diarization"] == "tiered":
+        fast, ctx["diarization_report"] = diarize_fast(ctx["pcm"], **kwargs)
+        ctx["emit"]("diarization", **ctx["diarization_report"])
+        if fast is not None:
+            ctx["blocks"] = [fast]
+            return
+    windowed = ctx["audio_seconds"] >= WINDOWED_DIARIZATION_SECONDS
+    if windowed and stream:
+        ctx["blocks"] = _prefetch(diarize_stream(ctx["pcm"], **kwargs))
+        return
+    with span("diarize"):
+        diarized = diarize_audio(ctx["in_path"], pcm=ctx["pcm"], window_s=WINDOW_SECONDS if windowed else None,
+                                 **kwargs)
+    ctx["blocks"] = [diarized]
+
+def _stage_transcribe(ctx: Dict):
+    # Transcribe each block of segments as soon as it is diarized
+    emit = ctx["emit"]
+    transcribe = transcribe_en_turns if ctx["english"] else transcribe_arabic
+    segments, turns, rows = [], [], []
+    for block in ctx.pop("blocks"):
+        base = len(segments)
+        segments.extend(block)
+        emit("stage", stage="transcribe", segments=len(segments))
+
+        def on_segment(idx, seg, text, base=base):
+            # Segments finish in order, so the non-empty ones line up with the returned turns
+            if text:
+                rows.append({"speaker": seg["speaker"], "start": seg["start"], "end": seg["end"], "text": text})
+            emit("segment", index=base + idx, total=len(segments), speaker=seg["speaker"],
+                 start=seg["start"], end=seg["end"], text=text)
+
+        with span("transcribe", items=len(block)):
+            turns.extend(transcribe(ctx["in_path"], block, pcm=ctx["pcm"], on_segment=on_segment,
+                                    audio_hash=ctx["audio_hash"], journal=ctx["journal"], pack=ctx["pack"],
+                                    vad=VAD_CONFIG if ctx["vad"] else None))
+    ctx.pop("pcm")  # later stages only need the turns
+    ctx["turns"] = turns
+    ctx["rows"] = rows
+
+def _stage_translate(ctx: Dict):
+    if ctx["english"]:
+        return
+    ctx["emit"]("stage", stage="translate")
+
+    def on_chunk(idx, total, turns):
+        ctx["emit"]("chunk", index=idx, total=total, turns=[{"speaker": sp, "text": txt} for sp, txt in turns])
+
+    def on_translation(turn_idx, text):
+        row = ctx["rows"][turn_idx]
+        row["translation"] = f"{row.get('translation') or ''} {text}".strip()
+
+    with span("translate"):
+        ctx["turns"] = translate_ar(ctx["turns"], template_path=TEMPLATE_PATH, output_docx=None,
+                                    on_chunk=on_chunk, on_translation=on_translation,
+                                    resume_progress=True, journal=ctx["journal"])
+
+def _stage_render(ctx: Dict):
+    # Only the turn store is written here; exports are built when first downloaded
+    uid, turns = ctx["uid"], ctx["turns"]
+    with span("store", items=len(ctx["rows"])):
+        get_transcript_store().save(uid, ctx["rows"], language=language_path(ctx["language"]),
+                                    audio_hash=ctx["audio_hash"])
+    final_name = f"{uid}_transcript_en.docx" if ctx["english"] else f"{uid}_transcript_ar_en.docx"
+
+    # Preview text comes straight from the turns, no need to re-read the DOCX
+    ctx["result"] = {
+        "uid": uid,
+        "audio_hash": ctx["audio_hash"],
+        "text": preview_text(turns),
+        "docx_name": final_name,
+        "download_url": f"/jobs/{uid}/transcript.docx",
+        "exports": {fmt: f"/jobs/{uid}/transcript.{fmt}" for fmt in MEDIA_TYPES},
+    }
+    if "diarization_report" in ctx:
+        ctx["result"]["diarization"] = ctx["diarization_report"]
+
+PIPELINE_STAGES = [
+    ("decode", _stage_decode),
+    ("diarize", _stage_diarize),
+    ("transcribe", _stage_transcribe),
+    ("translate", _stage_translate),
+    ("render", _stage_render),
+]
+
+def _job_context(uid: str, in_path: str, language: str, moderator_first: bool, speakers: int,
+                 audio_hash: Optional[str], emit: Callable, pack: bool, vad: bool,
+                 diarization: str = "full") -> Dict:
+    """Open the job's journal and trace; close them with _close_context."""
+    journal = open_journal(uid)
+    if next(journal.replay("job"), None) is None:
+        journal.append("job", uid=uid, in_path=in_path, language=language, moderator_first=moderator_first,
+                       speakers=speakers, audio_hash=audio_hash, pack=pack, vad=vad, diarization=diarization)
+    return {
+        "uid": uid, "in_path": in_path, "language": language, "english": language.lower().startswith("en"),
+        "moderator_first": moderator_first, "speakers": speakers, "audio_hash": audio_hash,
+        "pack": pack, "vad": vad, "diarization": diarization, "emit": emit, "journal": journal,
+        "trace": Trace(uid, language_path(language)), "audio_seconds": 0.0,
+    }
+
+def _close_context(ctx: Dict) -> Dict:
+    """Close the job's journal and record its metrics; returns the timing summary."""
+    ctx["journal"].close()
+    state = "done" if "result" in ctx and not ctx.get("error") else "failed"
+    return finish_job(ctx["trace"], ctx["audio_seconds"], state)
+
+def run_pipeline(uid: str, in_path: str, language: str, moderator_first: bool, speakers: int,
+                 audio_hash: Optional[str] = None, emit: Callable = _no_emit, pack: bool = False,
+                 vad: bool = False, diarization: str = "full") -> Dict:
+    """
+    Run decode → diarize → transcribe (→ translate) → render for one stored upload.
+
+    Blocking; call from a worker thread, never from the event loop. Finished
+    segments and translated chunks are appended to the job's journal, so
+    running the same uid again resumes where an interrupted run stopped.
+
+    Args:
+        emit (Callable): Progress sink, called as emit(event_type, **data) for
+            stage changes, finished segments and translated chunks.
+        pack (bool): Transcribe short turns packed into ~30 s windows, split back by word timestamps.
+        vad (bool): Cut non-speech inside segments before Whisper (VAD_CONFIG thresholds).
+        diarization (str): "full" pyannote, or "tiered" to skip it for one speaker and clear two-speaker audio.
+
+    Returns:
+        Dict: Result metadata (preview text and download URL).
+    """
+    ctx = _job_context(uid, in_path, language, moderator_first, speakers, audio_hash, emit, pack, vad, diarization)
+    try:
+        with use_trace(ctx["trace"]):
+            for _, stage in PIPELINE_STAGES:
+                stage(ctx)
+    finally:
+        timings = _close_context(ctx)
+    return {**ctx["result"], "timings": timings}
+
+# --------------------------
+# Batches
+# --------------------------
+def _stage_model(stage: str, ctx: Dict) -> Optional[str]:
+    """Registry model a stage needs for a job, used to group batch work by model."""
+    if stage == "diarize":
+        # The tiered path needs no model for one speaker, nor for two with spectral embeddings
+        if ctx["diarization"] == "tiered" and (ctx["speakers"] == 1 or SPEAKER_EMBEDDING != "pyannote"):
+            return None
+        return "pyannote"
+    if stage == "transcribe":
+        return "large_whisper" if ctx["english"] else "levantine_whisper"
+    if stage == "translate" and not ctx["english"]:
+        return "text_gen"
+    return None
+
+def _batch_group_start(stage: str, model: Optional[str]):
+    # Under a memory budget, make room for this group's model before its first job needs it
+    if model is None:
+        return
+    registry = get_registry()
+    if registry.budget_bytes:
+        registry.evict_all_except([model])
+    registry.prewarm([model])
+
+def _model_loads() -> Dict[str, int]:
+    return {name: m["loads"] for name, m in get_registry().stats()["models"].items()}
+
+def run_batch(batch_id: str, items: List[Dict], emit: Callable = _no_emit) -> Dict:
+    """
+    Process a study's files stage by stage, keeping each model hot for its group.
+
+    All files are decoded, then all diarized, then transcribed (Levantine and
+    large-v3 jobs grouped), then translated, then stored; see
+    ``backend.batch.run_stage_major``. Each file is still an ordinary job
+    (journal, trace, turn store, exports under its own uid). Blocking; call
+    from a worker thread.
+
+    Args:
+        items (List[Dict]): Per-file job params as for run_pipeline, plus "file" (the upload name).
+        emit (Callable): Progress sink; events carry the file name and its job id.
+
+    Returns:
+        Dict: Manifest with per-file results and batch throughput; also saved with the transcripts.
+    """
+    contexts = []
+    for item in items:
+        params = {k: v for k, v in item.items() if k != "file"}
+        file_emit = partial(lambda name, uid, event_type, **data: emit(event_type, file=name, uid=uid, **data),
+                            item["file"], item["uid"])
+        ctx = _job_context(emit=file_emit, **{"pack": False, "vad": False, "audio_hash": None, **params})
+        ctx["file"] = item["file"]
+        contexts.append(ctx)
+
+    loads_before = _model_loads()
+    stages = [(name, partial(fn, stream=False) if name == "diarize" else fn) for name, fn in PIPELINE_STAGES]
+
+    def traced(ctx: Dict, fn: Callable[[Dict], None]):
+        with use_trace(ctx["trace"]):
+            fn(ctx)
+
+    try:
+        report = run_stage_major(contexts, stages, _stage_model, before_group=_batch_group_start, around=traced)
+    finally:
+        timings = [_close_context(ctx) for ctx in contexts]
+    loads_after = _model_loads()
+
+    files = []
+    for ctx, timing in zip(contexts, timings):
+        entry = {"file": ctx["file"], "job_id": ctx["uid"], "language": language_path(ctx["language"]),
+                 "state": "failed" if ctx.get("error") else "done", "error": ctx.get("error"),
+                 "audio_seconds": round(ctx["audio_seconds"], 3), "timings": timing}
+        if not ctx.get("error"):
+            entry.update(turns=len(ctx["rows"]), download_url=ctx["result"]["download_url"],
+                         exports=ctx["result"]["exports"])
+        files.append(entry)
+
+    wall = report["wall_seconds"]
+    audio = sum(ctx["audio_seconds"] for ctx in contexts if not ctx.get("error"))
+    manifest = {
+        "batch_id": batch_id,
+        "files": files,
+        "throughput": {
+            "files": len(files),
+            "succeeded": sum(f["state"] == "done" for f in files),
+            "audio_seconds": round(audio, 3),
+            "wall_seconds": wall,
+            "files_per_hour": round(len(files) / wall * 3600, 2) if wall else None,
+            "x_realtime": round(audio / wall, 2) if wall else None,
+            "stages": report["stages"],
+            "groups": report["groups"],
+            "model_loads": {name: n - loads_before.get(name, 0) for name, n in loads_after.items()
+                            if n - loads_before.get(name, 0)},
+        },
+        "outputs_url": f"/batches/{batch_id}/outputs.zip",
+    }
+    get_transcript_store().save_manifest(batch_id, manifest)
+    t = manifest["throughput"]
+    print(f"📦 Batch {batch_id}: {t['succeeded']}/{t['files']} files, {audio:.0f}s of audio in {wall:.1f}s "
+          f"({t['x_realtime']}x real time)")
+    return manifest
+
+def store_upload(file: UploadFile) -> Tuple[str, str]:
+    """Copy an upload into TMP_DIR under a fresh uid."""
+    uid = str(uuid.uuid4())[:8]
+    in_path = os.path.join(TMP_DIR, f"{uid}_{os.path.basename(file.filename or 'audio')}")
+    with open(in_path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+    return uid, in_path
+
+def remove_stored(paths: List[str]):
+    """Delete uploads that will not be processed after all."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def store_batch_uploads(files: List[UploadFile]) -> List[Tuple[str, str]]:
+    """Store a batch's uploads; .zip archives are unpacked into their audio files. Returns (name, path) pairs."""
+    stored, path = [], None
+    try:
+        for file in files:
+            uid, path = store_upload(file)
+            if not path.lower().endswith(".zip"):
+                stored.append((os.path.basename(file.filename or "audio"), path))
+                continue
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    name = os.path.basename(info.filename)
+                    if info.is_dir() or not name or name.startswith(".") or "__MACOSX" in info.filename:
+                        continue
+                    member_path = os.path.join(TMP_DIR, f"{uid}_{len(stored)}_{name}")
+                    stored.append((name, member_path))
+                    with archive.open(info) as src, open(member_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+            os.remove(path)
+    except BaseException as e:
+        remove_stored([p for _, p in stored] + ([path] if path else []))
+        if isinstance(e, zipfile.BadZipFile):
+            raise HTTPException(status_code=400, detail=f"Not a valid .zip archive: {e}")
+        raise
+    return stored
+
+def check_language(language: str):
+    if not language.lower().startswith(("en", "ar")):
+        raise HTTPException(status_code=400, detail="Unsupported language")
+
+def check_diarization(mode: str):
+    if mode not in DIARIZATION_MODES:
+        raise HTTPException(status_code=400, detail=f"diarization must be one of {', '.join(DIARIZATION_MODES)}")
+
+# --------------------------
+# Job queue
+# --------------------------
+def _run_job(job) -> Dict:
+    if "items" in job.params:
+        return run_batch(**job.params, emit=job.emit)
+    return run_pipeline(**job.params, emit=job.emit)
+
+# Pipelined mode: every stage gets its own workers (and devices), so jobs overlap across
+# stages, e.g. AREN_STAGE_DEVICES="diarize=cuda:0;transcribe=cuda:1,cuda:2;translate=cuda:3"
+PIPELINED = os.environ.get("AREN_PIPELINED", "0").lower() in ("1", "true", "yes")
+STAGE_DEVICES = parse_stage_map(os.environ.get("AREN_STAGE_DEVICES", ""))
+STAGE_WORKERS = {k: int(v[0]) for k, v in parse_stage_map(os.environ.get("AREN_STAGE_WORKERS", "")).items() if v}
+
+def _traced(fn: Callable[[Dict], None]) -> Callable[[Dict], None]:
+    def run(ctx: Dict):
+        with use_trace(ctx["trace"]):
+            fn(ctx)
+    return run
+
+def _build_executor() -> PipelinedExecutor:
+    stages = [
+        Stage(name, _traced(partial(fn, stream=False) if name == "diarize" else fn),
+              workers=max(STAGE_WORKERS.get(name, 1), len(STAGE_DEVICES.get(name, []))),
+              devices=STAGE_DEVICES.get(name, []))
+        for name, fn in PIPELINE_STAGES
+    ]
+    return PipelinedExecutor(stages, on_done=lambda ctx: ctx["done"].set(), device_context=use_device)
+
+executor = _build_executor() if PIPELINED else None
+
+def _run_job_pipelined(job) -> Dict:
+    if "items" in job.params:  # batches are already grouped by stage; they bypass the stage workers
+        return run_batch(**job.params, emit=job.emit)
+    ctx = _job_context(emit=job.emit, **{"pack": False, "vad": False, "audio_hash": None, **job.params})
+    ctx["done"] = threading.Event()
+    executor.submit(ctx)
+    ctx["done"].wait()
+    timings = _close_context(ctx)
+    if ctx.get("error"):
+        raise RuntimeError(ctx["error"])
+    return {**ctx["result"], "timings": timings}
+
+if PIPELINED:
+    # Enough job workers to keep every stage busy; admission stays cost-ordered
+    job_queue = JobQueue(_run_job_pipelined, workers=int(os.environ.get("AREN_JOB_WORKERS", executor.capacity())),
+                         max_queued=MAX_QUEUED_JOBS)
+else:
+    job_queue = JobQueue(_run_job, workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS)
+
+def _model_gauge(field: str):
+    def read():
+        models = get_registry().stats()["models"]
+        return {(("model", name),): float(m[field]) for name, m in models.items()}
+    return read
+
+get_metrics().gauge("aren_queue_depth", "Jobs waiting for a worker.", lambda: {(): job_queue.depth()})
+get_metrics().gauge("aren_jobs_running", "Jobs currently being processed.", lambda: {(): job_queue.running()})
+get_metrics().gauge("aren_model_load_seconds", "Total time spent loading each model.", _model_gauge("load_seconds"))
+get_metrics().gauge("aren_model_loads", "Times each model has been loaded.", _model_gauge("loads"))
+get_metrics().gauge("aren_model_loaded", "1 if the model is resident.", _model_gauge("loaded"))
+get_metrics().gauge("aren_model_resident_bytes", "Estimated memory held by resident models.",
+                    lambda: {(): get_registry().resident_bytes()})
+
+@app.on_event("startup")
+def start_job_queue():
+    if executor is not None:
+        executor.start()
+    job_queue.start()
+
+@app.on_event("startup")
+def prewarm_models():
+    # Load in the background so the API is up immediately; first jobs wait on the registry
+    if PREWARM_MODELS:
+        threading.Thread(target=get_registry().prewarm, args=(PREWARM_MODELS,),
+                         name="model-prewarm", daemon=True).start()
+
+_autotune_lock = threading.Lock()
+_autotune_state: Dict = {"running": False, "error": None}
+
+def _run_autotune(clip_path: str, models: Optional[List[str]] = None, uploaded: bool = False):
+    """Tune in the background; an uploaded clip is deleted afterwards, AREN_CALIBRATION_CLIP is kept."""
+    if not _autotune_lock.acquire(blocking=False):
+        if uploaded:
+            remove_stored([clip_path])
+        return
+    _autotune_state.update(running=True, error=None)
+    try:
+        autotune(clip_path, models)
+    except Exception as e:
+        _autotune_state["error"] = str(e)
+        print(f"❌ Whisper auto-tuning failed: {e}")
+    finally:
+        _autotune_state["running"] = False
+        _autotune_lock.release()
+        if uploaded:
+            remove_stored([clip_path])
+
+@app.on_event("startup")
+def autotune_models():
+    if AUTOTUNE_ON_STARTUP and CALIBRATION_CLIP and tuning_report()["host"] not in load_tunings():
+        threading.Thread(target=_run_autotune, args=(CALIBRATION_CLIP,), name="whisper-autotune",
+                         daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_job_queue():
+    job_queue.shutdown(wait=False)
+    if executor is not None:
+        executor.shutdown()
+
+def get_job_or_404(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return job
+
+@app.post("/jobs")
+async def submit_job(
+    file: UploadFile = File(...),
+    language: str = Form(...),              # 'english' or 'arabic'
+    moderator_first: bool = Form(False),
+    speakers: int = Form(1),
+    pack_segments: bool = Form(PACK_SEGMENTS_DEFAULT),  # short turns share one Whisper window
+    vad: bool = Form(VAD_DEFAULT),                      # cut silence first; pays off with pack_segments only
+    diarization: str = Form(DIARIZATION_DEFAULT),   # 'full' or 'tiered'
+):
+    """
+    Queue a recording for transcription (and translation, for Arabic).
+
+    vad cuts silence inside each diarized turn before Whisper. It only saves
+    compute together with pack_segments: Whisper pads every input to 30 s,
+    so without packing a trimmed turn costs as much as the full one.
+    """
+    check_language(language)
+    check_diarization(diarization)
+    uid, in_path = await run_in_threadpool(store_upload, file)
+    audio_hash = await run_in_threadpool(file_digest, in_path)
+    duration = await run_in_threadpool(probe_duration, in_path, audio_hash)
+
+    params = {
+        "uid": uid,
+        "in_path": in_path,
+        "language": language,
+        "moderator_first": moderator_first,
+        "speakers": int(speakers),
+        "audio_hash": audio_hash,
+        "pack": pack_segments,
+        "vad": vad,
+        "diarization": diarization,
+    }
+    return queue_job(params, duration)
+
+def queue_job(params: Dict, duration: float) -> JSONResponse:
+    """Submit a job and answer 202 with its status and event URLs (503 when the queue is full)."""
+    try:
+        job = job_queue.submit(params, cost=estimate_cost(duration, params["language"]), job_id=params["uid"])
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JSONResponse({"job_id": job.id, "state": job.state, "status_url": f"/jobs/{job.id}",
+                         "events_url": f"/jobs/{job.id}/events"},
+                        status_code=202)
+
+# --------------------------
+# Resumable uploads
+# --------------------------
+# POST /uploads opens a session, PATCH /uploads/{id} appends the body at Upload-Offset
+# (GET tells a reconnecting client where to continue), and POST /uploads/{id}/complete
+# queues the job. The file is hashed and, for streamable formats, decoded as it arrives.
+def get_upload_or_404(upload_id: str):
+    try:
+        session = get_upload_manager().get(upload_id)
+    except UploadBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if session is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return session
+
+@app.post("/uploads")
+async def create_upload(filename: str = Form(...), size: Optional[int] = Form(None)):
+    try:
+        session = await run_in_threadpool(get_upload_manager().create, filename, size)
+    except TooManyUploads as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse({**session.status(), "upload_url": f"/uploads/{session.id}"}, status_code=201,
+                        headers={"Upload-Offset": "0", "Location": f"/uploads/{session.id}"})
+
+@app.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    session = get_upload_or_404(upload_id)
+    return JSONResponse(session.status(), headers={"Upload-Offset": str(session.offset)})
+
+@app.patch("/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request, upload_offset: int = Header(...)):
+    """Append the request body at Upload-Offset; a dropped connection keeps what was received."""
+    session = await run_in_threadpool(get_upload_or_404, upload_id)
+    offset = upload_offset
+    try:
+        async for data in request.stream():
+            if data:
+                offset = await run_in_threadpool(session.write, offset, data)
+    except OffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.offset)})
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ClientDisconnect:
+        pass  # the client resumes from GET /uploads/{id}
+    return JSONResponse(session.status(), headers={"Upload-Offset": str(session.offset)})
+
+@app.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    language: str = Form(...),              # 'english' or 'arabic'
+    moderator_first: bool = Form(False),
+    speakers: int = Form(1),
+    pack_segments: bool = Form(PACK_SEGMENTS_DEFAULT),  # short turns share one Whisper window
+    vad: bool = Form(VAD_DEFAULT),                      # cut silence first; pays off with pack_segments only
+    diarization: str = Form(DIARIZATION_DEFAULT),   # 'full' or 'tiered'
+):
+    check_language(language)
+    check_diarization(diarization)
+    session = get_upload_or_404(upload_id)
+    try:
+        audio_hash = await run_in_threadpool(session.complete)
+    except OffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=f"Upload incomplete: {e}",
+                            headers={"Upload-Offset": str(e.offset)})
+    duration = await run_in_threadpool(probe_duration, session.path, audio_hash)
+
+    params = {
+        "uid": session.id,
+        "in_path": session.path,
+        "language": language,
+        "moderator_first": moderator_first,
+        "speakers": int(speakers),
+        "audio_hash": audio_hash,
+        "pack": pack_segments,
+        "vad": vad,
+        "diarization": diarization,
+    }
+    response = queue_job(params, duration)
+    get_upload_manager().discard(upload_id)  # a 503 above leaves the session open for a retry
+    return response
+
+@app.post("/batches")
+async def submit_batch(
+    files: List[UploadFile] = File(...),
+    language: str = Form("arabic"),
+    moderator_first: bool = Form(False),
+    speakers: int = Form(2),
+    pack_segments: bool = Form(PACK_SEGMENTS_DEFAULT),  # short turns share one Whisper window
+    vad: bool = Form(VAD_DEFAULT),                      # cut silence first; pays off with pack_segments only
+    diarization: str = Form(DIARIZATION_DEFAULT),   # 'full' or 'tiered'
+    settings: str = Form("{}"),             # per-file overrides: {"<file name>": {"language": ..., "speakers": ...}}
+):
+    """
+    Queue a whole study (many files, or .zip archives of them) as one batch job.
+
+    Settings default to the form fields and can be overridden per file name.
+    The batch runs stage by stage across all files (see run_batch); its
+    status and manifest are at /jobs/{id}, per-file exports at
+    /jobs/{file job id}/transcript.{fmt}.
+    """
+    try:
+        overrides = json.loads(settings)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="settings must be a JSON object")
+    if not isinstance(overrides, dict):
+        raise HTTPException(status_code=400, detail="settings must be a JSON object")
+    defaults = {"language": language, "moderator_first": moderator_first, "speakers": speakers,
+                "pack": pack_segments, "vad": vad, "diarization": diarization}
+
+    stored = await run_in_threadpool(store_batch_uploads, files)
+    if not stored:
+        raise HTTPException(status_code=400, detail="No audio files in the upload")
+    items, cost = [], 0.0
+    try:
+        for name, path in stored:
+            extra = overrides.get(name, {})
+            if not isinstance(extra, dict):
+                raise HTTPException(status_code=400, detail=f"settings for {name} must be a JSON object")
+            item = {**defaults, **{k: v for k, v in extra.items() if k in defaults}}
+            if not isinstance(item["language"], str) or not isinstance(item["diarization"], str):
+                raise HTTPException(status_code=400, detail=f"Invalid settings for {name}")
+            check_language(item["language"])
+            check_diarization(item["diarization"])
+            try:
+                item["speakers"] = int(item["speakers"])
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"speakers for {name} must be an integer")
+            audio_hash = await run_in_threadpool(file_digest, path)
+            duration = await run_in_threadpool(probe_duration, path, audio_hash)
+            cost += estimate_cost(duration, item["language"])
+            items.append({"file": name, "uid": str(uuid.uuid4())[:8], "in_path": path, "audio_hash": audio_hash,
+                          **item})
+
+        batch_id = f"batch-{uuid.uuid4().hex[:8]}"
+        try:
+            job = job_queue.submit({"batch_id": batch_id, "items": items}, cost=cost, job_id=batch_id)
+        except QueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    except BaseException:
+        remove_stored([path for _, path in stored])
+        raise
+    return JSONResponse({"job_id": job.id, "state": job.state, "files": [i["file"] for i in items],
+                         "status_url": f"/jobs/{job.id}", "events_url": f"/jobs/{job.id}/events",
+                         "manifest_url": f"/batches/{job.id}"},
+                        status_code=202)
+
+@app.get("/batches/{batch_id}")
+async def batch_manifest(batch_id: str):
+    """Manifest of a finished batch: per-file state and export links, plus batch throughput."""
+    manifest = await run_in_threadpool(get_transcript_store().load_manifest, batch_id)
+    if manifest is None:
+        job = get_job_or_404(batch_id)
+        return JSONResponse(job.to_dict(), status_code=202 if not job.finished() else 200)
+    return JSONResponse(manifest)
+
+def _batch_archive(batch_id: str, fmt: str) -> str:
+    """Zip of every finished file's export in fmt, built once per batch and format."""
+    manifest = get_transcript_store().load_manifest(batch_id)
+    if manifest is None or fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Not found")
+    out_path = get_transcript_store().export_path(batch_id, "zip", fmt)
+    if not os.path.exists(out_path):
+        tmp = f"{out_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+            for entry in manifest["files"]:
+                if entry["state"] == "done":
+                    stem = os.path.splitext(entry["file"])[0]
+                    archive.write(_export_or_404(entry["job_id"], fmt), f"{stem}.{fmt}")
+        os.replace(tmp, out_path)
+    return out_path
+
+@app.get("/batches/{batch_id}/outputs.zip")
+async def batch_outputs(batch_id: str, request: Request, fmt: str = "docx"):
+    path = await run_in_threadpool(_batch_archive, batch_id, fmt)
+    return file_response(path, request.headers, "application/zip", filename=f"{batch_id}_{fmt}.zip")
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """Re-queue an interrupted or failed job; journaled segments and chunks are not redone."""
+    job = job_queue.get(job_id)
+    if job is not None and job.state != "failed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.state}")
+    header = next(replay_journal(journal_path(job_id), "job"), None)
+    if header is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    # A finished job may already be pruned from the queue; its stored transcript is written last
+    if os.path.exists(get_transcript_store().path(job_id)):
+        raise HTTPException(status_code=409, detail="Job is done")
+    if not os.path.exists(header["in_path"]):
+        raise HTTPException(status_code=410, detail="Upload for this job is no longer available")
+
+    params = {k: header[k] for k in ("uid", "in_path", "language", "moderator_first", "speakers", "audio_hash")}
+    params["pack"] = header.get("pack", False)
+    params["vad"] = header.get("vad", False)
+    params["diarization"] = header.get("diarization", "full")
+    duration = await run_in_threadpool(probe_duration, params["in_path"], params["audio_hash"])
+    return queue_job(params, duration)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = get_job_or_404(job_id)
+    status = job.to_dict()
+    status["queue_depth"] = job_queue.depth()
+    return JSONResponse(status)
+
+async def iter_job_events(job, cursor: int = 0):
+    """Yield a job's progress events from cursor onwards until the job has finished."""
+    while True:
+        finished = job.finished()  # read before draining so the final events are not missed
+        events = job.events_since(cursor)
+        for event in events:
+            yield event
+        if events:
+            cursor = events[-1]["seq"] + 1
+        if finished and not job.events_since(cursor):
+            return
+        await asyncio.sleep(EVENT_POLL_SECONDS)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-Sent Events stream of stage changes, segment text and translated chunks."""
+    job = get_job_or_404(job_id)
+    last_id = request.headers.get("last-event-id")
+    cursor = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+
+    async def stream():
+        async for event in iter_job_events(job, cursor):
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/jobs/{job_id}")
+async def job_events_ws(websocket: WebSocket, job_id: str):
+    """Same event stream as /jobs/{id}/events, over a WebSocket."""
+    await websocket.accept()
+    job = job_queue.get(job_id)
+    if job is None:
+        await websocket.close(code=4404)
+        return
+    try:
+        async for event in iter_job_events(job):
+            await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@app.websocket("/ws/live")
+async def live_transcription(websocket: WebSocket):
+    """
+    Live captions for a moderated session.
+
+    The client first sends a JSON config ({"language", "moderator_first",
+    "speakers", "sample_format": "s16le" | "f32le"}), then binary frames of
+    16 kHz mono PCM, then {"type": "stop"}. The server answers with "interim"
+    hypotheses of the open segment, "final" segments with speaker and text,
+    and a closing "done" message with latency percentiles.
+    """
+    await websocket.accept()
+    try:
+        config = await websocket.receive_json()
+        session = LiveSession(language=config.get("language", "arabic"),
+                              moderator_first=bool(config.get("moderator_first", False)),
+                              speakers=int(config.get("speakers", 1)),
+                              sample_format=config.get("sample_format", "s16le"))
+    except (ValueError, TypeError, KeyError) as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=4400)
+        return
+    except WebSocketDisconnect:
+        return
+    await websocket.send_json({"type": "ready", "sample_rate": SAMPLE_RATE})
+
+    # One worker per stream keeps results in order; stale interims are skipped when it falls behind
+    work: asyncio.Queue = asyncio.Queue()
+
+    async def process() -> bool:
+        """Send results until the stop marker (True), or report a model error and close the socket (False)."""
+        while True:
+            event = await work.get()
+            if event is None:
+                return True
+            if event["type"] == "interim" and not work.empty():
+                continue
+            try:
+                message = await run_in_threadpool(session.process, event)
+            except Exception as e:
+                print(f"❌ Live session failed: {e}")
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                await websocket.close(code=1011)
+                return False
+            await websocket.send_json(message)
+
+    worker = asyncio.create_task(process())
+    try:
+        while True:
+            receive = asyncio.ensure_future(websocket.receive())
+            await asyncio.wait({receive, worker}, return_when=asyncio.FIRST_COMPLETED)
+            if worker.done():  # failed (and closed the socket) before the client stopped
+                receive.cancel()
+                break
+            message = receive.result()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                events = session.feed(message["bytes"])
+            elif json.loads(message.get("text") or "{}").get("type") == "stop":
+                for event in session.flush():
+                    work.put_nowait(event)
+                work.put_nowait(None)
+                break
+            else:
+                continue
+            for event in events:
+                work.put_nowait(event)
+        if await worker:
+            await websocket.send_json({"type": "done", **session.stats()})
+            await websocket.close()
+    except WebSocketDisconnect:
+        worker.cancel()
+    print(f"🎙️ Live session ended: {session.segmenter.segments} segments, {session.audio_seconds:.1f}s of audio")
 
 @app.post("/process")
 async def process_audio(
@@ -37,52 +889,114 @@ async def process_audio(
     language: str = Form(...),              # 'english' or 'arabic'
     moderator_first: bool = Form(False),
     speakers: int = Form(1),
+    pack_segments: bool = Form(PACK_SEGMENTS_DEFAULT),  # short turns share one Whisper window
+    vad: bool = Form(VAD_DEFAULT),                      # cut silence first; pays off with pack_segments only
+    diarization: str = Form(DIARIZATION_DEFAULT),   # 'full' or 'tiered'
 ):
-    # store upload
-    uid = str(uuid.uuid4())[:8]
-    in_path = os.path.join(TMP_DIR, f"{uid}_{file.filename}")
-    with open(in_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    # Synchronous variant kept for existing clients; it goes through the same worker pool
+    check_language(language)
+    check_diarization(diarization)
+    uid, in_path = await run_in_threadpool(store_upload, file)
+    duration = await run_in_threadpool(probe_duration, in_path)
 
+    params = {
+        "uid": uid,
+        "in_path": in_path,
+        "language": language,
+        "moderator_first": moderator_first,
+        "speakers": int(speakers),
+        "pack": pack_segments,
+        "vad": vad,
+        "diarization": diarization,
+    }
     try:
-        # 1) Diarize
-        segments = diarize_audio(in_path, moderator_first=moderator_first, speakers=int(speakers))
-
-        # 2) Transcribe and (optionally) translate
-        if language.lower().startswith("en"):
-            out_docx = transcribe_english(in_path, segments, speakers=int(speakers), template_path=None)
-        elif language.lower().startswith("ar"):
-            arabic_docx = transcribe_arabic(in_path, segments, speakers=int(speakers), template_path=None)
-            out_docx = translate_arabic(arabic_docx)  # returns path to final EN docx
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported language")
-
-        # Ensure file is available under TMP_DIR with uid prefix
-        final_name = f"{uid}_{os.path.basename(out_docx)}"
-        final_path = os.path.join(TMP_DIR, final_name)
-        shutil.copy(out_docx, final_path)
-
-        # Extract plain text for preview
-        extracted_text = extract_text_from_docx(final_path)
-
-        # Return JSON metadata (frontend will request /download/<final_name> to download)
-        return JSONResponse({
-            "uid": uid,
-            "text": extracted_text,
-            "docx_name": final_name,
-            "download_url": f"/download/{final_name}"
-        })
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        job = job_queue.submit(params, cost=estimate_cost(duration, language), job_id=uid)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    await run_in_threadpool(job.wait)
+
+    if job.state != "done":
+        raise HTTPException(status_code=500, detail=job.error)
+    # Return JSON metadata (frontend will request /download/<final_name> to download)
+    return JSONResponse(job.result)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Per-stage hit rates and size of the result cache."""
+    return JSONResponse(get_result_cache().stats())
+
+@app.get("/models/stats")
+async def model_stats():
+    """Resident models, memory accounting and load/evict/hit counters."""
+    return JSONResponse(get_registry().stats())
+
+@app.get("/models/tuning")
+async def model_tuning():
+    """Whisper settings in effect on this host, the stored tunings, and whether a tuning run is active."""
+    return JSONResponse({**tuning_report(), **_autotune_state})
+
+@app.post("/models/autotune")
+async def start_autotune(file: Optional[UploadFile] = File(None), models: Optional[str] = Form(None)):
+    """Re-tune the Whisper models on an uploaded calibration clip (or AREN_CALIBRATION_CLIP) in the background."""
+    if _autotune_state["running"]:
+        raise HTTPException(status_code=409, detail="Auto-tuning is already running")
+    if file is None and not CALIBRATION_CLIP:
+        raise HTTPException(status_code=400, detail="Upload a calibration clip or set AREN_CALIBRATION_CLIP")
+    names = [m.strip() for m in models.split(",") if m.strip()] if models else None
+    if names and any(n not in ("levantine_whisper", "large_whisper") for n in names):
+        raise HTTPException(status_code=400, detail="Only levantine_whisper and large_whisper can be tuned")
+    if file is not None:
+        _, clip_path = await run_in_threadpool(store_upload, file)
+    else:
+        clip_path = CALIBRATION_CLIP
+    threading.Thread(target=_run_autotune, args=(clip_path, names, file is not None), name="whisper-autotune",
+                     daemon=True).start()
+    return JSONResponse({"status": "started", "models": names or ["levantine_whisper", "large_whisper"]},
+                        status_code=202)
+
+@app.get("/pipeline/stats")
+async def pipeline_stats():
+    """Per-stage workers, devices, throughput and utilization in pipelined mode."""
+    if executor is None:
+        return JSONResponse({"pipelined": False})
+    return JSONResponse({"pipelined": True, **executor.stats()})
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition: stage histograms, RTF per language, queue depth, model loads."""
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
+
+def _export_or_404(uid: str, fmt: str, variant: str = "default") -> str:
+    if fmt not in MEDIA_TYPES or variant not in ("default", "source", "translation"):
+        raise HTTPException(status_code=404, detail="Not found")
+    record = get_transcript_store().load(uid) if fmt == "docx" else None
+    font_size = DOCX_FONT_SIZE_PT if record and record.get("language") == "arabic" and variant != "source" else None
+    path = get_transcript_store().export(uid, fmt, variant, template_path=TEMPLATE_PATH, font_size_pt=font_size)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return path
+
+@app.get("/jobs/{job_id}/transcript.{fmt}")
+async def transcript_export(job_id: str, fmt: str, request: Request, text: str = "default"):
+    """
+    A finished job's transcript as DOCX, TXT, SRT, VTT or JSON.
+
+    Built from the job's turn store on first request and cached; supports
+    ETag/If-None-Match and single byte ranges. ``text`` picks "source" or
+    "translation" for translated jobs (default: the translation).
+    """
+    path = await run_in_threadpool(_export_or_404, job_id, fmt, text)
+    suffix = "" if text == "default" else f"_{text}"
+    return file_response(path, request.headers, MEDIA_TYPES[fmt], filename=f"{job_id}_transcript{suffix}.{fmt}")
 
 @app.get("/download/{filename}")
-async def download_file(filename: str):
-    path = os.path.join(TMP_DIR, filename)
-    if not os.path.exists(path):
+async def download_file(filename: str, request: Request):
+    """Legacy DOCX download names, served from the job's turn store."""
+    uid, sep, rest = filename.partition("_transcript_")
+    if not sep or rest not in ("en.docx", "ar_en.docx"):
         raise HTTPException(status_code=404, detail="Not found")
-    return FileResponse(path,
-                        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                        filename=filename)
+    path = await run_in_threadpool(_export_or_404, uid, "docx")
+    return file_response(path, request.headers, MEDIA_TYPES["docx"], filename=filename)
 
 # If you prefer to run locally:
 # uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,266 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import asdict, dataclass
+import gc
+import json
+import os
+import platform
+import threading
+import time
+import numpy as np
+
+# --- Global config ---
+TUNING_FILE = os.environ.get("AREN_TUNING_FILE", "/tmp/aren_transcriber/whisper_tuning.json")
+CALIBRATION_CLIP = os.environ.get("AREN_CALIBRATION_CLIP", "")  # a minute of representative speech
+CALIBRATION_SECONDS = float(os.environ.get("AREN_CALIBRATION_SECONDS", "60"))
+WER_TOLERANCE = float(os.environ.get("AREN_TUNING_WER_TOLERANCE", "0.02"))  # vs the most precise setting
+BEAM_SIZES = (5, 3, 1)
+DEFAULT_BEAM_SIZE = 5
+# Compute types to try, most precise first (the first one is the accuracy reference)
+COMPUTE_TYPES = {
+    "cuda": ["float16", "int8_float16", "int8"],
+    "cpu": ["float32", "int8_float32", "int8"],
+}
+
+
+@dataclass
+class WhisperSettings:
+    compute_type: str
+    cpu_threads: int = 0  # 0 = CTranslate2 default
+    beam_size: int = DEFAULT_BEAM_SIZE
+
+
+def default_device_type() -> str:
+    """"cuda" if CTranslate2 sees a GPU, else "cpu"."""
+    try:
+        import ctranslate2
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+def device_type(device: Optional[str] = None) -> str:
+    return device.split(":")[0] if device else default_device_type()
+
+
+def default_settings(dev_type: str) -> WhisperSettings:
+    """Untuned settings: float16 on GPU; int8 on CPU, where float16 is slow or unsupported."""
+    return WhisperSettings(compute_type="float16" if dev_type == "cuda" else "int8")
+
+
+def _gpu_name() -> str:
+    try:
+        import torch
+        return torch.cuda.get_device_name(0) if torch.cuda.is_available() else ""
+    except ImportError:
+        return ""
+
+
+def _cpu_name() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def host_key(dev_type: str) -> str:
+    """Identifies the hardware a tuning applies to, so a shared tuning file serves mixed nodes."""
+    hardware = _gpu_name() if dev_type == "cuda" else f"{_cpu_name()} x{os.cpu_count()}"
+    return f"{dev_type}:{hardware}"
+
+
+# --------------------------
+# Persisted tunings
+# --------------------------
+_tunings: Optional[Dict] = None
+_tunings_mtime = 0.0
+_lock = threading.Lock()
+_host_keys: Dict[str, str] = {}
+
+
+def _host_key_cached(dev_type: str) -> str:
+    if dev_type not in _host_keys:
+        _host_keys[dev_type] = host_key(dev_type)
+    return _host_keys[dev_type]
+
+
+def load_tunings(path: str = TUNING_FILE) -> Dict:
+    """{host key: {model: settings and measurements}}, re-read only when the file changes."""
+    global _tunings, _tunings_mtime
+    with _lock:
+        mtime = os.path.getmtime(path) if os.path.exists(path) else 0.0
+        if _tunings is None or mtime != _tunings_mtime:
+            if mtime:
+                with open(path, encoding="utf-8") as f:
+                    _tunings = json.load(f)
+            else:
+                _tunings = {}
+            _tunings_mtime = mtime
+        return _tunings
+
+
+def save_tuning(model: str, dev_type: str, record: Dict, path: str = TUNING_FILE):
+    tunings = dict(load_tunings(path))
+    tunings.setdefault(_host_key_cached(dev_type), {})[model] = record
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(tunings, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def whisper_settings(model: str, device: Optional[str] = None) -> WhisperSettings:
+    """Tuned settings for model on this host and device type, else the defaults."""
+    dev_type = device_type(device)
+    record = load_tunings().get(_host_key_cached(dev_type), {}).get(model)
+    if not record:
+        return default_settings(dev_type)
+    return WhisperSettings(**{k: record[k] for k in ("compute_type", "cpu_threads", "beam_size")})
+
+
+# --------------------------
+# Benchmark
+# --------------------------
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = reference.split(), hypothesis.split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1] / len(ref)
+
+
+def thread_candidates(dev_type: str) -> List[int]:
+    if dev_type != "cpu":
+        return [0]
+    n = os.cpu_count() or 1
+    return sorted({n, max(1, n // 2), max(1, n // 4)}, reverse=True)
+
+
+def compute_type_candidates(dev_type: str) -> List[str]:
+    wanted = COMPUTE_TYPES.get(dev_type, COMPUTE_TYPES["cpu"])
+    try:
+        import ctranslate2
+        supported = ctranslate2.get_supported_compute_types(dev_type)
+        return [c for c in wanted if c in supported] or wanted[-1:]
+    except (ImportError, ValueError, RuntimeError):
+        return wanted
+
+
+def _transcribe(model, clip, language: str, beam_size: int) -> Tuple[str, float]:
+    t0 = time.perf_counter()
+    segments, _ = model.transcribe(clip, language=language, beam_size=beam_size)
+    text = " ".join(seg.text.strip() for seg in segments)  # the generator does the decoding
+    return text, time.perf_counter() - t0
+
+
+def autotune_model(
+    model: str,
+    model_id: str,
+    clip,
+    language: str,
+    device: Optional[str] = None,
+    beam_sizes: Sequence[int] = BEAM_SIZES,
+    tolerance: float = WER_TOLERANCE,
+) -> Dict:
+    """
+    Benchmark compute types, CPU thread counts and beam sizes for one Whisper model and persist the winner.
+
+    Each setting transcribes the calibration clip once after a warm-up. The
+    most precise compute type with the largest beam is the reference; the
+    fastest setting whose WER against it is within tolerance wins.
+
+    Args:
+        model (str): Registry name ("levantine_whisper", "large_whisper").
+        model_id (str): faster-whisper model id or path.
+        clip (np.ndarray): 16 kHz mono float32 calibration audio.
+        language (str): Decoding language for this model.
+        device (str, optional): "cuda", "cuda:1", "cpu"; the default device if None.
+
+    Returns:
+        Dict: The chosen settings with its timing, plus every trial.
+    """
+    from faster_whisper import WhisperModel
+
+    dev = device or default_device_type()
+    dev_type = device_type(dev)
+    dev_index = int(dev.split(":")[1]) if ":" in dev else 0
+    beam_sizes = sorted(set(beam_sizes), reverse=True)
+    trials, reference = [], None
+    for compute_type in compute_type_candidates(dev_type):
+        for threads in thread_candidates(dev_type):
+            t0 = time.perf_counter()
+            try:
+                whisper = WhisperModel(model_id, device=dev_type, device_index=dev_index,
+                                       compute_type=compute_type, cpu_threads=threads)
+            except (ValueError, RuntimeError) as e:  # compute type not usable on this hardware
+                trials.append({"compute_type": compute_type, "cpu_threads": threads, "error": str(e)})
+                continue
+            load_seconds = time.perf_counter() - t0
+            _transcribe(whisper, clip[:16000 * 5], language, beam_sizes[-1])  # warm-up
+            for beam in beam_sizes:
+                text, seconds = _transcribe(whisper, clip, language, beam)
+                if reference is None:
+                    reference = text
+                trials.append({"compute_type": compute_type, "cpu_threads": threads, "beam_size": beam,
+                               "seconds": round(seconds, 3), "load_seconds": round(load_seconds, 3),
+                               "wer": round(word_error_rate(reference, text), 4)})
+                print(f"🎛️ {model} {compute_type} threads={threads} beam={beam}: {seconds:.2f}s, "
+                      f"WER {trials[-1]['wer']:.3f}")
+            del whisper
+            gc.collect()
+
+    eligible = [t for t in trials if "error" not in t and t["wer"] <= tolerance]
+    if not eligible:
+        raise RuntimeError(f"No usable Whisper configuration for {model} on {dev_type}")
+    best = min(eligible, key=lambda t: t["seconds"])
+    record = {**best, "clip_seconds": round(len(clip) / 16000, 2), "tolerance": tolerance,
+              "tuned_at": time.time(), "trials": trials}
+    save_tuning(model, dev_type, record)
+    print(f"✅ {model}: {best['compute_type']}, {best['cpu_threads'] or 'default'} threads, "
+          f"beam {best['beam_size']} ({best['seconds']:.2f}s on the calibration clip)")
+    return record
+
+
+def autotune(clip_path: str = CALIBRATION_CLIP, models: Optional[Sequence[str]] = None,
+             device: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Tune each Whisper model on the calibration clip and make the registry pick the result up.
+
+    Resident copies of a tuned model are evicted (unless leased by a running
+    job), so the next ``use_model`` loads it with the new compute type and
+    thread count; transcribers read the tuned beam size on every call.
+    """
+    from backend import get_registry, LEVANTINE_WHISPER_ID, LARGE_WHISPER_ID
+    from backend.pcm import SAMPLE_RATE, get_cached_pcm
+
+    tunable = {"levantine_whisper": (LEVANTINE_WHISPER_ID, "ar"), "large_whisper": (LARGE_WHISPER_ID, "en")}
+    if not clip_path:
+        raise ValueError("No calibration clip (set AREN_CALIBRATION_CLIP)")
+    _, pcm = get_cached_pcm(clip_path)
+    clip = np.ascontiguousarray(pcm[:int(CALIBRATION_SECONDS * SAMPLE_RATE)], dtype=np.float32)
+    registry = get_registry()
+    results = {}
+    for model in models or list(tunable):
+        model_id, language = tunable[model]
+        copies = [n for n in registry.stats()["models"] if n == model or n.startswith(f"{model}@")]
+        for name in copies:  # free the memory for the trial loads
+            registry.evict(name)
+        results[model] = autotune_model(model, model_id, clip, language, device)
+        for name in copies:
+            registry.evict(name)
+    return results
+
+
+def tuning_report() -> Dict:
+    """Settings in effect on this host for each device type, and the raw tuning file."""
+    dev_type = default_device_type()
+    return {"host": _host_key_cached(dev_type), "file": TUNING_FILE,
+            "in_effect": {m: asdict(whisper_settings(m)) for m in ("levantine_whisper", "large_whisper")},
+            "tunings": load_tunings()}
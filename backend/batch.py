@@ -0,0 +1,56 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from itertools import groupby
+import time
+
+
+def run_stage_major(
+    contexts: List[Dict],
+    stages: List[Tuple[str, Callable[[Dict], None]]],
+    model_for: Callable[[str, Dict], Optional[str]],
+    before_group: Optional[Callable[[str, Optional[str]], None]] = None,
+    around: Optional[Callable[[Dict, Callable[[Dict], None]], None]] = None,
+) -> Dict:
+    """
+    Run many jobs stage by stage instead of job by job.
+
+    Every job goes through stage 1 before any job starts stage 2, and within
+    a stage the jobs are grouped by the model they need, so each model is
+    loaded once and stays hot for its whole group instead of being swapped
+    in and out between jobs. A failing job gets ctx["error"] and skips the
+    remaining stages; the others carry on.
+
+    Args:
+        contexts (List[Dict]): One job context per file; stages work on them in place.
+        stages (List[Tuple[str, Callable]]): (name, fn) in pipeline order.
+        model_for (Callable): (stage name, ctx) -> model the stage needs for that job, or None.
+        before_group (Callable, optional): Called as before_group(stage, model) ahead of each group.
+        around (Callable, optional): Called as around(ctx, fn) to run fn(ctx), e.g. inside the job's trace.
+
+    Returns:
+        Dict: Wall time, and seconds and job counts per stage and per (stage, model) group.
+    """
+    run = around or (lambda ctx, fn: fn(ctx))
+    report = {"stages": {}, "groups": []}
+    t_batch = time.perf_counter()
+    for name, fn in stages:
+        live = [ctx for ctx in contexts if not ctx.get("error")]
+        live.sort(key=lambda ctx: model_for(name, ctx) or "")  # stable: upload order within a group
+        t_stage = time.perf_counter()
+        for model, group in groupby(live, key=lambda ctx: model_for(name, ctx)):
+            group = list(group)
+            t_group = time.perf_counter()
+            if before_group:
+                before_group(name, model)
+            failed = 0
+            for ctx in group:
+                try:
+                    run(ctx, fn)
+                except Exception as e:
+                    ctx["error"] = f"{name}: {e}"
+                    failed += 1
+                    print(f"❌ Batch item {ctx.get('uid')} failed in {name}: {e}")
+            report["groups"].append({"stage": name, "model": model, "jobs": len(group), "failed": failed,
+                                     "seconds": round(time.perf_counter() - t_group, 3)})
+        report["stages"][name] = {"jobs": len(live), "seconds": round(time.perf_counter() - t_stage, 3)}
+    report["wall_seconds"] = round(time.perf_counter() - t_batch, 3)
+    return report
@@ -0,0 +1,469 @@
+from typing import Callable, List, Dict, Optional, Tuple
+from dataclasses import asdict
+import zlib
+import numpy as np
+from backend.pcm import SAMPLE_RATE, segment_view
+from backend.result_cache import make_key
+from backend.metrics import SEGMENT_SECONDS, VAD_REMOVED_SECONDS, span
+from backend.vad import VadConfig, detect_speech, speech_clip, to_original_time
+
+# --- Global config ---
+DEFAULT_BATCH_SIZE = 8     # clips per encoder/decoder call
+MAX_CLIP_SECONDS = 30.0    # Whisper context length; longer turns go through transcribe()'s seek loop
+MAX_DECODE_LENGTH = 448    # Whisper decoder context
+# faster-whisper transcribe() defaults; a clip that would need its fallback is handed to transcribe()
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOG_PROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+MAX_INITIAL_TIMESTAMP = 1.0
+TIME_PRECISION = 0.02      # seconds per Whisper timestamp token
+PACK_MAX_GAP_SECONDS = 2.0  # a longer pause between turns starts a new packed window
+
+
+def split_clips(
+    pcm: np.ndarray,
+    segments: List[Dict],
+    sample_rate: int = SAMPLE_RATE,
+    speech: Optional[List[List[Tuple[float, float]]]] = None,
+) -> List[Tuple[int, np.ndarray]]:
+    """
+    Cut diarized segments out of the PCM buffer as views.
+
+    Segments are never cut: one longer than the Whisper window is decoded
+    by ``transcribe()``, whose seek loop moves on at the last timestamp
+    instead of mid-word. With speech (per-segment VAD spans), each segment
+    is reduced to its joined speech spans.
+
+    Returns:
+        List[Tuple[int, np.ndarray]]: (segment index, samples) pairs in order.
+    """
+    return [(idx, speech_clip(pcm, speech[idx], sample_rate) if speech is not None
+             else segment_view(pcm, seg, sample_rate)) for idx, seg in enumerate(segments)]
+
+
+def supports_batching(model) -> bool:
+    """True for faster-whisper models exposing the CTranslate2 encoder/decoder."""
+    return hasattr(model, "feature_extractor") and hasattr(getattr(model, "model", None), "generate")
+
+
+def _compression_ratio(text: str) -> float:
+    data = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data))
+
+
+def _suppressed_tokens(tokenizer) -> List[int]:
+    try:
+        from faster_whisper.transcribe import get_suppressed_tokens
+        return list(get_suppressed_tokens(tokenizer, [-1]))
+    except ImportError:
+        return [-1]
+
+
+def _timestamped_text(tokenizer, tokens: List[int]) -> Optional[str]:
+    """
+    Text as transcribe() joins it, or None when transcribe() would decode this clip differently.
+
+    That is when the output does not end on a timestamp pair (transcribe()
+    seeks back to the last timestamp and decodes the rest again).
+    """
+    ts_begin = tokenizer.timestamp_begin
+    consecutive = any(tokens[i] >= ts_begin and tokens[i - 1] >= ts_begin for i in range(1, len(tokens)))
+    single_ending = len(tokens) >= 2 and tokens[-2] < ts_begin <= tokens[-1]
+    if consecutive and not single_ending:
+        return None
+    pieces, current = [], []
+    for tok in tokens + [ts_begin]:
+        if tok >= ts_begin:
+            if current:
+                pieces.append(tokenizer.decode(current).strip())
+            current = []
+        else:
+            current.append(tok)
+    return " ".join(p for p in pieces if p)
+
+
+def _decode_batch_ct2(model, clips: List[np.ndarray], language: str, beam_size: int) -> List[str]:
+    """
+    Run one padded batch through the CTranslate2 Whisper encoder and decoder.
+
+    Decodes with transcribe()'s options for a single window (timestamps on,
+    same suppressed tokens, initial-timestamp limit, no-speech skip).
+    Clips that transcribe() would treat differently (a temperature fallback
+    or a seek within the window) are re-decoded with ``transcribe()`` itself,
+    so the text matches the per-segment path.
+    """
+    import ctranslate2
+    from faster_whisper.tokenizer import Tokenizer
+
+    extractor = model.feature_extractor
+    n_frames = extractor.nb_max_frames
+    features = []
+    for clip in clips:
+        content = max(1, len(clip) // extractor.hop_length)
+        feats = extractor(clip)[:, :min(content, n_frames)]
+        features.append(np.pad(feats, ((0, 0), (0, n_frames - feats.shape[1]))))  # zeros, like pad_or_trim
+    batch = np.ascontiguousarray(np.stack(features), dtype=np.float32)
+
+    encoder_output = model.model.encode(ctranslate2.StorageView.from_array(batch), to_cpu=False)
+    tokenizer = Tokenizer(
+        model.hf_tokenizer,
+        model.model.is_multilingual,
+        task="transcribe",
+        language=language,
+    )
+    results = model.model.generate(
+        encoder_output,
+        [list(tokenizer.sot_sequence)] * len(clips),
+        beam_size=beam_size,
+        max_length=MAX_DECODE_LENGTH,
+        return_scores=True,
+        return_no_speech_prob=True,
+        suppress_blank=True,
+        suppress_tokens=_suppressed_tokens(tokenizer),
+        max_initial_timestamp_index=int(round(MAX_INITIAL_TIMESTAMP / TIME_PRECISION)),
+    )
+
+    texts: List[Optional[str]] = []
+    for r in results:
+        tokens = r.sequences_ids[0]
+        avg_logprob = r.scores[0] * len(tokens) / (len(tokens) + 1)
+        if r.no_speech_prob > NO_SPEECH_THRESHOLD and avg_logprob < LOG_PROB_THRESHOLD:
+            texts.append("")  # transcribe() skips the window as silence
+            continue
+        text = _timestamped_text(tokenizer, tokens)
+        if text is not None and (avg_logprob < LOG_PROB_THRESHOLD
+                                 or _compression_ratio(tokenizer.decode(tokens).strip()) > COMPRESSION_RATIO_THRESHOLD):
+            text = None  # transcribe() would retry at a higher temperature
+        texts.append(text)
+
+    redo = [i for i, text in enumerate(texts) if text is None]
+    for i, text in zip(redo, _decode_sequential(model, [clips[i] for i in redo], language, beam_size)):
+        texts[i] = text
+    return texts
+
+
+def _decode_sequential(model, clips: List[np.ndarray], language: str, beam_size: int) -> List[str]:
+    """One transcribe() call per clip: for models without a batched decoder, long clips and fallbacks."""
+    texts = []
+    for clip in clips:
+        w_segments, _ = model.transcribe(clip, language=language, beam_size=beam_size)
+        texts.append(" ".join(s.text.strip() for s in w_segments).strip())
+    return texts
+
+
+def _transcribe_batched(
+    model,
+    pcm: np.ndarray,
+    segments: List[Dict],
+    language: str,
+    beam_size: int = 5,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_segment: Optional[Callable[[int, str], None]] = None,
+    speech: Optional[List[List[Tuple[float, float]]]] = None,
+) -> List[str]:
+    """
+    Transcribe diarized segments straight from in-memory PCM, in batches.
+
+    Args:
+        model: faster-whisper ``WhisperModel`` (or any object with ``transcribe``).
+        pcm (np.ndarray): 16 kHz mono float32 samples.
+        segments (List[Dict]): Diarization output (list of {start, end, speaker} dicts).
+        language (str): Whisper language code ("en", "ar").
+        beam_size (int): Beam size for decoding.
+        batch_size (int): Number of clips sent to the model per call.
+        on_segment (Callable, optional): Called as on_segment(index, text) as soon as
+            every clip of a segment has been decoded, in segment order.
+        speech (List, optional): Per-segment VAD speech spans; only those are decoded.
+
+    Returns:
+        List[str]: One transcript per segment, aligned with ``segments`` ("" if silent).
+    """
+    batched = supports_batching(model)
+    max_len = int(MAX_CLIP_SECONDS * SAMPLE_RATE)
+    clips = [(idx, clip) for idx, clip in split_clips(pcm, segments, speech=speech) if len(clip)]
+    parts: List[List[str]] = [[] for _ in segments]
+    batch_size = max(1, batch_size)
+    emitted = 0
+
+    for i in range(0, len(clips), batch_size):
+        batch = clips[i:i + batch_size]
+        with span("transcribe_batch", items=len(batch), per_item=SEGMENT_SECONDS):
+            short = [j for j, (_, clip) in enumerate(batch) if batched and len(clip) <= max_len]
+            long = [j for j in range(len(batch)) if j not in short]
+            texts = [""] * len(batch)
+            for group, decode in ((short, _decode_batch_ct2), (long, _decode_sequential)):
+                if group:
+                    for j, text in zip(group, decode(model, [batch[j][1] for j in group], language, beam_size)):
+                        texts[j] = text
+        for (seg_idx, _), text in zip(batch, texts):
+            if text:
+                parts[seg_idx].append(text)
+
+        if on_segment:
+            # A segment is complete once the next pending clip belongs to a later one
+            done_upto = clips[i + batch_size][0] if i + batch_size < len(clips) else len(segments)
+            for idx in range(emitted, done_upto):
+                on_segment(idx, " ".join(parts[idx]).strip())
+            emitted = done_upto
+
+    if on_segment:
+        for idx in range(emitted, len(segments)):
+            on_segment(idx, "")
+
+    return [" ".join(p).strip() for p in parts]
+
+
+# --------------------------
+# Packed mode: several short turns per Whisper window
+# --------------------------
+def pack_windows(
+    segments: List[Dict],
+    max_seconds: float = MAX_CLIP_SECONDS,
+    max_gap: float = PACK_MAX_GAP_SECONDS,
+    lengths: Optional[List[float]] = None,
+) -> List[List[int]]:
+    """
+    Group consecutive segments into windows of at most max_seconds of audio.
+
+    A window spans from its first segment's start to its last segment's end;
+    a pause longer than max_gap also closes it. Segments longer than
+    max_seconds get a window of their own. With lengths (audio actually
+    kept per segment, e.g. after VAD), the window is the sum of its members'
+    lengths and pauses do not count.
+
+    Returns:
+        List[List[int]]: Segment indices per window, in order.
+    """
+    windows: List[List[int]] = []
+    filled = 0.0
+    for idx, seg in enumerate(segments):
+        if windows:
+            if lengths is not None:
+                fits = filled + lengths[idx] <= max_seconds
+            else:
+                first, last = segments[windows[-1][0]], segments[windows[-1][-1]]
+                fits = seg["end"] - first["start"] <= max_seconds and seg["start"] - last["end"] <= max_gap
+            if fits:
+                windows[-1].append(idx)
+                filled += lengths[idx] if lengths is not None else 0.0
+                continue
+        windows.append([idx])
+        filled = lengths[idx] if lengths is not None else 0.0
+    return windows
+
+
+def assign_words(words: List[Tuple[float, float, str]], starts: np.ndarray, ends: np.ndarray) -> List[str]:
+    """
+    Give each word to the segment containing its midpoint (or the nearest one if it falls in a gap).
+
+    Args:
+        words (List[Tuple[float, float, str]]): (start, end, text) with absolute times; text keeps
+            Whisper's leading space.
+        starts, ends (np.ndarray): Sorted, non-overlapping segment boundaries.
+
+    Returns:
+        List[str]: Joined text per segment.
+    """
+    parts: List[List[str]] = [[] for _ in starts]
+    if not words or not len(starts):
+        return ["" for _ in starts]
+    mids = np.array([(w_start + w_end) / 2 for w_start, w_end, _ in words])
+    idx = np.clip(np.searchsorted(starts, mids, side="right") - 1, 0, len(starts) - 1)
+    # In a gap after segment idx: move to the next segment if it is closer
+    nxt = np.minimum(idx + 1, len(starts) - 1)
+    closer_next = (mids > ends[idx]) & (nxt != idx) & (starts[nxt] - mids < mids - ends[idx])
+    idx = np.where(closer_next, nxt, idx)
+    for (_, _, text), seg_idx in zip(words, idx.tolist()):
+        parts[seg_idx].append(text)
+    return ["".join(p).strip() for p in parts]
+
+
+def _transcribe_packed(
+    model,
+    pcm: np.ndarray,
+    segments: List[Dict],
+    language: str,
+    beam_size: int = 5,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_segment: Optional[Callable[[int, str], None]] = None,
+    speech: Optional[List[List[Tuple[float, float]]]] = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> List[str]:
+    """
+    Transcribe packed windows of consecutive segments and split the text back by word timestamps.
+
+    Same interface as ``_transcribe_batched`` (batch_size is unused: each
+    window already fills the model's context). Segments are expected in time
+    order and non-overlapping, as produced by diarization post-processing.
+    With speech (per-segment VAD spans), a window is its members' joined
+    speech and word times are mapped back onto the original timeline.
+    """
+    lengths = [sum(e - s for s, e in spans) for spans in speech] if speech is not None else None
+    texts = ["" for _ in segments]
+    emitted = 0
+    for members in pack_windows(segments, lengths=lengths):
+        if speech is not None:
+            spans = [sp for i in members for sp in speech[i]]
+            clip = speech_clip(pcm, spans, sample_rate)
+        else:
+            spans = [(segments[members[0]]["start"], segments[members[-1]]["end"])]
+            clip = pcm[int(spans[0][0] * sample_rate):int(spans[0][1] * sample_rate)]
+        words: List[Tuple[float, float, str]] = []
+        if len(clip):
+            with span("transcribe_window", items=len(members), per_item=SEGMENT_SECONDS):
+                w_segments, _ = model.transcribe(clip, language=language, beam_size=beam_size, word_timestamps=True)
+                raw = [(w.start, w.end, w.word) for w_seg in w_segments for w in (w_seg.words or [])]
+            if raw:
+                starts = to_original_time([w[0] for w in raw], spans)
+                ends = to_original_time([w[1] for w in raw], spans)
+                words = [(s, e, w[2]) for s, e, w in zip(starts.tolist(), ends.tolist(), raw)]
+
+        starts = np.array([segments[i]["start"] for i in members])
+        ends = np.array([segments[i]["end"] for i in members])
+        for i, text in zip(members, assign_words(words, starts, ends)):
+            texts[i] = text
+
+        if on_segment:
+            for idx in range(emitted, members[-1] + 1):
+                on_segment(idx, texts[idx])
+            emitted = members[-1] + 1
+    return texts
+
+
+def _record_vad(report: Dict, language: str, journal=None):
+    """Log, count and journal what the VAD cut before decoding."""
+    if not report["segments"]:
+        return
+    print(f"🔇 VAD removed {report['removed_seconds']:.1f}s of {report['input_seconds']:.1f}s "
+          f"({report['dropped']} silent segments skipped, threshold {report['threshold_db']} dBFS)")
+    VAD_REMOVED_SECONDS.inc(report["removed_seconds"], language=language)
+    if journal is not None:
+        journal.append("vad", stage=language, **report)
+
+
+def _consecutive_runs(indices: List[int]) -> List[Tuple[int, int]]:
+    """(lo, hi) position ranges of indices whose values are consecutive integers."""
+    runs, lo = [], 0
+    for pos in range(1, len(indices) + 1):
+        if pos == len(indices) or indices[pos] != indices[pos - 1] + 1:
+            runs.append((lo, pos))
+            lo = pos
+    return runs
+
+
+def transcribe_segment_texts(
+    model,
+    pcm: np.ndarray,
+    segments: List[Dict],
+    language: str,
+    beam_size: int = 5,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_segment: Optional[Callable[[int, str], None]] = None,
+    cache=None,
+    cache_scope: Optional[Dict] = None,
+    journal=None,
+    pack: bool = False,
+    vad: Optional[VadConfig] = None,
+) -> List[str]:
+    """
+    Batched segment transcription with an optional per-segment result cache and job journal.
+
+    Segment texts are looked up by cache_scope (audio hash, model, language,
+    beam size) plus the segment boundaries, so a re-run with different speaker
+    labels only transcribes segments whose boundaries changed. With a journal,
+    every finished segment is appended to it and segments already journaled by
+    an interrupted run of the same job are replayed instead of re-decoded.
+    With pack=True, short consecutive segments share one Whisper window and
+    the text is split back by word timestamps (see ``_transcribe_packed``).
+    With a VadConfig, silence inside segments is cut out before decoding and
+    silent segments are not decoded at all (see ``backend.vad``); what was
+    removed is logged and journaled. Without pack, trimmed clips are still
+    padded to a full Whisper window, so VAD only saves the silent segments. Arguments are otherwise as for
+    ``_transcribe_batched``.
+
+    Returns:
+        List[str]: One transcript per segment, aligned with ``segments`` ("" if silent).
+    """
+    transcribe = _transcribe_packed if pack else _transcribe_batched
+
+    def decode(segs: List[Dict], callback) -> List[str]:
+        speech = None
+        if vad is not None:
+            speech, report = detect_speech(pcm, segs, vad)
+            _record_vad(report, language, journal)
+        return transcribe(model, pcm, segs, language, beam_size, batch_size, callback, speech=speech)
+
+    use_cache = cache is not None and cache_scope is not None
+    if not use_cache and journal is None:
+        return decode(segments, on_segment)
+
+    bounds = [(round(seg["start"], 3), round(seg["end"], 3)) for seg in segments]
+    texts: List[Optional[str]] = [None] * len(segments)
+    if journal is not None:
+        journaled = journal.segment_texts()
+        texts = [journaled.get((language, start, end)) for start, end in bounds]
+        replayed = sum(text is not None for text in texts)
+        if replayed:
+            print(f"↩️ Resuming: {replayed}/{len(segments)} segments already in the job journal")
+
+    scope = dict(cache_scope or {})
+    if pack:
+        scope["packed"] = True
+    if vad is not None:
+        scope["vad"] = asdict(vad)
+    keys = [make_key(stage="transcript", **scope, start=start, end=end) for start, end in bounds] if use_cache else []
+    if use_cache:
+        before = sum(text is None for text in texts)
+        texts = [text if text is not None else cache.get("transcript", key) for text, key in zip(texts, keys)]
+        hits = before - sum(text is None for text in texts)
+        if hits:
+            print(f"♻️ Reusing {hits}/{len(segments)} cached segment transcripts")
+    missing = [idx for idx, text in enumerate(texts) if text is None]
+
+    emitted = 0
+
+    def flush():
+        # Report finished segments strictly in order, cached or fresh
+        nonlocal emitted
+        while emitted < len(texts) and texts[emitted] is not None:
+            if on_segment:
+                on_segment(emitted, texts[emitted])
+            emitted += 1
+
+    def store(sub_idx: int, text: str, offset: int = 0):
+        idx = missing[offset + sub_idx]
+        texts[idx] = text
+        if use_cache:
+            cache.put("transcript", keys[idx], text)
+        if journal is not None:
+            journal.append("segment", stage=language, start=bounds[idx][0], end=bounds[idx][1], text=text)
+        flush()
+
+    flush()
+    # Packed windows cover every sample between their first and last segment, so in packed
+    # mode only consecutive runs of missing segments are decoded together
+    runs = _consecutive_runs(missing) if pack else [(0, len(missing))]
+    for lo, hi in runs:
+        if hi > lo:
+            decode([segments[i] for i in missing[lo:hi]], lambda sub_idx, text, lo=lo: store(sub_idx, text, lo))
+    return texts
+
+
+def transcribe_segments(
+    model,
+    pcm: np.ndarray,
+    segments: List[Dict],
+    language: str,
+    beam_size: int = 5,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_segment: Optional[Callable[[int, str], None]] = None,
+    cache=None,
+    cache_scope: Optional[Dict] = None,
+    journal=None,
+    pack: bool = False,
+    vad: Optional[VadConfig] = None,
+) -> List[Tuple[str, str]]:
+    """Same as ``transcribe_segment_texts`` but returns (speaker, text) turns, dropping empty ones."""
+    texts = transcribe_segment_texts(model, pcm, segments, language, beam_size, batch_size, on_segment,
+                                     cache, cache_scope, journal, pack, vad)
+    return [(seg["speaker"], text) for seg, text in zip(segments, texts) if text]
@@ -0,0 +1 @@
+# backend/benchmarks — CPU-only benchmarks driven by stand-in models.
@@ -0,0 +1,65 @@
+"""
+Segments/sec for per-segment WAV export vs. in-memory batched transcription.
+
+Usage:
+    python -m backend.benchmarks.bench_batch_transcribe --minutes 10
+    python -m backend.benchmarks.bench_batch_transcribe --model tiny --batch-size 16
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from backend.batch_transcribe import transcribe_segment_texts
+from backend.pcm import segment_view
+from backend.benchmarks.stubs import StubWhisperModel, synthetic_pcm, synthetic_segments, write_wav
+
+
+def run_legacy(model, pcm, segments, language):
+    """The old path: export every segment to WAV, then transcribe the file."""
+    texts = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for idx, seg in enumerate(segments, start=1):
+            snippet_path = os.path.join(tmp, f"segment_{idx:03d}.wav")
+            write_wav(snippet_path, segment_view(pcm, seg))
+            w_segments, _ = model.transcribe(snippet_path, language=language, beam_size=5)
+            texts.append(" ".join(s.text.strip() for s in w_segments).strip())
+            os.remove(snippet_path)
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--model", default=None, help="faster-whisper model name (default: stub)")
+    args = parser.parse_args()
+
+    if args.model:
+        from faster_whisper import WhisperModel
+        model = WhisperModel(args.model, device="cpu", compute_type="int8")
+    else:
+        model = StubWhisperModel()
+
+    pcm = synthetic_pcm(args.minutes * 60)
+    segments = synthetic_segments(args.minutes * 60)
+
+    t0 = time.perf_counter()
+    run_legacy(model, pcm, segments, "en")
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    transcribe_segment_texts(model, pcm, segments, "en", batch_size=args.batch_size)
+    batched_s = time.perf_counter() - t0
+
+    print(json.dumps({
+        "segments": len(segments),
+        "batch_size": args.batch_size,
+        "legacy_segments_per_s": round(len(segments) / legacy_s, 2),
+        "batched_segments_per_s": round(len(segments) / batched_s, 2),
+        "speedup": round(legacy_s / batched_s, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Tiered diarization against full pyannote on one-voice, two-voice and hard two-speaker recordings.
+
+For each case reports the tier ``diarize_fast`` picked, its wall time and
+estimated speedup, the measured time of the full path, and how much of the
+speech each path attributes to the right speaker. Runs with stub pyannote
+unless it is installed (then pass --real); without torch the full-pyannote
+comparison is skipped and only the tiered path is reported.
+
+Usage:
+    python -m backend.benchmarks.bench_diarize_fast
+    python -m backend.benchmarks.bench_diarize_fast --seconds 1800 --real
+"""
+import argparse
+import json
+import time
+import numpy as np
+from backend import get_registry
+from backend.diarize import diarize_audio, diarize_fast
+from backend.benchmarks.bench_live import two_voice_pcm
+from backend.benchmarks.harness import missing_modules
+from backend.benchmarks.stubs import install_stub_models
+
+
+def agreement(a, b, step: float = 0.1) -> float:
+    """Share of time both segmentations call speech where they agree on M vs R."""
+    def sample(segments, t):
+        labels = np.full(len(t), "", dtype=object)
+        for seg in segments:
+            labels[(t >= seg["start"]) & (t < seg["end"])] = "M" if seg["speaker"] == "M" else "R"
+        return labels
+    end = max([s["end"] for s in a + b] or [0.0])
+    t = np.arange(0.0, end, step)
+    la, lb = sample(a, t), sample(b, t)
+    both = (la != "") & (lb != "")
+    return round(float((la[both] == lb[both]).mean()), 3) if both.any() else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=300.0)
+    parser.add_argument("--real", action="store_true", help="use the installed pyannote instead of the stub")
+    args = parser.parse_args()
+    if not args.real:
+        install_stub_models(get_registry())
+    missing = missing_modules(["torch"])  # run_pyannote hands pyannote a torch tensor
+
+    cases = {
+        "one_voice": (*two_voice_pcm(args.seconds, 1), 1),
+        "two_voices": (*two_voice_pcm(args.seconds, 2), 2),
+        "one_voice_as_two": (*two_voice_pcm(args.seconds, 1, seed=1), 2),  # must escalate
+    }
+    results = {}
+    for name, (pcm, turns, speakers) in cases.items():
+        truth = [{"start": s, "end": e, "speaker": "M" if v == 0 else "R"} for s, e, v in turns]
+        t0 = time.perf_counter()
+        fast, report = diarize_fast(pcm, speakers=speakers)
+        fast_s = time.perf_counter() - t0
+        results[name] = {
+            "tier": report["tier"],
+            "separation": report.get("separation"),
+            "fast_seconds": round(fast_s, 3),
+            "estimated_speedup": report["estimated_speedup"],
+            "segments_fast": len(fast) if fast is not None else None,
+            "accuracy_fast": agreement(fast, truth) if fast is not None else None,
+        }
+        if not missing:
+            t0 = time.perf_counter()
+            full = diarize_audio("", pcm=pcm, speakers=speakers)
+            results[name].update(full_seconds=round(time.perf_counter() - t0, 3), segments_full=len(full),
+                                 accuracy_full=agreement(full, truth))
+    print(json.dumps({"audio_seconds": args.seconds, "pyannote": "real" if args.real else "stub",
+                      "full_pyannote": f"skipped: missing {', '.join(missing)}" if missing else "measured",
+                      "cases": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+DOCX rendering time: python-docx paragraph-by-paragraph vs. the precompiled template renderer.
+
+Usage:
+    python -m backend.benchmarks.bench_docx --turns 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from backend.docx_render import get_docx_template, render_docx
+from backend.benchmarks.harness import missing_modules
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(BACKEND_DIR, "Output_Template.docx")
+
+
+def synthetic_turns(n: int):
+    words = "so what do you think about the new packaging and the price compared to last year".split()
+    return [("M" if i % 3 == 0 else "R", " ".join(words[(i + j) % len(words)] for j in range(12 + i % 30)))
+            for i in range(n)]
+
+
+def _delete_paragraph(paragraph):
+    p = paragraph._element
+    p.getparent().remove(p)
+    paragraph._p = paragraph._element = None
+
+
+def _add_turn(doc, speaker, text):
+    from docx.shared import RGBColor, Pt
+
+    if speaker == "M":
+        blank = doc.add_paragraph()
+        blank.paragraph_format.line_spacing = 0.6
+    para = doc.add_paragraph()
+    para.paragraph_format.space_after = Pt(6)
+    run = para.add_run(f"{speaker}: {text}")
+    if speaker == "M":
+        run.font.color.rgb = RGBColor(255, 0, 0)
+
+
+def render_legacy(turns, template_path, output_docx):
+    """The old path: python-docx Document, delete every paragraph, add a paragraph per turn, then re-read for preview."""
+    from docx import Document
+
+    doc = Document(template_path)
+    for p in list(doc.paragraphs):
+        _delete_paragraph(p)
+    for speaker, text in turns:
+        _add_turn(doc, speaker, text)
+    doc.save(output_docx)
+    return "\n".join(p.text for p in Document(output_docx).paragraphs if p.text and p.text.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    turns = synthetic_turns(args.turns)
+    report = {"turns": len(turns)}
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "out.docx")
+
+        t0 = time.perf_counter()
+        get_docx_template(TEMPLATE_PATH)
+        report["template_parse_s"] = round(time.perf_counter() - t0, 4)
+
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            preview = render_docx(turns, TEMPLATE_PATH, out_path)
+            times.append(time.perf_counter() - t0)
+        report["fast_s"] = round(min(times), 4)
+        report["fast_turns_per_s"] = round(len(turns) / min(times), 1)
+        report["output_bytes"] = os.path.getsize(out_path)
+
+        if missing_modules(["docx"]):
+            report["legacy"] = "skipped: python-docx not installed"
+        else:
+            from docx import Document
+
+            # Same paragraphs and preview as the python-docx path
+            fast_paragraphs = [p.text for p in Document(out_path).paragraphs]
+            legacy_path = os.path.join(tmp, "legacy.docx")
+            t0 = time.perf_counter()
+            legacy_preview = render_legacy(turns, TEMPLATE_PATH, legacy_path)
+            legacy_s = time.perf_counter() - t0
+            report["legacy_s"] = round(legacy_s, 4)
+            report["speedup"] = round(legacy_s / min(times), 1)
+            report["same_paragraphs"] = fast_paragraphs == [p.text for p in Document(legacy_path).paragraphs]
+            report["same_preview"] = preview == legacy_preview
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Cold-start import time of the backend package, the app module and each stage module.
+
+Each module is imported in a fresh interpreter under ``python -X importtime``;
+the report lists wall time, the module's cumulative import time and its
+heaviest transitive imports:
+    python -m backend.benchmarks.bench_import_time
+    python -m backend.benchmarks.bench_import_time --repeat 5 --top 10
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(BACKEND_DIR)
+
+# app.py and the stage modules are imported flat, the way uvicorn loads them from backend/
+MODULES = ["backend", "app", "diarize", "transcribe_en", "transcribe_ar", "translate_ar"]
+
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([BACKEND_DIR, REPO_ROOT]))
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    imports = {}
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            imports[m.group(4)] = int(m.group(2))  # cumulative µs
+    return proc.returncode, wall, imports, proc.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    args = parser.parse_args()
+
+    report = {}
+    for module in args.modules:
+        walls, cumulative, heaviest = [], [], {}
+        for _ in range(args.repeat):
+            code, wall, imports, stderr = measure(module)
+            if code != 0:
+                report[module] = {"error": stderr.strip().splitlines()[-1]}
+                break
+            walls.append(wall)
+            cumulative.append(imports.get(module, 0) / 1e6)
+            heaviest = imports
+        else:
+            top_level = {name: us for name, us in heaviest.items() if "." not in name and name != module}
+            report[module] = {
+                "wall_s": round(statistics.median(walls), 3),
+                "import_s": round(statistics.median(cumulative), 3),
+                "heaviest": {name: round(us / 1e6, 3) for name, us in
+                             sorted(top_level.items(), key=lambda kv: -kv[1])[:args.top]},
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Diarization post-processing: columnar interval engine vs. the original dict-based passes.
+
+Checks both produce identical segments, then times them:
+    python -m backend.benchmarks.bench_intervals --segments 100000
+"""
+import argparse
+import json
+import time
+import numpy as np
+from backend.intervals import postprocess
+
+
+def legacy_postprocess(raw_segments, moderator_first=False, min_duration=0.6, gap_threshold=3.0, gap_tolerance=1):
+    """The original list-of-dicts implementation from diarize_audio, kept as the reference."""
+    raw_segments = [dict(seg) for seg in raw_segments]
+
+    def resolve_overlaps(segments):
+        segments = sorted(segments, key=lambda x: x["start"])
+        output = []
+        for seg in segments:
+            if not output:
+                output.append(seg)
+                continue
+            last = output[-1]
+            if seg["start"] >= last["end"]:
+                output.append(seg)
+            elif seg["end"] <= last["end"]:
+                if seg["start"] > last["start"]:
+                    output[-1] = {"start": last["start"], "end": seg["start"], "speaker": last["speaker"]}
+                output.append(seg)
+                if seg["end"] < last["end"]:
+                    output.append({"start": seg["end"], "end": last["end"], "speaker": last["speaker"]})
+            else:
+                if seg["start"] > last["start"]:
+                    output[-1] = {"start": last["start"], "end": seg["start"], "speaker": last["speaker"]}
+                output.append(seg)
+        return output
+
+    segments = resolve_overlaps(raw_segments)
+    moderator = segments[0]["speaker"] if segments else None
+    for seg in segments:
+        if moderator_first:
+            seg["speaker"] = "M" if seg["speaker"] == moderator else f"R{seg['speaker']}"
+        else:
+            seg["speaker"] = "M" if seg["speaker"] == moderator else "R"
+
+    merged = segments[:1]
+    for seg in segments[1:]:
+        if seg["end"] - seg["start"] < min_duration:
+            merged[-1]["end"] = seg["end"]
+        else:
+            merged.append(seg)
+
+    filled = []
+    for i, seg in enumerate(merged):
+        if i > 0:
+            gap = seg["start"] - filled[-1]["end"]
+            if gap > min_duration and gap <= gap_threshold:
+                filled[-1]["end"] = seg["start"]
+        filled.append(seg)
+
+    out = filled[:1]
+    for seg in filled[1:]:
+        if seg["speaker"] == out[-1]["speaker"] and seg["start"] - out[-1]["end"] <= gap_tolerance:
+            out[-1]["end"] = max(out[-1]["end"], seg["end"])
+        else:
+            out.append(seg)
+    return out
+
+
+def synthetic_tracks(n: int, speakers: int = 4, seed: int = 0):
+    """Pyannote-like raw tracks: mostly sequential turns with frequent overlaps and short blips."""
+    rng = np.random.default_rng(seed)
+    starts = np.cumsum(rng.exponential(1.5, n))
+    durations = np.where(rng.random(n) < 0.2, rng.uniform(0.05, 0.6, n), rng.uniform(0.6, 6.0, n))
+    labels = rng.integers(0, speakers, n)
+    return [{"start": float(s), "end": float(s + d), "speaker": f"SPEAKER_{l:02d}"}
+            for s, d, l in zip(starts, durations, labels)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, default=100_000)
+    parser.add_argument("--moderator-first", action="store_true")
+    args = parser.parse_args()
+
+    raw = synthetic_tracks(args.segments)
+
+    t0 = time.perf_counter()
+    expected = legacy_postprocess(raw, args.moderator_first)
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    actual = postprocess(raw, args.moderator_first)
+    columnar_s = time.perf_counter() - t0
+
+    assert actual == expected, "columnar output differs from the dict-based reference"
+    print(json.dumps({
+        "raw_segments": len(raw),
+        "output_segments": len(actual),
+        "dict_based_s": round(legacy_s, 4),
+        "columnar_s": round(columnar_s, 4),
+        "speedup": round(legacy_s / columnar_s, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+End-to-end latency of live captioning, measured by a local replay client.
+
+Streams a recording to /ws/live in fixed-size chunks at real-time pace (or
+faster with --speed) and times every interim and final result against the
+moment the audio it covers was sent. By default the app runs in-process with
+stub models, so what is measured is the endpointing, queueing and transport
+overhead; point --url at a running server to measure the real models.
+
+Usage:
+    python -m backend.benchmarks.bench_live
+    python -m backend.benchmarks.bench_live --seconds 120 --speakers 2 --speed 4
+    python -m backend.benchmarks.bench_live --wav session.wav --url ws://localhost:8000/ws/live --language arabic
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+import numpy as np
+from backend.benchmarks.harness import missing_modules
+from backend.benchmarks.stubs import SAMPLE_RATE, install_stub_models, read_wav
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def two_voice_pcm(seconds: float, speakers: int = 2, seed: int = 0):
+    """
+    Alternating turns of harmonic "voices" with different pitch and brightness,
+    separated by 0.8-2 s pauses. Returns the PCM and the true (start, end, voice) turns.
+    """
+    rng = np.random.default_rng(seed)
+    pcm = rng.normal(0, 0.002, int(seconds * SAMPLE_RATE)).astype(np.float32)
+    voices = [(120.0 * (1.6 ** v), 0.5 + 0.3 * v) for v in range(speakers)]  # (f0, spectral tilt)
+    turns, t, idx = [], 0.5, 0
+    while t < seconds - 1.0:
+        dur = min(float(rng.uniform(1.5, 6.0)), seconds - t)
+        f0, tilt = voices[idx % speakers]
+        tt = np.arange(int(dur * SAMPLE_RATE)) / SAMPLE_RATE
+        wave = sum(np.sin(2 * np.pi * f0 * h * tt) * tilt ** h for h in range(1, 12))
+        syllables = 0.6 + 0.4 * np.sin(2 * np.pi * 4.0 * tt)
+        lo = int(t * SAMPLE_RATE)
+        pcm[lo:lo + len(tt)] += (0.15 * wave * syllables).astype(np.float32)
+        turns.append((t, t + dur, idx % speakers))
+        t += dur + float(rng.uniform(0.8, 2.0))
+        idx += 1
+    return pcm, turns
+
+
+class _InProcess:
+    """The app through Starlette's test client, with stub models."""
+
+    def __init__(self):
+        if BACKEND_DIR not in sys.path:
+            sys.path.insert(0, BACKEND_DIR)
+        from fastapi.testclient import TestClient
+        from backend import get_registry
+        import app as app_module
+        install_stub_models(get_registry())
+        self._client = TestClient(app_module.app)
+        self._ws = self._client.websocket_connect("/ws/live").__enter__()
+        self.send_bytes, self.send_json, self.receive_json = self._ws.send_bytes, self._ws.send_json, self._ws.receive_json
+
+    def close(self):
+        self._ws.__exit__(None, None, None)
+
+
+class _Remote:
+    """A running server, through the ``websockets`` client."""
+
+    def __init__(self, url: str):
+        from websockets.sync.client import connect
+        self._ws = connect(url, max_size=None)
+        self.send_bytes = self._ws.send
+        self.send_json = lambda obj: self._ws.send(json.dumps(obj))
+        self.receive_json = lambda: json.loads(self._ws.recv())
+
+    def close(self):
+        self._ws.close()
+
+
+def _percentiles(values):
+    if not values:
+        return {"count": 0}
+    p = np.percentile(values, [50, 90, 99])
+    return {"count": len(values), "p50_ms": round(p[0] * 1000, 1), "p90_ms": round(p[1] * 1000, 1),
+            "p99_ms": round(p[2] * 1000, 1), "max_ms": round(max(values) * 1000, 1)}
+
+
+def replay(conn, pcm: np.ndarray, chunk_ms: float, speed: float, config: dict):
+    """Send pcm in real-time-paced chunks; returns (messages with receive times, send time per chunk)."""
+    conn.send_json(config)
+    ready = conn.receive_json()
+    if ready.get("type") != "ready":
+        raise RuntimeError(f"Server refused the stream: {ready}")
+
+    chunk = int(chunk_ms * SAMPLE_RATE / 1000)
+    samples = (np.clip(pcm, -1, 1) * 32767).astype(np.int16)
+    sent_at = []
+
+    def send():
+        t0 = time.perf_counter()
+        for i, lo in enumerate(range(0, len(samples), chunk)):
+            delay = t0 + i * chunk_ms / 1000 / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent_at.append(time.perf_counter())
+            conn.send_bytes(samples[lo:lo + chunk].tobytes())
+        conn.send_json({"type": "stop"})
+
+    sender = threading.Thread(target=send, name="live-replay", daemon=True)
+    sender.start()
+    messages = []
+    while True:
+        message = conn.receive_json()
+        message["received_at"] = time.perf_counter()
+        messages.append(message)
+        if message["type"] in ("done", "error"):
+            break
+    sender.join()
+    return messages, sent_at
+
+
+def speaker_agreement(finals, turns) -> float:
+    """Share of final segments whose label matches the true voice (first voice = "M")."""
+    hits = 0
+    for m in finals:
+        mid = (m["start"] + m["end"]) / 2
+        truth = next((v for s, e, v in turns if s - 0.5 <= mid <= e + 0.5), None)
+        hits += truth is not None and (m["speaker"] == "M") == (truth == 0)
+    return round(hits / len(finals), 3) if finals else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=60.0, help="length of the synthetic session")
+    parser.add_argument("--wav", default=None, help="replay this 16 kHz mono WAV instead")
+    parser.add_argument("--speakers", type=int, default=2)
+    parser.add_argument("--language", default="english")
+    parser.add_argument("--chunk-ms", type=float, default=100.0)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (1 = real time)")
+    parser.add_argument("--url", default=None, help="ws://host:port/ws/live of a running server")
+    args = parser.parse_args()
+
+    missing = missing_modules(["websockets"] if args.url else ["httpx", "fastapi"])
+    if missing:
+        print(json.dumps({"skipped": f"missing: {', '.join(missing)}"}))
+        return
+
+    if args.wav:
+        pcm, turns = read_wav(args.wav), None
+    else:
+        pcm, turns = two_voice_pcm(args.seconds, args.speakers)
+    conn = _Remote(args.url) if args.url else _InProcess()
+    try:
+        messages, sent_at = replay(conn, pcm, args.chunk_ms, args.speed, {
+            "language": args.language, "speakers": args.speakers, "sample_format": "s16le"})
+    finally:
+        conn.close()
+
+    # Audio time t was on the wire once the chunk containing it had been sent
+    chunk_s = args.chunk_ms / 1000
+    sent = lambda t: sent_at[min(len(sent_at) - 1, max(0, math.ceil(t / chunk_s) - 1))]
+    e2e = {"final": [], "interim": []}
+    for m in messages:
+        if m["type"] in e2e:
+            e2e[m["type"]].append(m["received_at"] - sent(m["end"]))
+    finals = [m for m in messages if m["type"] == "final"]
+    done = messages[-1]
+    print(json.dumps({
+        "audio_seconds": round(len(pcm) / SAMPLE_RATE, 2),
+        "speed": args.speed,
+        "chunk_ms": args.chunk_ms,
+        "segments": len(finals),
+        "interims": len(e2e["interim"]),
+        "speaker_agreement": speaker_agreement(finals, turns) if turns else None,
+        # from the segment's last audio being sent to its text arriving, endpointing wait included
+        "end_to_end": {kind: _percentiles(v) for kind, v in e2e.items()},
+        # from the server receiving the triggering chunk to sending the result
+        "server": done.get("latency"),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
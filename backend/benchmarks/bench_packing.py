@@ -0,0 +1,62 @@
+"""
+Per-segment vs. packed-window transcription on recordings with many short turns.
+
+Usage:
+    python -m backend.benchmarks.bench_packing --minutes 30
+    python -m backend.benchmarks.bench_packing --model tiny --minutes 5 --max-turn 3
+"""
+import argparse
+import json
+import time
+import numpy as np
+from backend.batch_transcribe import transcribe_segment_texts, pack_windows
+from backend.benchmarks.stubs import StubWhisperModel, synthetic_pcm, synthetic_segments
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=30.0)
+    parser.add_argument("--min-turn", type=float, default=1.0, help="shortest diarized turn (s)")
+    parser.add_argument("--max-turn", type=float, default=5.0, help="longest diarized turn (s)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--model", default=None, help="faster-whisper model name (default: stub)")
+    args = parser.parse_args()
+
+    if args.model:
+        from faster_whisper import WhisperModel
+        model = WhisperModel(args.model, device="cpu", compute_type="int8")
+    else:
+        model = StubWhisperModel()
+
+    seconds = args.minutes * 60
+    pcm = synthetic_pcm(seconds)
+    segments = synthetic_segments(seconds, min_turn=args.min_turn, max_turn=args.max_turn)
+    windows = pack_windows(segments)
+
+    t0 = time.perf_counter()
+    per_segment = transcribe_segment_texts(model, pcm, segments, "en", batch_size=args.batch_size)
+    per_segment_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    packed = transcribe_segment_texts(model, pcm, segments, "en", batch_size=args.batch_size, pack=True)
+    packed_s = time.perf_counter() - t0
+
+    durations = np.array([seg["end"] - seg["start"] for seg in segments])
+    window_fill = [(segments[w[-1]]["end"] - segments[w[0]]["start"]) / 30.0 for w in windows]
+    print(json.dumps({
+        "audio_seconds": seconds,
+        "segments": len(segments),
+        "median_segment_s": round(float(np.median(durations)), 2),
+        "windows": len(windows),
+        "mean_window_fill": round(float(np.mean(window_fill)), 3),
+        "per_segment_s": round(per_segment_s, 3),
+        "packed_s": round(packed_s, 3),
+        "speedup": round(per_segment_s / packed_s, 2),
+        "per_segment_words": sum(len(t.split()) for t in per_segment),
+        "packed_words": sum(len(t.split()) for t in packed),
+        "empty_segments_packed": sum(1 for t in packed if not t),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+End-to-end pipeline benchmark on CPU with stand-in models.
+
+Runs the real pipeline code (diarization post-processing, PCM slicing and
+batching in the transcribers, chunking and parsing in the translator, DOCX
+building and the /process endpoint) against deterministic stub pyannote,
+Whisper and text-generation objects, so what is measured is our own
+non-model overhead. Reports per-stage wall time, peak RSS and throughput
+as JSON.
+
+Usage:
+    python -m backend.benchmarks.bench_pipeline
+    python -m backend.benchmarks.bench_pipeline --durations 60 1800 --out bench.json
+    python -m backend.benchmarks.bench_pipeline --durations 10800 --skip-endpoint
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Isolated, cold caches for every run; must be set before the backend modules are imported
+_WORK_DIR = tempfile.mkdtemp(prefix="aren_bench_")
+for _var, _sub in (("AREN_PCM_CACHE_DIR", "pcm"), ("AREN_RESULT_CACHE_DIR", "results"),
+                   ("AREN_JOURNAL_DIR", "journals")):
+    os.environ.setdefault(_var, os.path.join(_WORK_DIR, _sub))
+
+from backend import get_registry
+from backend.diarize import postprocess_segments, run_pyannote
+from backend.transcribe_en import transcribe_en_turns, save_transcript_docx
+from backend.transcribe_ar import transcribe_arabic
+from backend.translate_ar import translate_ar
+from backend.benchmarks.harness import StageRecorder, host_info, missing_modules
+from backend.benchmarks.stubs import SAMPLE_RATE, install_stub_models, synthetic_pcm, write_wav
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(BACKEND_DIR, "Output_Template.docx")
+DEFAULT_DURATIONS = [60.0, 1800.0, 10800.0]  # 1 min, 30 min, 3 h
+
+
+@contextlib.contextmanager
+def _quiet(verbose: bool):
+    if verbose:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def bench_stages(seconds: float, stubs, speakers: int, verbose: bool) -> dict:
+    """Time each pipeline stage in-process for one synthetic recording."""
+    rec = StageRecorder()
+    pcm = synthetic_pcm(seconds)
+
+    # Diarization: stub tracks, then the real post-processing
+    if missing_modules(["torch"]):
+        raw = [{"start": t.start, "end": t.end, "speaker": label}
+               for t, _, label in stubs["pyannote"](
+                   {"waveform": pcm[None, :], "sample_rate": SAMPLE_RATE}, num_speakers=speakers
+               ).itertracks(yield_label=True)]
+    else:
+        raw = run_pyannote(pcm, speakers)
+    with _quiet(verbose), rec.stage("diarize_postprocess", items=len(raw), audio_seconds=seconds):
+        segments = postprocess_segments(raw, moderator_first=speakers > 2)
+
+    with _quiet(verbose), rec.stage("transcribe_en", items=len(segments), audio_seconds=seconds):
+        en_turns = transcribe_en_turns(None, segments, pcm=pcm)
+
+    with _quiet(verbose), rec.stage("transcribe_ar", items=len(segments), audio_seconds=seconds):
+        ar_turns = transcribe_arabic(None, segments, pcm=pcm)
+
+    with _quiet(verbose), rec.stage("translate", items=len(ar_turns), audio_seconds=seconds) as record:
+        calls_before = stubs["text_gen"].calls
+        translated = translate_ar(ar_turns, TEMPLATE_PATH, None, use_cache=False)
+        record["generate_calls"] = stubs["text_gen"].calls - calls_before
+
+    out_path = os.path.join(_WORK_DIR, "bench.docx")
+    with _quiet(verbose), rec.stage("docx", items=len(en_turns) + len(translated), audio_seconds=seconds):
+        save_transcript_docx(en_turns, TEMPLATE_PATH, out_path)
+        save_transcript_docx(translated, TEMPLATE_PATH, out_path)
+
+    return rec.stages
+
+
+def bench_endpoint(seconds: float, speakers: int, verbose: bool) -> dict:
+    """POST a synthetic WAV to /process through the ASGI test client, per language."""
+    rec = StageRecorder()
+    missing = missing_modules(["httpx", "torch", "multipart"])
+    if shutil.which("ffmpeg") is None:
+        missing.append("ffmpeg")
+    if missing:
+        rec.skip("process_endpoint", f"missing: {', '.join(missing)}")
+        return rec.stages
+
+    # app.py imports the stage modules flat, as when served from backend/
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from fastapi.testclient import TestClient
+    import app as app_module
+
+    wav_path = os.path.join(_WORK_DIR, f"synthetic_{int(seconds)}s.wav")
+    write_wav(wav_path, synthetic_pcm(seconds))
+
+    with TestClient(app_module.app) as client:
+        for language in ("english", "arabic"):
+            with open(wav_path, "rb") as f, _quiet(verbose), \
+                    rec.stage(f"process_endpoint_{language}", items=1, audio_seconds=seconds) as record:
+                resp = client.post("/process", files={"file": ("audio.wav", f, "audio/wav")},
+                                   data={"language": language, "speakers": str(speakers)})
+                record["status"] = resp.status_code
+    os.remove(wav_path)
+    return rec.stages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--durations", type=float, nargs="+", default=DEFAULT_DURATIONS,
+                        help="synthetic audio lengths in seconds")
+    parser.add_argument("--speakers", type=int, default=2)
+    parser.add_argument("--skip-endpoint", action="store_true")
+    parser.add_argument("--out", default=None, help="also write the JSON report here")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline progress output")
+    args = parser.parse_args()
+
+    stubs = install_stub_models(get_registry())
+    report = {"host": host_info(), "runs": []}
+    try:
+        for seconds in args.durations:
+            stages = bench_stages(seconds, stubs, args.speakers, args.verbose)
+            if not args.skip_endpoint:
+                stages.update(bench_endpoint(seconds, args.speakers, args.verbose))
+            report["runs"].append({"audio_seconds": seconds, "stages": stages})
+            print(f"⏱️ {seconds:.0f}s of audio done", file=sys.stderr)
+    finally:
+        shutil.rmtree(_WORK_DIR, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Translation prefill/decode time with and without the cached prompt prefix.
+
+Builds a tiny randomly initialised Llama and a tokenizer trained on the
+prompt in memory (no downloads, CPU only), and reports the time spent in
+each phase with and without the prefix cache (output equivalence is
+covered by backend/tests/test_prefix_cache.py):
+    python -m backend.benchmarks.bench_prefix_cache
+    python -m backend.benchmarks.bench_prefix_cache --chunks 16 --batch-size 4 --max-new-tokens 32
+"""
+import argparse
+import json
+import time
+from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+from backend.metrics import Trace, use_trace
+from backend.prompt_cache import PrefixCachedGenerator
+from backend.translate_ar import PROMPT_TEMPLATE, chunk_turns_by_tokens
+from backend.benchmarks.bench_translate_batch import FALLBACK_CHAT_TEMPLATE, synthetic_turns
+
+
+def tiny_tokenizer(corpus):
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+
+    tok = Tokenizer(models.BPE(unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.train_from_iterator(corpus, trainers.BpeTrainer(vocab_size=512, special_tokens=["<unk>", "<s>", "</s>"],
+                                                        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()))
+    tok.decoder = decoders.ByteLevel()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tok, bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+    tokenizer.chat_template = FALLBACK_CHAT_TEMPLATE
+    return tokenizer
+
+
+def tiny_model(tokenizer, seed: int = 0):
+    import torch
+
+    torch.manual_seed(seed)
+    config = LlamaConfig(vocab_size=len(tokenizer), hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=4096,
+                         bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id,
+                         pad_token_id=tokenizer.eos_token_id)
+    return LlamaForCausalLM(config).eval()
+
+
+def _timed(generator, dialogues, batch_size, max_new_tokens, reuse_prefix):
+    trace = Trace("bench", "arabic")
+    t0 = time.perf_counter()
+    with use_trace(trace):
+        texts = [text for lo in range(0, len(dialogues), batch_size)
+                 for text in generator.generate(dialogues[lo:lo + batch_size], max_new_tokens, reuse_prefix)]
+    stages = trace.breakdown()
+    return texts, {
+        "seconds": round(time.perf_counter() - t0, 3),
+        "prefill_s": stages.get("translate_prefill", {}).get("seconds", 0.0),
+        "decode_s": stages.get("translate_decode", {}).get("seconds", 0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--max-new-tokens", type=int, default=16)
+    args = parser.parse_args()
+
+    turns = synthetic_turns(args.chunks * 8)
+    tokenizer = tiny_tokenizer([PROMPT_TEMPLATE, *(f"{sp}: {txt}" for sp, txt in turns)])
+    tokenizer.pad_token = tokenizer.eos_token
+    dialogues = ["\n".join(f"{sp}: {txt}" for sp, txt in chunk)
+                 for chunk, _, _ in chunk_turns_by_tokens(turns, tokenizer, 300)][:args.chunks]
+    model = tiny_model(tokenizer)
+    generator = PrefixCachedGenerator(model, tokenizer, PROMPT_TEMPLATE)
+    generator.generate(dialogues[:1], 1)  # warm-up
+
+    cached, cached_times = _timed(generator, dialogues, args.batch_size, args.max_new_tokens, True)
+    full, full_times = _timed(generator, dialogues, args.batch_size, args.max_new_tokens, False)
+
+    # generate() on the same token ids, one chunk at a time
+    import torch
+
+    reference = []
+    for d in dialogues:
+        ids = generator.prompt_ids(d)
+        out = model.generate(input_ids=torch.tensor([ids]), max_new_tokens=args.max_new_tokens,
+                             do_sample=False, pad_token_id=tokenizer.eos_token_id)
+        reference.append(tokenizer.decode(out[0, len(ids):], skip_special_tokens=True))
+
+    report = {
+        "prefix_tokens": len(generator.prefix_ids),
+        "dialogue_tokens": sum(len(generator.prompt_ids(d)) - len(generator.prefix_ids) for d in dialogues),
+        "with_prefix_cache": cached_times,
+        "without_prefix_cache": full_times,
+        "identical_to_full_prefill": cached == full,
+        "identical_to_generate": cached == reference,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
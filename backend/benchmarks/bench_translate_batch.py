@@ -0,0 +1,55 @@
+"""
+Translation throughput (chunks/sec) as the generation batch size grows.
+
+Runs llm_translate_batch against a tiny local causal LM, so it works on CPU:
+    python -m backend.benchmarks.bench_translate_batch --model sshleifer/tiny-gpt2
+    python -m backend.benchmarks.bench_translate_batch --model /models/tiny-llama --batch-sizes 1 2 4 8 16
+"""
+import argparse
+import json
+import time
+from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+from backend.translate_ar import (chunk_turns_by_tokens, dialogue_token_budget, llm_translate_batch,
+                                  prompt_overhead_tokens)
+
+# Minimal template for tiny test models that ship without one
+FALLBACK_CHAT_TEMPLATE = "{% for m in messages %}{{ m['role'] }}: {{ m['content'] }}\n{% endfor %}assistant:"
+
+
+def synthetic_turns(n_turns: int):
+    words = "مرحبا كيف حالك اليوم نحن نتحدث عن المنتج الجديد والسعر والجودة".split()
+    return [("M" if i % 2 == 0 else "R", " ".join(words[(i + j) % len(words)] for j in range(40)))
+            for i in range(n_turns)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="sshleifer/tiny-gpt2")
+    parser.add_argument("--chunks", type=int, default=16)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    if tokenizer.chat_template is None:
+        tokenizer.chat_template = FALLBACK_CHAT_TEMPLATE
+    model = AutoModelForCausalLM.from_pretrained(args.model)
+    pipe = pipeline("text-generation", model=model, tokenizer=tokenizer, device="cpu")
+
+    budget = dialogue_token_budget(prompt_overhead_tokens(tokenizer))
+    chunks = chunk_turns_by_tokens(synthetic_turns(args.chunks * 8), tokenizer, budget)[:args.chunks]
+    dialogues = ["\n".join(f"{sp}: {txt}" for sp, txt in chunk) for chunk, _, _ in chunks]
+
+    llm_translate_batch(pipe, dialogues[:1], batch_size=1, max_new_tokens=args.max_new_tokens)  # warm-up
+    results = []
+    for bs in args.batch_sizes:
+        t0 = time.perf_counter()
+        llm_translate_batch(pipe, dialogues, batch_size=bs, max_new_tokens=args.max_new_tokens)
+        elapsed = time.perf_counter() - t0
+        results.append({"batch_size": bs, "chunks": len(dialogues), "seconds": round(elapsed, 3),
+                        "chunks_per_s": round(len(dialogues) / elapsed, 2)})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
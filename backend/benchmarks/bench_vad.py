@@ -0,0 +1,81 @@
+"""
+Transcription time with and without the VAD pre-filter on recordings with long pauses.
+
+Usage:
+    python -m backend.benchmarks.bench_vad --minutes 30
+    python -m backend.benchmarks.bench_vad --model tiny --minutes 5 --max-pause 10
+"""
+import argparse
+import json
+import time
+import numpy as np
+from backend.batch_transcribe import transcribe_segment_texts
+from backend.vad import VadConfig, detect_speech
+from backend.benchmarks.stubs import SAMPLE_RATE, StubWhisperModel, synthetic_pcm, synthetic_segments
+
+
+def paused_pcm(seconds: float, max_pause: float, seed: int = 0) -> np.ndarray:
+    """Speech-like audio where 1-6 s bursts alternate with 0.5-max_pause s of room noise."""
+    rng = np.random.default_rng(seed)
+    pcm = synthetic_pcm(seconds, seed=seed)
+    t, n = 0.0, len(pcm)
+    while t < seconds:
+        t += float(rng.uniform(1.0, 6.0))
+        pause = float(rng.uniform(0.5, max_pause))
+        lo, hi = int(t * SAMPLE_RATE), min(n, int((t + pause) * SAMPLE_RATE))
+        pcm[lo:hi] = rng.normal(0, 0.002, max(0, hi - lo))
+        t += pause
+    return pcm
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=30.0)
+    parser.add_argument("--max-pause", type=float, default=8.0, help="longest pause between bursts (s)")
+    parser.add_argument("--margin-db", type=float, default=VadConfig.margin_db)
+    parser.add_argument("--min-silence-ms", type=float, default=VadConfig.min_silence_ms)
+    parser.add_argument("--model", default=None, help="faster-whisper model name (default: stub)")
+    args = parser.parse_args()
+
+    if args.model:
+        from faster_whisper import WhisperModel
+        model = WhisperModel(args.model, device="cpu", compute_type="int8")
+    else:
+        model = StubWhisperModel()
+
+    seconds = args.minutes * 60
+    pcm = paused_pcm(seconds, args.max_pause)
+    segments = synthetic_segments(seconds, min_turn=2.0, max_turn=20.0)  # long, gap-filled turns
+    config = VadConfig(margin_db=args.margin_db, min_silence_ms=args.min_silence_ms)
+
+    t0 = time.perf_counter()
+    _, report = detect_speech(pcm, segments, config)
+    vad_s = time.perf_counter() - t0
+
+    results = {}
+    for pack in (False, True):
+        for vad in (None, config):
+            t0 = time.perf_counter()
+            texts = transcribe_segment_texts(model, pcm, segments, "en", pack=pack, vad=vad)
+            results[f"{'packed' if pack else 'per_segment'}{'_vad' if vad else ''}"] = {
+                "seconds": round(time.perf_counter() - t0, 3),
+                "words": sum(len(t.split()) for t in texts),
+            }
+
+    print(json.dumps({
+        "audio_seconds": seconds,
+        "segments": len(segments),
+        "vad_seconds": round(vad_s, 4),
+        "vad_x_realtime": round(seconds / vad_s, 1),
+        "removed_seconds": report["removed_seconds"],
+        "removed_fraction": round(report["removed_seconds"] / report["input_seconds"], 3),
+        "dropped_segments": report["dropped"],
+        "threshold_db": report["threshold_db"],
+        "modes": results,
+        "speedup_per_segment": round(results["per_segment"]["seconds"] / results["per_segment_vad"]["seconds"], 2),
+        "speedup_packed": round(results["packed"]["seconds"] / results["packed_vad"]["seconds"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Per-stage wall time, peak RSS and throughput recording for benchmarks."""
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+
+RSS_SAMPLE_SECONDS = 0.01
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (Linux /proc; falls back to the lifetime peak)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _RssSampler(threading.Thread):
+    """Polls RSS in the background so short-lived peaks inside a stage are seen."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak = current_rss_bytes()
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def stop(self) -> int:
+        self._halt.set()
+        self.join()
+        self.peak = max(self.peak, current_rss_bytes())
+        return self.peak
+
+
+class StageRecorder:
+    """
+    Collects one record per measured stage.
+
+    Each record has wall_s, rss_start_mb, peak_rss_mb, items and items_per_s,
+    plus x_realtime (audio seconds processed per wall second) when the audio
+    length is given.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0, audio_seconds: Optional[float] = None):
+        record: Dict = {"items": items}
+        sampler = _RssSampler()
+        rss_start = sampler.peak
+        sampler.start()
+        t0 = time.perf_counter()
+        try:
+            yield record  # the block may update record["items"] or add fields
+        finally:
+            wall = time.perf_counter() - t0
+            peak = sampler.stop()
+            record.update({
+                "wall_s": round(wall, 4),
+                "rss_start_mb": round(rss_start / 2 ** 20, 1),
+                "peak_rss_mb": round(peak / 2 ** 20, 1),
+            })
+            if record["items"] and wall > 0:
+                record["items_per_s"] = round(record["items"] / wall, 2)
+            if audio_seconds and wall > 0:
+                record["x_realtime"] = round(audio_seconds / wall, 1)
+            self.stages[name] = record
+
+    def skip(self, name: str, reason: str):
+        self.stages[name] = {"skipped": reason}
+
+
+def host_info() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def missing_modules(names: List[str]) -> List[str]:
+    """Modules from names that cannot be imported here."""
+    import importlib.util
+
+    return [name for name in names if importlib.util.find_spec(name) is None]
@@ -0,0 +1,186 @@
+"""Deterministic stand-ins for the heavy models, for CPU-only benchmarks."""
+from collections import namedtuple
+from typing import Dict, List
+import wave
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+Segment = namedtuple("Segment", ["start", "end", "text", "words"], defaults=[None])
+Word = namedtuple("Word", ["start", "end", "word", "probability"])
+
+
+def synthetic_pcm(seconds: float, seed: int = 0, block_seconds: float = 60.0) -> np.ndarray:
+    """Speech-like float32 PCM: tone bursts separated by near-silent pauses.
+
+    Generated block by block so hours of audio only cost the output buffer.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    out = np.empty(n, dtype=np.float32)
+    step = int(block_seconds * SAMPLE_RATE)
+    for lo in range(0, n, step):
+        hi = min(n, lo + step)
+        t = np.arange(lo, hi, dtype=np.float64) / SAMPLE_RATE
+        envelope = np.sin(2 * np.pi * 0.15 * t) > -0.3
+        out[lo:hi] = 0.3 * np.sin(2 * np.pi * 180.0 * t) * envelope
+        out[lo:hi] += rng.normal(0, 0.003, hi - lo)
+    return out
+
+
+def synthetic_segments(seconds: float, speakers: int = 2, seed: int = 0,
+                       min_turn: float = 1.0, max_turn: float = 8.0) -> List[Dict]:
+    """Alternating diarized turns of min_turn-max_turn s covering ``seconds`` of audio."""
+    rng = np.random.default_rng(seed)
+    segments, t, idx = [], 0.0, 0
+    while t < seconds:
+        dur = float(rng.uniform(min_turn, max_turn))
+        end = min(seconds, t + dur)
+        segments.append({"start": t, "end": end, "speaker": "M" if idx % speakers == 0 else "R"})
+        t = end + float(rng.uniform(0.0, 0.5))
+        idx += 1
+    return segments
+
+
+def read_wav(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        frames = wf.readframes(wf.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def write_wav(path: str, pcm: np.ndarray) -> None:
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes((np.clip(pcm, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+class StubWhisperModel:
+    """
+    Mimics ``faster_whisper.WhisperModel.transcribe``.
+
+    Every call pays a fixed cost for a padded 30 s window (like the real
+    encoder) and returns one word per second of input audio.
+    """
+
+    def __init__(self, window_seconds: float = 30.0):
+        self.window = int(window_seconds * SAMPLE_RATE)
+        self.calls = 0
+
+    def transcribe(self, audio, language: str = "en", beam_size: int = 5, word_timestamps: bool = False, **kwargs):
+        self.calls += 1
+        if isinstance(audio, str):
+            audio = read_wav(audio)
+        for offset in range(0, max(1, len(audio)), self.window):  # one encoder pass per 30 s window
+            padded = np.zeros(self.window, dtype=np.float32)
+            piece = audio[offset:offset + self.window]
+            padded[:len(piece)] = piece
+            np.abs(np.fft.rfft(padded))  # stand-in for the encoder pass
+        seconds = len(audio) / SAMPLE_RATE
+        n_words = max(1, int(seconds))
+        step = seconds / n_words
+        words = [Word(i * step, (i + 1) * step, f" w{i}", 1.0) for i in range(n_words)] if word_timestamps else None
+        text = "".join(f" w{i}" for i in range(n_words))
+        return iter([Segment(0.0, seconds, text, words)]), {"language": language}
+
+
+Turn = namedtuple("Turn", ["start", "end"])
+
+
+class StubAnnotation:
+    """The part of ``pyannote.core.Annotation`` the pipeline reads."""
+
+    def __init__(self, tracks: List[Dict]):
+        self.tracks = tracks
+
+    def itertracks(self, yield_label: bool = False):
+        for i, t in enumerate(self.tracks):
+            turn = Turn(t["start"], t["end"])
+            yield (turn, i, t["speaker"]) if yield_label else (turn, i)
+
+
+class StubPyannotePipeline:
+    """
+    Mimics the pyannote diarization pipeline.
+
+    Returns pyannote-like raw tracks for the length of the input: mostly
+    sequential turns with overlaps and short blips, seeded by the duration
+    so repeated runs are identical.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self.calls = 0
+
+    def __call__(self, audio, num_speakers: int = 2, **kwargs) -> StubAnnotation:
+        self.calls += 1
+        waveform = audio["waveform"] if isinstance(audio, dict) else read_wav(audio)
+        seconds = np.asarray(waveform).shape[-1] / SAMPLE_RATE
+        rng = np.random.default_rng(self.seed + int(seconds))
+        n = max(1, int(seconds / 1.5))
+        starts = np.cumsum(rng.exponential(1.5, n))
+        durations = np.where(rng.random(n) < 0.2, rng.uniform(0.05, 0.6, n), rng.uniform(0.6, 6.0, n))
+        labels = rng.integers(0, max(1, num_speakers), n)
+        keep = starts < seconds
+        return StubAnnotation([
+            {"start": float(s), "end": float(min(seconds, s + d)), "speaker": f"SPEAKER_{l:02d}"}
+            for s, d, l in zip(starts[keep], durations[keep], labels[keep])
+        ])
+
+
+class StubTokenizer:
+    """Roughly one token per four characters of each word, so Arabic words cost unevenly."""
+
+    pad_token_id = None
+    eos_token = "</s>"
+    pad_token = None
+    padding_side = "right"
+
+    def __call__(self, text: str, add_special_tokens: bool = True):
+        ids = [0] * sum(len(word) // 4 + 1 for word in text.split())
+        return {"input_ids": ids}
+
+
+class StubTextGenPipeline:
+    """
+    Mimics a HuggingFace chat text-generation pipeline used for translation.
+
+    "Translates" each "SPEAKER: text" line of the prompt's dialogue into as
+    many placeholder English words, keeping the speaker labels.
+    """
+
+    def __init__(self):
+        self.tokenizer = StubTokenizer()
+        self.calls = 0
+
+    def _translate(self, prompt: str, max_new_tokens: int) -> str:
+        dialogue = prompt.rsplit("Now translate this part:\n", 1)[-1]
+        lines, budget = [], max_new_tokens
+        for line in dialogue.splitlines():
+            speaker, _, text = line.partition(":")
+            words = [f"en{i}" for i, _ in enumerate(text.split())][:max(0, budget - 1)]
+            budget -= len(words) + 1  # one token for the speaker label
+            lines.append(f"{speaker}: " + " ".join(words))
+            if budget <= 0:  # cut off like a real generation that ran out of tokens
+                break
+        return "\n".join(lines)
+
+    def __call__(self, conversations, batch_size: int = 1, max_new_tokens: int = 1024, **kwargs):
+        self.calls += 1
+        return [[{"generated_text": self._translate(conv[-1]["content"], max_new_tokens)}]
+                for conv in conversations]
+
+
+def install_stub_models(registry) -> Dict[str, object]:
+    """Register the stand-ins under the real model names, replacing the real factories."""
+    stubs = {
+        "pyannote": StubPyannotePipeline(),
+        "levantine_whisper": StubWhisperModel(),
+        "large_whisper": StubWhisperModel(),
+        "text_gen": StubTextGenPipeline(),
+    }
+    stubs["text_gen_tokenizer"] = stubs["text_gen"].tokenizer
+    for name, stub in stubs.items():
+        registry.register(name, lambda stub=stub: stub, size_bytes=0)
+    return stubs
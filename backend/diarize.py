@@ -1,36 +1,71 @@
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
+from contextlib import nullcontext
 import os
-import torch
 import json
-from pydub import AudioSegment
-from pyannote.audio import Pipeline
-from backend import get_pyannote_pipeline
+import time
+import numpy as np
+from backend import use_model, PYANNOTE_MODEL_ID
+from backend.pcm import SAMPLE_RATE, load_pcm
+from backend.result_cache import get_result_cache, make_key
+from backend.intervals import IntervalConfig, postprocess
+from backend.metrics import span
+from backend.speakers import SPEAKER_EMBEDDING, embed_clips
+from backend.vad import VAD_CONFIG, detect_speech
 
+# --- Post-processing thresholds (seconds) ---
+DIARIZATION_CONFIG = IntervalConfig(
+    min_duration=float(os.environ.get("AREN_MIN_SEGMENT_SECONDS", "0.6")),
+    gap_threshold=float(os.environ.get("AREN_GAP_FILL_SECONDS", "3.0")),
+    gap_tolerance=float(os.environ.get("AREN_MERGE_GAP_SECONDS", "1.0")),
+)
 
-# Convert input audio → WAV
-print("🔁 Converting audio to WAV...")
-audio = AudioSegment.from_file(file_path)
-audio.export(wav_path, format="wav")
+# --- Windowed diarization config ---
+WINDOW_SECONDS = 600.0          # audio handed to pyannote per call
+WINDOW_OVERLAP_SECONDS = 30.0   # shared region used to stitch speaker identities
+STREAM_HOLD_SECONDS = 5.0       # segments this close to the frontier may still merge, so hold them back
 
-# Load PyAnnote Pipeline
-pipeline = get_pyannote_pipeline()
+# --- Tiered diarization config ---
+DIARIZATION_MODES = ("full", "tiered")
+FAST_WINDOW_SECONDS = 1.5       # speech embedded per speaker decision
+FAST_STEP_SECONDS = 0.75
+FAST_EMBED_BATCH = 32
+# Distance between the two speaker centroids, in units of the spread inside a speaker, that the
+# two-speaker pass needs to skip pyannote (one voice split in two lands around 1-2); each
+# speaker must also hold FAST_MIN_SHARE of the speech
+FAST_MIN_SEPARATION = {"pyannote": 2.0, "spectral": 4.0}
+if os.environ.get("AREN_FAST_DIARIZATION_SEPARATION"):
+    FAST_MIN_SEPARATION = dict.fromkeys(FAST_MIN_SEPARATION, float(os.environ["AREN_FAST_DIARIZATION_SEPARATION"]))
+FAST_MIN_SHARE = 0.05
+# pyannote seconds per audio second, used for speedup estimates until a full run has been timed here
+_pyannote_rtf = float(os.environ.get("AREN_PYANNOTE_RTF", "0.03"))
 
-def diarize_audio(file_path: str, moderator_first: bool = False, speakers: int = 1) -> List[Dict]:
+
+def run_pyannote(pcm: np.ndarray, speakers: int = 1) -> List[Dict]:
     """
-    Perform speaker diarization on an audio file.
+    Run the PyAnnote pipeline on decoded PCM and return its raw tracks.
 
     Args:
-        file_path (str): Path to the input audio file (MP3/M4A/etc.).
-        moderator_first (bool): Whether the first speaker is the moderator. Default False.
-        speakers (int): Number of speakers expected. Default 1.
+        pcm (np.ndarray): 16 kHz mono float32 samples.
+        speakers (int): Number of speakers expected.
 
     Returns:
-        List[Dict]: List of diarized segments with start, end, and speaker labels.
+        List[Dict]: Raw {start, end, speaker} tracks with PyAnnote labels (may overlap).
     """
-    
-    # Run diarization
-    print("🧠 Running diarization...")
-    diarization = pipeline(wav_path, num_speakers=speakers)
+    import torch
+
+    # pyannote accepts an in-memory waveform dict, no WAV export needed
+    waveform = torch.from_numpy(pcm).unsqueeze(0)
+
+    # Load PyAnnote Pipeline (leased, so the registry cannot evict it mid-run)
+    global _pyannote_rtf
+    with use_model("pyannote") as pipeline:
+        # Run diarization
+        print("🧠 Running diarization...")
+        t0 = time.perf_counter()
+        with span("pyannote"):
+            diarization = pipeline({"waveform": waveform, "sample_rate": SAMPLE_RATE}, num_speakers=speakers)
+        if len(pcm) >= 60 * SAMPLE_RATE:  # short clips are dominated by fixed overhead
+            _pyannote_rtf = 0.7 * _pyannote_rtf + 0.3 * (time.perf_counter() - t0) / (len(pcm) / SAMPLE_RATE)
 
     # Extract raw segments
     raw_segments = []
@@ -40,97 +75,399 @@ def diarize_audio(file_path: str, moderator_first: bool = False, speakers: int =
             "end": float(turn.end),
             "speaker": speaker
         })
+    return raw_segments
 
-    # --- Resolve overlaps ---
-    def resolve_overlaps(segments):
-        segments = sorted(segments, key=lambda x: x["start"])
-        output = []
-
-        for seg in segments:
-            if not output:
-                output.append(seg)
-                continue
-
-            last = output[-1]
-
-            # Case 1: No overlap
-            if seg["start"] >= last["end"]:
-                output.append(seg)
-
-            # Case 2: seg fully inside last → split last into 3 parts
-            elif seg["end"] <= last["end"]:
-                if seg["start"] > last["start"]:
-                    before = {"start": last["start"], "end": seg["start"], "speaker": last["speaker"]}
-                    output[-1] = before
-                output.append(seg)
-                if seg["end"] < last["end"]:
-                    after = {"start": seg["end"], "end": last["end"], "speaker": last["speaker"]}
-                    output.append(after)
-
-            # Case 3: Partial overlap
-            else:
-                if seg["start"] > last["start"]:
-                    output[-1] = {"start": last["start"], "end": seg["start"], "speaker": last["speaker"]}
-                output.append(seg)
 
-        return output
+def diarize_audio(
+    file_path: str,
+    moderator_first: bool = False,
+    speakers: int = 1,
+    pcm: Optional[np.ndarray] = None,
+    audio_hash: Optional[str] = None,
+    window_s: Optional[float] = None,
+    config: Optional[IntervalConfig] = None,
+    mode: str = "full",
+) -> List[Dict]:
+    """
+    Perform speaker diarization on an audio file.
+
+    Args:
+        file_path (str): Path to the input audio file (MP3/M4A/etc.).
+        moderator_first (bool): Whether the first speaker is the moderator. Default False.
+        speakers (int): Number of speakers expected. Default 1.
+        pcm (np.ndarray, optional): Already decoded 16 kHz mono PCM; decoded from file_path if None.
+        audio_hash (str, optional): Content hash of the audio; enables the result cache.
+        window_s (float, optional): Diarize in overlapping windows of this length (bounded memory,
+            see ``diarize_stream``) instead of one pyannote call over the whole file.
+        config (IntervalConfig, optional): Post-processing thresholds; defaults to DIARIZATION_CONFIG.
+        mode (str): "full" always runs pyannote; "tiered" tries ``diarize_fast`` first.
+
+    Returns:
+        List[Dict]: List of diarized segments with start, end, and speaker labels.
+    """
+    if mode == "tiered":
+        if pcm is None:
+            pcm = load_pcm(file_path)
+        segments, _ = diarize_fast(pcm, moderator_first, speakers, audio_hash=audio_hash, config=config)
+        if segments is not None:
+            return segments
 
-    non_overlapping_segments = resolve_overlaps(raw_segments)
+    if window_s:
+        if pcm is None:
+            pcm = load_pcm(file_path)
+        return [seg for block in diarize_stream(pcm, moderator_first, speakers, window_s=window_s,
+                                                audio_hash=audio_hash) for seg in block]
 
-    # --- Assign Moderator (M) and Respondents (R) ---
-    moderator_speaker_id = non_overlapping_segments[0]["speaker"] if non_overlapping_segments else None
-    for seg in non_overlapping_segments:
-        if moderator_first:
-            seg["speaker"] = "M" if seg["speaker"] == moderator_speaker_id else f"R{seg['speaker']}"
-        else:
-            seg["speaker"] = "M" if seg["speaker"] == moderator_speaker_id else "R"
-
-    # --- Merge short segments (< 0.6s) ---
-    min_duration = 0.6
-    def merge_short_segments(segments, min_duration):
-        if not segments:
-            return []
-        merged = [segments[0]]
-        for seg in segments[1:]:
-            last = merged[-1]
-            seg_duration = seg["end"] - seg["start"]
-            if seg_duration < min_duration:
-                if seg["speaker"] == last["speaker"]:
-                    last["end"] = seg["end"]
-                else:
-                    last["end"] = seg["end"]
-            else:
-                merged.append(seg)
-        return merged
-
-    shortmerged_segments = merge_short_segments(non_overlapping_segments, min_duration)
-
-    # --- Merge gaps into previous speaker ---
-    gapinclusive_segments = []
-    gap_threshold = 3.0
-    for i, seg in enumerate(shortmerged_segments):
-        if i > 0:
-            prev = gapinclusive_segments[-1]
-            gap = seg["start"] - prev["end"]
-            if gap > min_duration and gap <= gap_threshold:
-                prev["end"] = seg["start"]
-        gapinclusive_segments.append(seg)
-
-    # --- Merge adjacent same-speaker segments ---
-    def merge_adjacent_segments(segments, gap_tolerance=1):
-        if not segments:
-            return []
-        merged = [segments[0]]
-        for seg in segments[1:]:
-            last = merged[-1]
-            if seg["speaker"] == last["speaker"] and seg["start"] - last["end"] <= gap_tolerance:
-                merged[-1]["end"] = max(last["end"], seg["end"])
-            else:
-                merged.append(seg)
-        return merged
+    # Raw PyAnnote tracks only depend on the audio and speaker count,
+    # so they are cached before the M/R relabeling below.
+    cache_key = make_key(stage="diarization", audio=audio_hash, speakers=speakers,
+                         model=PYANNOTE_MODEL_ID) if audio_hash else None
+    raw_segments = get_result_cache().get("diarization", cache_key) if cache_key else None
+
+    if raw_segments is None:
+        if pcm is None:
+            pcm = load_pcm(file_path)
+        raw_segments = run_pyannote(pcm, speakers)
+        if cache_key:
+            get_result_cache().put("diarization", cache_key, raw_segments)
+    else:
+        print(f"♻️ Reusing cached diarization ({len(raw_segments)} tracks)")
 
-    merged_segments = merge_adjacent_segments(gapinclusive_segments)
+    return postprocess_segments(raw_segments, moderator_first, config=config)
+
+
+def postprocess_segments(
+    raw_segments: List[Dict],
+    moderator_first: bool = False,
+    moderator_speaker_id: Optional[str] = None,
+    config: Optional[IntervalConfig] = None,
+) -> List[Dict]:
+    """
+    Turn raw PyAnnote tracks into non-overlapping, merged M/R segments.
+
+    Passes (see backend.intervals): resolve overlaps, assign Moderator (M) and
+    Respondents (R), merge short segments (< min_duration), give gaps up to
+    gap_threshold to the previous speaker, merge adjacent same-speaker segments.
+
+    Args:
+        raw_segments (List[Dict]): Raw {start, end, speaker} tracks.
+        moderator_first (bool): Whether the first speaker is the moderator.
+        moderator_speaker_id (str, optional): PyAnnote label of the moderator; defaults to
+            the first speaker in raw_segments.
+        config (IntervalConfig, optional): Thresholds; defaults to DIARIZATION_CONFIG.
+
+    Returns:
+        List[Dict]: Cleaned segments labelled "M" / "R" (or "R<label>").
+    """
+    with span("diarize_postprocess", items=len(raw_segments)):
+        merged_segments = postprocess(raw_segments, moderator_first, config or DIARIZATION_CONFIG,
+                                      moderator_speaker_id=moderator_speaker_id)
 
     print(f"✅ {len(merged_segments)} segments kept (after filtering + gap filling)")
 
     return merged_segments
+
+
+# --------------------------
+# Windowed (streaming) diarization
+# --------------------------
+def _overlap(a: Dict, b: Dict, lo: float, hi: float) -> float:
+    return max(0.0, min(a["end"], b["end"], hi) - max(a["start"], b["start"], lo))
+
+
+def _stitch_labels(prev_tracks: List[Dict], new_tracks: List[Dict], lo: float, hi: float,
+                   known_labels: List[str], speakers: int) -> Dict[str, str]:
+    """
+    Map a window's local PyAnnote labels onto global labels.
+
+    Local labels are matched one-to-one to the global label they share the
+    most speech time with inside the overlap region [lo, hi]. Unmatched
+    labels reuse a free global label while the speaker count allows it,
+    otherwise they get a new one.
+    """
+    scores: Dict[tuple, float] = {}
+    for new in new_tracks:
+        for prev in prev_tracks:
+            ov = _overlap(new, prev, lo, hi)
+            if ov > 0:
+                key = (new["speaker"], prev["speaker"])
+                scores[key] = scores.get(key, 0.0) + ov
+
+    mapping: Dict[str, str] = {}
+    used = set()
+    for (local, glob), _ in sorted(scores.items(), key=lambda kv: -kv[1]):
+        if local not in mapping and glob not in used:
+            mapping[local] = glob
+            used.add(glob)
+
+    for local in sorted({t["speaker"] for t in new_tracks} - set(mapping)):
+        free = [g for g in known_labels if g not in used]
+        if free and len(known_labels) >= speakers:
+            glob = free[0]
+        else:
+            glob = f"SPEAKER_{len(known_labels):02d}"
+            known_labels.append(glob)
+        mapping[local] = glob
+        used.add(glob)
+    return mapping
+
+
+def iter_windowed_tracks(
+    pcm: np.ndarray,
+    speakers: int = 1,
+    window_s: float = WINDOW_SECONDS,
+    overlap_s: float = WINDOW_OVERLAP_SECONDS,
+) -> Iterator[tuple]:
+    """
+    Diarize fixed-length overlapping windows and yield stitched raw tracks.
+
+    Each window owns the span between the midpoints of its overlaps with
+    its neighbours; tracks are clipped to that span so nothing is emitted
+    twice. Only one window of audio and tracks is held at a time.
+
+    Yields:
+        tuple: (tracks with global labels, frontier in seconds up to which tracks are final).
+    """
+    duration = len(pcm) / SAMPLE_RATE
+    step = max(1.0, window_s - overlap_s)
+    known_labels: List[str] = []
+    prev_tracks: List[Dict] = []
+    w_start = 0.0
+
+    while True:
+        w_end = min(duration, w_start + window_s)
+        view = pcm[int(w_start * SAMPLE_RATE):int(w_end * SAMPLE_RATE)]
+        tracks = [{"start": t["start"] + w_start, "end": t["end"] + w_start, "speaker": t["speaker"]}
+                  for t in run_pyannote(view, speakers)]
+
+        mapping = _stitch_labels(prev_tracks, tracks, w_start, w_start + overlap_s, known_labels, speakers)
+        for t in tracks:
+            t["speaker"] = mapping[t["speaker"]]
+
+        last = w_end >= duration
+        own_start = w_start + overlap_s / 2 if w_start > 0 else 0.0
+        own_end = duration if last else w_start + step + overlap_s / 2
+        owned = []
+        for t in tracks:
+            start, end = max(t["start"], own_start), min(t["end"], own_end)
+            if end > start:
+                owned.append({"start": start, "end": end, "speaker": t["speaker"]})
+
+        print(f"🧠 Diarized window {w_start:.0f}-{w_end:.0f}s ({len(owned)} tracks)")
+        yield owned, own_end
+
+        if last:
+            return
+        prev_tracks = [t for t in tracks if t["end"] > w_start + step]
+        w_start += step
+
+
+def diarize_stream(
+    pcm: np.ndarray,
+    moderator_first: bool = False,
+    speakers: int = 1,
+    window_s: float = WINDOW_SECONDS,
+    overlap_s: float = WINDOW_OVERLAP_SECONDS,
+    audio_hash: Optional[str] = None,
+) -> Iterator[List[Dict]]:
+    """
+    Windowed diarization for long recordings, yielding finished segments as it goes.
+
+    Post-processing runs on a rolling tail of raw tracks, so peak memory stays
+    flat with recording length and transcription can start on the first
+    window. Segments may differ slightly from ``diarize_audio`` at window seams.
+
+    Args:
+        pcm (np.ndarray): 16 kHz mono float32 samples (may be a memmap).
+        moderator_first (bool): Whether the first speaker is the moderator.
+        speakers (int): Number of speakers expected.
+        window_s (float): Window length in seconds.
+        overlap_s (float): Overlap between consecutive windows in seconds.
+        audio_hash (str, optional): Content hash of the audio; enables the result cache.
+
+    Yields:
+        List[Dict]: Blocks of diarized {start, end, speaker} segments, in time order.
+    """
+    cache_key = make_key(stage="diarization", audio=audio_hash, speakers=speakers, model=PYANNOTE_MODEL_ID,
+                         window=window_s, overlap=overlap_s) if audio_hash else None
+    cached = get_result_cache().get("diarization", cache_key) if cache_key else None
+    if cached is not None:
+        print(f"♻️ Reusing cached diarization ({len(cached)} tracks)")
+        yield postprocess_segments(cached, moderator_first)
+        return
+
+    all_raw: List[Dict] = []
+    pending: List[Dict] = []
+    moderator_id = None
+
+    for tracks, frontier in iter_windowed_tracks(pcm, speakers, window_s, overlap_s):
+        all_raw.extend(tracks)
+        pending.extend(tracks)
+        if moderator_id is None and pending:
+            moderator_id = min(pending, key=lambda t: t["start"])["speaker"]
+
+        segments = postprocess_segments(pending, moderator_first, moderator_speaker_id=moderator_id)
+        final_end = frontier >= len(pcm) / SAMPLE_RATE
+        ready = segments if final_end else [s for s in segments if s["end"] <= frontier - STREAM_HOLD_SECONDS]
+        if not ready:
+            continue
+        yield ready
+
+        # Keep only the raw tracks not yet covered by emitted segments
+        cut = ready[-1]["end"]
+        pending = [{**t, "start": max(t["start"], cut)} for t in pending if t["end"] > cut]
+
+    if cache_key:
+        get_result_cache().put("diarization", cache_key, all_raw)
+
+
+# --------------------------
+# Tiered (fast) diarization
+# --------------------------
+def speech_windows(spans: List[Tuple[float, float]], window_s: float = FAST_WINDOW_SECONDS,
+                   step_s: float = FAST_STEP_SECONDS) -> List[Tuple[float, float]]:
+    """Overlapping windows over each speech span; spans shorter than a window are one window."""
+    windows = []
+    for start, end in spans:
+        if end - start <= window_s:
+            windows.append((start, end))
+            continue
+        n = int(np.ceil((end - start - window_s) / step_s)) + 1
+        for i in range(n):
+            w_start = min(start + i * step_s, end - window_s)
+            windows.append((w_start, w_start + window_s))
+    return windows
+
+
+def two_means(embeddings: np.ndarray, iterations: int = 20) -> Tuple[np.ndarray, float, float]:
+    """
+    Split unit-length embeddings into two speakers by spherical k-means.
+
+    Returns:
+        Tuple[np.ndarray, float, float]: (0/1 label per row, separation, share of the smaller cluster).
+            Separation is the distance between the cluster means over the RMS distance of rows to
+            their own mean: large for two distinct voices, small when one voice was split in two.
+    """
+    far = int(np.argmin(embeddings @ embeddings.mean(axis=0)))  # least typical row, then its opposite
+    centroids = np.stack([embeddings[far], embeddings[int(np.argmin(embeddings @ embeddings[far]))]])
+    labels = np.zeros(len(embeddings), dtype=np.int64)
+    for it in range(iterations):
+        new = np.argmax(embeddings @ centroids.T, axis=1)
+        if it and (new == labels).all():
+            break
+        labels = new
+        for k in range(2):
+            if (labels == k).any():
+                c = embeddings[labels == k].mean(axis=0)
+                centroids[k] = c / (np.linalg.norm(c) + 1e-9)
+    share = float(min(labels.mean(), 1 - labels.mean()))
+    if share == 0.0:
+        return labels, 0.0, share
+    means = np.stack([embeddings[labels == k].mean(axis=0) for k in range(2)])
+    within = np.sqrt(np.mean(np.sum((embeddings - means[labels]) ** 2, axis=1)))
+    return labels, float(np.linalg.norm(means[0] - means[1]) / max(within, 1e-9)), share
+
+
+def _window_tracks(spans: List[Tuple[float, float]], windows: List[Tuple[float, float]],
+                   labels: np.ndarray) -> List[Dict]:
+    """Raw tracks from labelled windows: each window owns up to the midpoints with its neighbours."""
+    tracks, i = [], 0
+    for start, end in spans:
+        j = i
+        while j < len(windows) and windows[j][1] <= end + 1e-6:
+            j += 1
+        mids = [(a + b) / 2 for a, b in windows[i:j]]
+        bounds = [start] + [(x + y) / 2 for x, y in zip(mids, mids[1:])] + [end]
+        for k in range(i, j):
+            lo, hi, speaker = bounds[k - i], bounds[k - i + 1], f"SPEAKER_{int(labels[k]):02d}"
+            if tracks and tracks[-1]["speaker"] == speaker and abs(tracks[-1]["end"] - lo) < 1e-6:
+                tracks[-1]["end"] = hi
+            else:
+                tracks.append({"start": lo, "end": hi, "speaker": speaker})
+        i = j
+    return tracks
+
+
+def estimated_pyannote_seconds(audio_seconds: float) -> float:
+    return _pyannote_rtf * audio_seconds
+
+
+def diarize_fast(
+    pcm: np.ndarray,
+    moderator_first: bool = False,
+    speakers: int = 1,
+    audio_hash: Optional[str] = None,
+    config: Optional[IntervalConfig] = None,
+) -> Tuple[Optional[List[Dict]], Dict]:
+    """
+    Diarize without the full pyannote pipeline when the recording is easy.
+
+    One speaker: the VAD speech spans are the segments. Two speakers: speech
+    is cut into short overlapping windows, each window is embedded (pyannote's
+    own embedding model, or a cepstral summary) and the windows are split in
+    two; if the two sides are not clearly separated (see FAST_MIN_SEPARATION),
+    or one side holds almost no speech, the caller should run full pyannote
+    instead. Three or more speakers always go to pyannote.
+
+    Args:
+        pcm (np.ndarray): 16 kHz mono float32 samples.
+        moderator_first (bool): Whether the first speaker is the moderator.
+        speakers (int): Number of speakers expected.
+        audio_hash (str, optional): Content hash of the audio; enables the result cache.
+        config (IntervalConfig, optional): Post-processing thresholds; defaults to DIARIZATION_CONFIG.
+
+    Returns:
+        Tuple[Optional[List[Dict]], Dict]: Segments in the ``diarize_audio`` format, or None when
+            pyannote is needed, and a report with the tier used, the separation and the estimated
+            speedup over pyannote.
+    """
+    audio_seconds = len(pcm) / SAMPLE_RATE
+    report = {"mode": "tiered", "speakers": speakers, "audio_seconds": round(audio_seconds, 2)}
+    if speakers > 2:
+        return None, {**report, "tier": "pyannote", "reason": "more than two speakers"}
+
+    cache_key = make_key(stage="diarization", audio=audio_hash, speakers=speakers, mode="tiered",
+                         embedding=SPEAKER_EMBEDDING, separation=FAST_MIN_SEPARATION) if audio_hash else None
+    cached = get_result_cache().get("diarization", cache_key) if cache_key else None
+    if cached is not None:
+        print(f"♻️ Reusing cached fast diarization ({cached['report']['tier']})")
+        tracks = cached["tracks"]
+        return (postprocess_segments(tracks, moderator_first, config=config) if tracks is not None else None,
+                {**cached["report"], "cached": True})
+
+    t0 = time.perf_counter()
+    with span("diarize_fast"):
+        spans, _ = detect_speech(pcm, [{"start": 0.0, "end": audio_seconds, "speaker": "SPEAKER_00"}], VAD_CONFIG)
+        spans = spans[0] if spans else []
+        tracks: Optional[List[Dict]]
+        if speakers == 1 or not spans:
+            tracks = [{"start": s, "end": e, "speaker": "SPEAKER_00"} for s, e in spans]
+            report.update(tier="vad")
+        else:
+            windows = speech_windows(spans)
+            clips = [pcm[int(s * SAMPLE_RATE):int(e * SAMPLE_RATE)] for s, e in windows]
+            lease = use_model("pyannote") if SPEAKER_EMBEDDING == "pyannote" else nullcontext(None)
+            with lease as pipeline:
+                parts = [embed_clips(clips[i:i + FAST_EMBED_BATCH], pipeline)
+                         for i in range(0, len(clips), FAST_EMBED_BATCH)]
+            embeddings, kind = np.concatenate([p[0] for p in parts]), parts[0][1]
+            labels, separation, share = two_means(embeddings) if len(windows) > 1 else (np.zeros(1, int), 0.0, 0.0)
+            confident = separation >= FAST_MIN_SEPARATION[kind] and share >= FAST_MIN_SHARE
+            tracks = _window_tracks(spans, windows, labels) if confident else None
+            report.update(tier="embedding" if confident else "pyannote", embedding=kind, windows=len(windows),
+                          separation=round(separation, 2), minority_share=round(share, 3), escalated=not confident)
+    seconds = time.perf_counter() - t0
+    estimate = estimated_pyannote_seconds(audio_seconds)
+    report.update(seconds=round(seconds, 3), estimated_pyannote_seconds=round(estimate, 3))
+    if tracks is not None:
+        report["estimated_speedup"] = round(estimate / max(seconds, 1e-3), 1)
+    else:  # the cheap pass was wasted work on top of pyannote
+        report["estimated_speedup"] = round(estimate / (estimate + seconds), 2) if estimate else None
+
+    if cache_key:
+        get_result_cache().put("diarization", cache_key, {"tracks": tracks, "report": report})
+    if tracks is None:
+        print(f"↪️ Two-speaker split not clear (separation {report['separation']}), running pyannote")
+        return None, report
+    print(f"⚡ Diarized by {report['tier']} in {seconds:.2f}s (~{report['estimated_speedup']}x faster than pyannote)")
+    return postprocess_segments(tracks, moderator_first, config=config), report
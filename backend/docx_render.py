@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+import os
+import re
+import threading
+import zipfile
+
+# Bulk DOCX writer for transcripts.
+# The template is read once per process: every part except word/document.xml is kept as
+# bytes, and document.xml is split around the body so each render only has to emit the
+# turn paragraphs as one string. The output matches what python-docx produced via
+# delete_paragraph()/add_turn(): template body paragraphs removed, tables and section
+# properties (header/footer references) kept, one paragraph per turn.
+
+DOCUMENT_PART = "word/document.xml"
+TURN_SPACE_AFTER = 120   # twentieths of a point (Pt(6))
+BLANK_LINE_SPACING = 144  # 240ths of a line (0.6)
+
+_TAG = re.compile(r"""<(/?)([\w:.-]+)((?:[^>"']|"[^"]*"|'[^']*')*?)(/?)>""")
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_BREAKS = re.compile(r"(\r\n|\n|\r|\t)")
+
+
+def _split_body(xml: str) -> Tuple[str, str, str]:
+    """
+    Split document.xml into (head, kept body content, tail).
+
+    head ends with <w:body>, tail starts at the body-level <w:sectPr> (or
+    </w:body>). Top-level <w:p> elements are dropped; everything else at
+    body level (tables, bookmarks, ...) is kept in order.
+    """
+    body_open = re.search(r"<w:body(\s[^>]*)?>", xml)
+    body_close = xml.rindex("</w:body>")
+    head, body = xml[:body_open.end()], xml[body_open.end():body_close]
+
+    kept, depth, elem_start, elem_name = [], 0, 0, None
+    tail_start = len(body)
+    for m in _TAG.finditer(body):
+        closing, name, _, self_closing = m.groups()
+        if depth == 0 and not closing:
+            elem_start, elem_name = m.start(), name
+            if name == "w:sectPr":
+                tail_start = m.start()
+                break
+        if closing:
+            depth -= 1
+        elif not self_closing:
+            depth += 1
+        if depth == 0 and elem_name is not None:
+            if elem_name != "w:p":
+                kept.append(body[elem_start:m.end()])
+            elem_name = None
+    return head, "".join(kept), body[tail_start:] + xml[body_close:]
+
+
+def _run_xml(text: str) -> str:
+    """Run content with newlines as <w:br/> and tabs as <w:tab/>, like python-docx's run.text setter."""
+    parts = []
+    for piece in _BREAKS.split(_INVALID_XML.sub("", text)):
+        if piece in ("\n", "\r", "\r\n"):
+            parts.append("<w:br/>")
+        elif piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece:
+            parts.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+    return "".join(parts)
+
+
+def turns_xml(turns: List[Tuple[str, str]], font_size_pt: Optional[float] = None) -> str:
+    """Body XML for (speaker, text) turns: moderator lines red, each preceded by a short blank line."""
+    size = f'<w:sz w:val="{int(round(font_size_pt * 2))}"/>' if font_size_pt else ""
+    plain_rpr = f"<w:rPr>{size}</w:rPr>" if size else ""
+    moderator_rpr = f'<w:rPr><w:color w:val="FF0000"/>{size}</w:rPr>'
+    blank = f'<w:p><w:pPr><w:spacing w:line="{BLANK_LINE_SPACING}" w:lineRule="auto"/></w:pPr></w:p>'
+    ppr = f'<w:pPr><w:spacing w:after="{TURN_SPACE_AFTER}"/></w:pPr>'
+
+    out = []
+    for speaker, text in turns:
+        moderator = speaker == "M"
+        if moderator:
+            out.append(blank)
+        out.append(f"<w:p>{ppr}<w:r>{moderator_rpr if moderator else plain_rpr}"
+                   f"{_run_xml(f'{speaker}: {text}')}</w:r></w:p>")
+    return "".join(out)
+
+
+def preview_text(turns: List[Tuple[str, str]]) -> str:
+    """Plain text of the rendered document body, one line per turn."""
+    return "\n".join(f"{speaker}: {text}" for speaker, text in turns)
+
+
+class DocxTemplate:
+    """A DOCX template parsed once; ``render`` writes a new document per call."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        with zipfile.ZipFile(path) as z:
+            # Original part order; the body part is a placeholder filled per render
+            self._parts = [(info, None if info.filename == DOCUMENT_PART else z.read(info))
+                           for info in z.infolist()]
+            self.head, self.kept, self.tail = _split_body(z.read(DOCUMENT_PART).decode("utf-8"))
+
+    def render(self, turns: List[Tuple[str, str]], output_path: str, font_size_pt: Optional[float] = None) -> str:
+        """
+        Write turns into a copy of the template.
+
+        Returns:
+            str: Preview text of the document body.
+        """
+        document = "".join((self.head, self.kept, turns_xml(turns, font_size_pt), self.tail))
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as out:
+            for info, data in self._parts:
+                out.writestr(info, document if data is None else data)
+        return preview_text(turns)
+
+
+_templates: Dict[str, DocxTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def get_docx_template(path: str) -> DocxTemplate:
+    """Parsed template for path, reloaded only if the file changed."""
+    path = os.path.abspath(path)
+    with _templates_lock:
+        template = _templates.get(path)
+        if template is None or template.mtime != os.path.getmtime(path):
+            template = _templates[path] = DocxTemplate(path)
+        return template
+
+
+def render_docx(
+    turns: List[Tuple[str, str]],
+    template_path: str,
+    output_docx: str,
+    font_size_pt: Optional[float] = None,
+) -> str:
+    """
+    Render (speaker, text) turns into a DOCX based on template_path.
+
+    Args:
+        turns (List[Tuple[str, str]]): Dialogue as (speaker, text).
+        template_path (str): DOCX template (header/footer/styles preserved).
+        output_docx (str): Where to write the document.
+        font_size_pt (float, optional): Explicit run font size; template default if None.
+
+    Returns:
+        str: Preview text of the document body, without re-reading the file.
+    """
+    return get_docx_template(template_path).render(turns, output_docx, font_size_pt)
@@ -0,0 +1,157 @@
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Dict], None]        # works on the job context in place
+    workers: int = 1
+    devices: List[Optional[str]] = field(default_factory=list)  # one per worker, round robin
+    queue_size: int = 2               # jobs waiting in front of this stage
+
+    def device_for(self, worker: int) -> Optional[str]:
+        return self.devices[worker % len(self.devices)] if self.devices else None
+
+
+@dataclass
+class _StageStats:
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0      # finished, waiting for room in the next stage's queue
+    busy_by_device: Dict[str, float] = field(default_factory=dict)
+
+
+class PipelinedExecutor:
+    """
+    Runs jobs through a chain of stages, each with its own workers and devices.
+
+    Stages are connected by bounded queues, so while one job is being
+    transcribed the next can be diarized and a third decoded; a slow stage
+    backs up its predecessors instead of letting work pile up in memory.
+    A job context is a dict; each stage reads and writes its keys. A failing
+    stage sets ctx["error"] and the job skips the remaining stages.
+
+    Args:
+        stages (List[Stage]): Stages in order.
+        on_done (Callable): Called with the context when a job leaves the last stage (or fails).
+        device_context (Callable, optional): device -> context manager entered around every
+            stage call on a worker bound to that device.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        on_done: Callable[[Dict], None],
+        device_context: Optional[Callable[[Optional[str]], ContextManager]] = None,
+    ):
+        self.stages = stages
+        self.on_done = on_done
+        self.device_context = device_context or (lambda device: nullcontext())
+        self._queues = [queue.Queue(maxsize=max(1, s.queue_size)) for s in stages]
+        self._stats = [_StageStats() for _ in stages]
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._started_at: Optional[float] = None
+
+    def capacity(self) -> int:
+        """Jobs that can be in flight at once (in stages plus queued between them)."""
+        return sum(s.workers + s.queue_size for s in self.stages)
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._threads:
+            return
+        self._started_at = time.perf_counter()
+        for idx, stage in enumerate(self.stages):
+            for w in range(max(1, stage.workers)):
+                t = threading.Thread(target=self._worker, args=(idx, stage.device_for(w)),
+                                     name=f"stage-{stage.name}-{w}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def shutdown(self):
+        """Let queued jobs drain, then stop every worker."""
+        for idx, stage in enumerate(self.stages):
+            for _ in range(max(1, stage.workers)):
+                self._queues[idx].put(_STOP)
+            for t in self._threads:
+                if t.name.startswith(f"stage-{stage.name}-"):
+                    t.join()
+        self._threads = []
+
+    def submit(self, ctx: Dict):
+        """Queue a job for the first stage; blocks while that queue is full."""
+        self._queues[0].put(ctx)
+
+    # --- Internals ---
+    def _worker(self, idx: int, device: Optional[str]):
+        stage, stats = self.stages[idx], self._stats[idx]
+        last = idx == len(self.stages) - 1
+        while True:
+            ctx = self._queues[idx].get()
+            if ctx is _STOP:
+                return
+
+            t0 = time.perf_counter()
+            try:
+                with self.device_context(device):
+                    stage.fn(ctx)
+                failed = False
+            except Exception as e:
+                ctx["error"] = f"{stage.name}: {e}"
+                failed = True
+                print(f"❌ Stage {stage.name} failed for job {ctx.get('uid')}: {e}")
+            busy = time.perf_counter() - t0
+
+            t1 = time.perf_counter()
+            if last or failed:
+                self.on_done(ctx)
+            else:
+                self._queues[idx + 1].put(ctx)  # blocks while the next stage is saturated
+            blocked = time.perf_counter() - t1
+
+            with self._lock:
+                stats.processed += 1
+                stats.failed += failed
+                stats.busy_seconds += busy
+                stats.blocked_seconds += blocked
+                key = device or "default"
+                stats.busy_by_device[key] = stats.busy_by_device.get(key, 0.0) + busy
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage throughput and utilization (busy time / (wall time × workers))."""
+        wall = time.perf_counter() - self._started_at if self._started_at else 0.0
+        out = {"wall_seconds": round(wall, 3), "stages": {}}
+        with self._lock:
+            for stage, stats, q in zip(self.stages, self._stats, self._queues):
+                workers = max(1, stage.workers)
+                out["stages"][stage.name] = {
+                    "workers": workers,
+                    "devices": [stage.device_for(w) for w in range(workers)],
+                    "queued": q.qsize(),
+                    "processed": stats.processed,
+                    "failed": stats.failed,
+                    "busy_seconds": round(stats.busy_seconds, 3),
+                    "blocked_seconds": round(stats.blocked_seconds, 3),
+                    "utilization": round(stats.busy_seconds / (wall * workers), 3) if wall else 0.0,
+                    "busy_by_device": {d: round(s, 3) for d, s in stats.busy_by_device.items()},
+                }
+        return out
+
+
+def parse_stage_map(spec: str) -> Dict[str, List[str]]:
+    """Parse "diarize=cuda:0;transcribe=cuda:1,cuda:2" into {stage: [values]}."""
+    out: Dict[str, List[str]] = {}
+    for part in spec.split(";"):
+        if "=" in part:
+            name, values = part.split("=", 1)
+            out[name.strip()] = [v.strip() for v in values.split(",") if v.strip()]
+    return out
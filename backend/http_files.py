@@ -0,0 +1,97 @@
+from typing import Iterator, Mapping, Optional, Tuple
+import os
+import re
+from fastapi.responses import Response, StreamingResponse
+
+# --- Global config ---
+READ_CHUNK_BYTES = 1 << 16
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(path: str) -> str:
+    """Strong validator from size and mtime; exports are rewritten, never edited in place."""
+    st = os.stat(path)
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (first, last) byte positions of a single-range "bytes=" header.
+
+    Returns None when there is no usable range (serve the whole file);
+    raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    m = _RANGE.match(header.strip())
+    if m is None:
+        return None  # multiple or non-byte ranges: ignoring Range is allowed
+    first, last = m.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":  # suffix range: the last N bytes
+        n = int(last)
+        if n == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - n), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        raise ValueError("range not satisfiable")
+    return first, last
+
+
+def _iter_file(path: str, first: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(first)
+        while length > 0:
+            data = f.read(min(READ_CHUNK_BYTES, length))
+            if not data:
+                return
+            length -= len(data)
+            yield data
+
+
+def _matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def file_response(path: str, headers: Mapping[str, str], media_type: str, filename: Optional[str] = None) -> Response:
+    """
+    Serve a file with ETag, conditional GET (304) and single-range (206) support.
+
+    Args:
+        path (str): File to send.
+        headers (Mapping): Request headers (If-None-Match, Range, If-Range).
+        media_type (str): Content-Type of the file.
+        filename (str, optional): Offered as the attachment name.
+    """
+    size = os.path.getsize(path)
+    etag = file_etag(path)
+    base = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=0, must-revalidate"}
+    if filename:
+        base["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    if _matches(headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=base)
+
+    range_header = headers.get("range")
+    if_range = headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None  # the client's partial copy is stale: send everything
+    try:
+        span = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**base, "Content-Range": f"bytes */{size}"})
+
+    if span is None:
+        return StreamingResponse(_iter_file(path, 0, size), media_type=media_type,
+                                 headers={**base, "Content-Length": str(size)})
+    first, last = span
+    length = last - first + 1
+    return StreamingResponse(_iter_file(path, first, length), status_code=206, media_type=media_type,
+                             headers={**base, "Content-Length": str(length),
+                                      "Content-Range": f"bytes {first}-{last}/{size}"})
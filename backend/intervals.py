@@ -0,0 +1,209 @@
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import numpy as np
+
+# Columnar interval engine for diarization post-processing.
+# Segments are three parallel arrays: start (s), end (s) and an integer speaker code
+# indexing into a list of labels. Every pass returns new arrays; inputs are never mutated.
+
+Intervals = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+@dataclass
+class IntervalConfig:
+    min_duration: float = 0.6     # shorter segments are folded into the previous one
+    gap_threshold: float = 3.0    # gaps up to this long are given to the previous speaker
+    gap_tolerance: float = 1.0    # same-speaker segments this close are merged
+    min_gap: Optional[float] = None  # gaps must exceed this to be filled; defaults to min_duration
+
+
+def from_segments(segments: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Convert {start, end, speaker} dicts into (start, end, code) arrays plus the label list."""
+    labels: List[str] = []
+    index: Dict[str, int] = {}
+    codes = np.empty(len(segments), dtype=np.int64)
+    for i, seg in enumerate(segments):
+        label = seg["speaker"]
+        if label not in index:
+            index[label] = len(labels)
+            labels.append(label)
+        codes[i] = index[label]
+    start = np.fromiter((seg["start"] for seg in segments), dtype=np.float64, count=len(segments))
+    end = np.fromiter((seg["end"] for seg in segments), dtype=np.float64, count=len(segments))
+    return start, end, codes, labels
+
+
+def to_segments(start: np.ndarray, end: np.ndarray, code: np.ndarray, labels: List[str]) -> List[Dict]:
+    """Convert (start, end, code) arrays back into {start, end, speaker} dicts."""
+    return [{"start": s, "end": e, "speaker": labels[c]}
+            for s, e, c in zip(start.tolist(), end.tolist(), code.tolist())]
+
+
+def resolve_overlaps(start: np.ndarray, end: np.ndarray, code: np.ndarray) -> Intervals:
+    """
+    Split overlapping speech so the later speaker wins, sorted by start time.
+
+    Equivalent to walking the sorted segments and comparing each one with
+    the last output piece L: L's end is the running max of ends, and L is
+    either the segment that set that max or the remnant of the speaker that
+    still holds it. An inner segment splits L and leaves a remnant; a
+    segment starting inside L truncates it.
+    """
+    n = len(start)
+    if n == 0:
+        return start.copy(), end.copy(), code.copy()
+    order = np.argsort(start, kind="stable")
+    s, e, c = start[order], end[order], code[order]
+
+    running_end = np.maximum.accumulate(e)
+    prev_end = np.empty(n)
+    prev_end[0] = -np.inf
+    prev_end[1:] = running_end[:-1]
+
+    # Segment i becomes L unless it sits strictly inside the current L (then a remnant of L does)
+    owns = e >= prev_end
+    owner = np.maximum.accumulate(np.where(owns, np.arange(n), 0))
+    last_start = np.where(owns, s, e)
+
+    next_start = np.empty(n)
+    next_start[:-1] = s[1:]
+    next_start[-1] = np.inf
+    truncated = (next_start > last_start) & (next_start < running_end)
+
+    seg_end = np.where(owns & truncated, next_start, e)
+    remnant = ~owns
+    remnant_end = np.where(truncated, next_start, prev_end)
+
+    # Interleave: each segment, followed by its remnant when it split L
+    counts = 1 + remnant.astype(np.int64)
+    pos = np.cumsum(counts) - counts
+    total = int(counts.sum())
+    out_s, out_e, out_c = np.empty(total), np.empty(total), np.empty(total, dtype=code.dtype)
+    out_s[pos], out_e[pos], out_c[pos] = s, seg_end, c
+    rpos = pos[remnant] + 1
+    out_s[rpos], out_e[rpos], out_c[rpos] = e[remnant], remnant_end[remnant], c[owner[remnant]]
+    return out_s, out_e, out_c
+
+
+def relabel(
+    code: np.ndarray,
+    labels: List[str],
+    moderator_first: bool,
+    moderator_label: Optional[str] = None,
+) -> Tuple[np.ndarray, List[str]]:
+    """
+    Map speaker codes onto Moderator ("M") and Respondents ("R" or "R<label>").
+
+    The moderator is moderator_label, or the first speaker when not given.
+    """
+    if moderator_label is not None:
+        mod = labels.index(moderator_label) if moderator_label in labels else -1
+    else:
+        mod = int(code[0]) if len(code) else -1
+
+    if moderator_first:
+        return np.where(code == mod, 0, code + 1), ["M"] + [f"R{label}" for label in labels]
+    return np.where(code == mod, 0, 1), ["M", "R"]
+
+
+def merge_short(start: np.ndarray, end: np.ndarray, code: np.ndarray, min_duration: float) -> Intervals:
+    """Fold segments shorter than min_duration into the preceding kept segment (extending its end)."""
+    n = len(start)
+    if n == 0:
+        return start, end, code
+    keep = (end - start) >= min_duration
+    keep[0] = True
+    kept = np.flatnonzero(keep)
+    group_last = np.empty_like(kept)
+    group_last[:-1] = kept[1:] - 1
+    group_last[-1] = n - 1
+    return start[kept], end[group_last], code[kept]
+
+
+def fill_gaps(start: np.ndarray, end: np.ndarray, min_gap: float, max_gap: float) -> np.ndarray:
+    """Extend each segment to the next start when the gap is in (min_gap, max_gap]. Returns new ends."""
+    end = end.copy()
+    if len(start) < 2:
+        return end
+    gap = start[1:] - end[:-1]
+    fill = (gap > min_gap) & (gap <= max_gap)
+    end[:-1][fill] = start[1:][fill]
+    return end
+
+
+def _merge_adjacent_loop(start: np.ndarray, end: np.ndarray, code: np.ndarray, tolerance: float) -> Intervals:
+    s_out, e_out, c_out = [], [], []
+    for s, e, c in zip(start.tolist(), end.tolist(), code.tolist()):
+        if c_out and c == c_out[-1] and s - e_out[-1] <= tolerance:
+            e_out[-1] = max(e_out[-1], e)
+        else:
+            s_out.append(s)
+            e_out.append(e)
+            c_out.append(c)
+    return np.array(s_out, dtype=np.float64), np.array(e_out, dtype=np.float64), np.array(c_out, dtype=code.dtype)
+
+
+def merge_adjacent(start: np.ndarray, end: np.ndarray, code: np.ndarray, tolerance: float) -> Intervals:
+    """
+    Merge consecutive same-speaker segments separated by at most tolerance seconds.
+
+    Within a run of one speaker, the merged end is the running max of ends
+    (computed exactly on integer ranks). That running max equals the
+    per-group max as long as every segment has end >= start and
+    tolerance >= 0; otherwise the sequential form is used.
+    """
+    n = len(start)
+    if n == 0:
+        return start, end, code
+    if tolerance < 0 or np.any(end < start):
+        return _merge_adjacent_loop(start, end, code, tolerance)
+
+    run_start = np.empty(n, dtype=bool)
+    run_start[0] = True
+    run_start[1:] = code[1:] != code[:-1]
+    run_id = np.cumsum(run_start) - 1
+
+    values, rank = np.unique(end, return_inverse=True)
+    offset = run_id * len(values)
+    running_end = values[np.maximum.accumulate(offset + rank.reshape(-1)) - offset]
+
+    new_group = run_start.copy()
+    new_group[1:] |= ~(start[1:] - running_end[:-1] <= tolerance)
+    first = np.flatnonzero(new_group)
+    last = np.empty_like(first)
+    last[:-1] = first[1:] - 1
+    last[-1] = n - 1
+    return start[first], running_end[last], code[first]
+
+
+def postprocess(
+    raw_segments: List[Dict],
+    moderator_first: bool = False,
+    config: Optional[IntervalConfig] = None,
+    moderator_speaker_id: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Full diarization post-processing on columnar arrays.
+
+    resolve overlaps → M/R relabel → merge short segments → fill gaps →
+    merge adjacent same-speaker segments.
+
+    Args:
+        raw_segments (List[Dict]): Raw {start, end, speaker} tracks.
+        moderator_first (bool): Keep respondent identities ("R<label>") instead of a single "R".
+        config (IntervalConfig, optional): Thresholds; defaults match the original pipeline.
+        moderator_speaker_id (str, optional): Raw label of the moderator; defaults to the first speaker.
+
+    Returns:
+        List[Dict]: Cleaned {start, end, speaker} segments.
+    """
+    config = config or IntervalConfig()
+    min_gap = config.min_duration if config.min_gap is None else config.min_gap
+
+    start, end, code, labels = from_segments(raw_segments)
+    start, end, code = resolve_overlaps(start, end, code)
+    code, labels = relabel(code, labels, moderator_first, moderator_speaker_id)
+    start, end, code = merge_short(start, end, code, config.min_duration)
+    end = fill_gaps(start, end, min_gap, config.gap_threshold)
+    start, end, code = merge_adjacent(start, end, code, config.gap_tolerance)
+    return to_segments(start, end, code, labels)
@@ -0,0 +1,186 @@
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass, field
+import os
+import threading
+import time
+import uuid
+
+# --- Global config ---
+# Relative cost per second of audio for each language path
+# (Arabic = Levantine Whisper + ALLaM translation).
+LANGUAGE_COST = {"english": 1.0, "arabic": 4.0}
+AGING_PER_SECOND = 1.0  # cost credit per second waited, so long jobs never starve
+FINISHED_JOB_TTL = float(os.environ.get("AREN_FINISHED_JOB_TTL", "3600"))  # seconds a finished job stays queryable
+MAX_FINISHED_JOBS = int(os.environ.get("AREN_MAX_FINISHED_JOBS", "500"))
+
+
+def estimate_cost(duration_s: float, language: str) -> float:
+    """Estimated processing cost of a job: audio duration × language path factor."""
+    factor = LANGUAGE_COST["arabic" if language.lower().startswith("ar") else "english"]
+    return duration_s * factor
+
+
+@dataclass
+class Job:
+    id: str
+    params: Dict
+    cost: float
+    state: str = "queued"  # queued | running | done | failed
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    events: List[Dict] = field(default_factory=list, repr=False)
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _seq: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def emit(self, event_type: str, **data):
+        """Append a progress event (stage change, segment text, translated chunk, ...)."""
+        with self._lock:
+            self.events.append({"seq": self._seq, "type": event_type, **data})
+            self._seq += 1
+
+    def events_since(self, seq: int) -> List[Dict]:
+        """Events numbered seq or later that are still kept."""
+        with self._lock:
+            return [e for e in self.events if e["seq"] >= seq]
+
+    def close_events(self):
+        """Keep only the last (terminal) event: the result already holds everything the others carried."""
+        with self._lock:
+            self.events = self.events[-1:]
+
+    def finished(self) -> bool:
+        return self.done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished (done or failed)."""
+        return self.done.wait(timeout)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "estimated_cost": round(self.cost, 2),
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Cost-ordered job queue served by a bounded pool of worker threads.
+
+    Cheapest job first, with an aging credit so expensive jobs still get
+    picked up under sustained load. Jobs run outside the event loop; the
+    API only submits and polls.
+    """
+
+    def __init__(self, runner: Callable[[Job], Dict], workers: int = 1, max_queued: int = 100,
+                 max_finished: int = MAX_FINISHED_JOBS, finished_ttl: float = FINISHED_JOB_TTL):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._pending: List[Job] = []
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._threads:
+            return
+        self._stopping = False
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._threads = []
+
+    # --- API ---
+    def submit(self, params: Dict, cost: float, job_id: Optional[str] = None) -> Job:
+        job = Job(id=job_id or uuid.uuid4().hex[:12], params=params, cost=cost)
+        with self._cond:
+            if len(self._pending) >= self.max_queued:
+                raise QueueFull(f"{len(self._pending)} jobs already queued")
+            self._prune()
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._cond.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def running(self) -> int:
+        with self._cond:
+            return sum(1 for j in self._jobs.values() if j.state == "running")
+
+    # --- Internals ---
+    def _prune(self):
+        """Forget finished jobs past their TTL, then the oldest beyond max_finished (caller holds the lock)."""
+        finished = sorted((j for j in self._jobs.values() if j.finished()), key=lambda j: j.finished_at)
+        expire_before = time.time() - self.finished_ttl
+        excess = len(finished) - self.max_finished
+        for i, job in enumerate(finished):
+            if i < excess or job.finished_at < expire_before:
+                del self._jobs[job.id]
+
+    def _next_job(self) -> Job:
+        now = time.time()
+        job = min(self._pending, key=lambda j: j.cost - AGING_PER_SECOND * (now - j.submitted_at))
+        self._pending.remove(job)
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                job = self._next_job()
+                job.state = "running"
+                job.started_at = time.time()
+
+            job.emit("state", state="running")
+            try:
+                job.result = self.runner(job)
+                job.state = "done"
+                job.emit("done", result=job.result)
+            except Exception as e:
+                job.error = str(e)
+                job.state = "failed"
+                job.emit("error", error=job.error)
+                print(f"❌ Job {job.id} failed: {e}")
+            finally:
+                job.finished_at = time.time()
+                job.close_events()
+                job.done.set()
+                with self._cond:
+                    self._prune()
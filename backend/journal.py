@@ -0,0 +1,91 @@
+from typing import Dict, Iterator, List, Optional
+import json
+import os
+import threading
+
+# --- Global config ---
+JOURNAL_DIR = os.environ.get("AREN_JOURNAL_DIR", "/tmp/aren_transcriber/journals")
+
+
+class Journal:
+    """
+    Append-only JSONL record of a job's finished work.
+
+    One line per finished segment transcription or translated chunk, so
+    writing progress costs O(record) instead of re-serialising everything
+    done so far, and resume is a single O(n) replay. A torn last line from
+    a crash is ignored on replay.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._segments: Optional[Dict[tuple, str]] = None  # replayed once, then kept current
+        self._f = open(path, "a", encoding="utf-8")
+        if self._f.tell() and not _ends_with_newline(path):
+            self._f.write("\n")  # seal a torn last line so the next record starts cleanly
+
+    def append(self, record_type: str, **data):
+        line = json.dumps({"type": record_type, **data}, ensure_ascii=False)
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()  # survives a process crash; fsync also survives power loss
+            if self.fsync:
+                os.fsync(self._f.fileno())
+            if record_type == "segment" and self._segments is not None:
+                self._segments[(data.get("stage"), data["start"], data["end"])] = data["text"]
+
+    def replay(self, record_type: Optional[str] = None) -> Iterator[Dict]:
+        return replay(self.path, record_type)
+
+    def segment_texts(self) -> Dict[tuple, str]:
+        """Finished segment transcripts keyed by (stage, start, end); the file is read only once."""
+        with self._lock:
+            if self._segments is None:
+                self._segments = {(r.get("stage"), r["start"], r["end"]): r["text"]
+                                  for r in self.replay("segment")}
+            return self._segments
+
+    def chunks(self) -> List[Dict]:
+        return list(self.replay("chunk"))
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def replay(path: str, record_type: Optional[str] = None) -> Iterator[Dict]:
+    """Yield the records of a journal file in write order, optionally only one type."""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partially written line from an interrupted run
+            if record_type is None or record.get("type") == record_type:
+                yield record
+
+
+def journal_path(job_id: str, journal_dir: str = JOURNAL_DIR) -> str:
+    return os.path.join(journal_dir, f"{job_id}.jsonl")
+
+
+def open_journal(job_id: str, journal_dir: str = JOURNAL_DIR) -> Journal:
+    """Open (or reopen, to resume) the journal for a job."""
+    return Journal(journal_path(job_id, journal_dir))
@@ -0,0 +1,233 @@
+from typing import Dict, List, Optional
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass
+import os
+import time
+import numpy as np
+from backend import use_model, current_device
+from backend.autotune import whisper_settings
+from backend.intervals import relabel
+from backend.metrics import LIVE_LATENCY
+from backend.pcm import SAMPLE_RATE
+from backend.speakers import SPEAKER_EMBEDDING, OnlineSpeakers, embed_clips
+from backend.vad import VAD_CONFIG, VadConfig, frame_db
+
+# Live captioning: audio arrives in small chunks, an energy endpointer on a rolling
+# buffer closes segments at pauses, each closed segment gets a speaker and a final
+# Whisper pass, and the open segment is re-transcribed greedily now and then as an
+# interim hypothesis.
+
+
+@dataclass
+class LiveConfig:
+    endpoint_ms: float = 500.0          # trailing silence that closes a segment
+    max_segment_seconds: float = 15.0   # segments are cut here even without a pause
+    interim_seconds: float = 1.0        # new audio between interim hypotheses of the open segment
+    min_speech_ms: float = 250.0        # shorter bursts are dropped as noise
+    pad_ms: float = 150.0               # context kept around each segment
+    floor_seconds: float = 10.0         # recent audio the noise floor is estimated from
+
+
+LIVE_CONFIG = LiveConfig(
+    endpoint_ms=float(os.environ.get("AREN_LIVE_ENDPOINT_MS", "500")),
+    max_segment_seconds=float(os.environ.get("AREN_LIVE_MAX_SEGMENT_SECONDS", "15")),
+    interim_seconds=float(os.environ.get("AREN_LIVE_INTERIM_SECONDS", "1.0")),
+)
+SAMPLE_FORMATS = {"s16le": np.int16, "f32le": np.float32}
+PROMPT_CHARS = 200  # previous final text passed to Whisper as context
+
+
+class LiveSegmenter:
+    """
+    Energy endpointing over a rolling PCM buffer.
+
+    Frames are classified against an adaptive threshold above the noise floor
+    of the last few seconds (same thresholds as backend.vad). Only the open
+    segment and a little padding are kept in memory.
+    """
+
+    def __init__(self, config: Optional[LiveConfig] = None, vad: Optional[VadConfig] = None,
+                 sample_rate: int = SAMPLE_RATE):
+        self.config = config or LIVE_CONFIG
+        self.vad = vad or VAD_CONFIG
+        self.sample_rate = sample_rate
+        self.frame = int(self.vad.frame_ms * sample_rate / 1000)
+        to_frames = lambda ms: max(1, int(round(ms / self.vad.frame_ms)))
+        self._endpoint = to_frames(self.config.endpoint_ms)
+        self._max_frames = to_frames(self.config.max_segment_seconds * 1000)
+        self._interim = to_frames(self.config.interim_seconds * 1000)
+        self._min_speech = to_frames(self.config.min_speech_ms)
+        self._pad = to_frames(self.config.pad_ms)
+        self._energies = deque(maxlen=to_frames(self.config.floor_seconds * 1000))
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_frame = 0   # absolute frame index of _buffer[0]
+        self.frames = 0          # frames classified so far
+        self._start: Optional[int] = None  # open segment (absolute frames)
+        self._first_speech = self._last_speech = self._last_interim = 0
+        self.segments = 0
+
+    def seconds(self, frames: int) -> float:
+        return frames * self.frame / self.sample_rate
+
+    def _clip(self, start: int, end: int) -> np.ndarray:
+        lo = (start - self._buffer_frame) * self.frame
+        return self._buffer[max(0, lo):(end - self._buffer_frame) * self.frame].copy()
+
+    def _event(self, kind: str, start: int, end: int) -> Dict:
+        return {"type": kind, "segment": self.segments, "start": round(self.seconds(start), 3),
+                "end": round(self.seconds(end), 3), "clip": self._clip(start, end)}
+
+    def _close(self, end: int) -> List[Dict]:
+        start, self._start = self._start, None
+        if self._last_speech + 1 - self._first_speech < self._min_speech:
+            return []  # a click or a cough
+        event = self._event("final", start, end)
+        self.segments += 1
+        return [event]
+
+    def feed(self, samples: np.ndarray) -> List[Dict]:
+        """Append samples; returns the interim and final events they trigger, in order."""
+        self._buffer = np.concatenate([self._buffer, np.asarray(samples, dtype=np.float32)])
+        n_frames = len(self._buffer) // self.frame - (self.frames - self._buffer_frame)
+        if n_frames <= 0:
+            return []
+        lo = (self.frames - self._buffer_frame) * self.frame
+        energies = frame_db(self._buffer[lo:lo + n_frames * self.frame], self.frame)
+        events = []
+        for db in energies.tolist():
+            f = self.frames
+            self._energies.append(db)
+            floor = float(np.percentile(self._energies, self.vad.noise_percentile))
+            threshold = min(max(floor + self.vad.margin_db, self.vad.min_threshold_db), self.vad.max_threshold_db)
+            active = db > threshold
+            self.frames += 1
+            if self._start is None:
+                if active:
+                    self._start = max(self._buffer_frame, f - self._pad)
+                    self._first_speech = self._last_speech = self._last_interim = f
+                continue
+            if active:
+                self._last_speech = f
+            if f - self._last_speech >= self._endpoint:
+                events += self._close(min(self.frames, self._last_speech + 1 + self._pad))
+            elif self.frames - self._start >= self._max_frames:
+                events += self._close(self.frames)
+                if active:  # speech runs on: the next segment starts right here
+                    self._start = self._first_speech = self._last_speech = self._last_interim = self.frames
+            elif self.frames - self._last_interim >= self._interim:
+                events.append(self._event("interim", self._start, self.frames))
+                self._last_interim = self.frames
+
+        keep_from = self._start if self._start is not None else max(self._buffer_frame, self.frames - self._pad)
+        drop = (keep_from - self._buffer_frame) * self.frame
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._buffer_frame = keep_from
+        return events
+
+    def flush(self) -> List[Dict]:
+        """Close the open segment at the end of the stream."""
+        if self._start is None:
+            return []
+        return self._close(min(self.frames, self._last_speech + 1 + self._pad))
+
+
+def _transcribe(model, clip: np.ndarray, language: str, beam_size: int, **kwargs) -> str:
+    segments, _ = model.transcribe(clip, language=language, beam_size=beam_size, **kwargs)
+    return " ".join(seg.text.strip() for seg in segments).strip()
+
+
+def _percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0}
+    p = np.percentile(values, [50, 90, 99])
+    return {"count": len(values), "p50_ms": round(p[0] * 1000, 1), "p90_ms": round(p[1] * 1000, 1),
+            "p99_ms": round(p[2] * 1000, 1), "max_ms": round(max(values) * 1000, 1)}
+
+
+class LiveSession:
+    """
+    One live captioning stream.
+
+    ``feed`` runs on the event loop and only does endpointing; ``process``
+    does the model work for one event and belongs on a worker thread.
+    Speakers are labelled like ``diarize_audio``: the first voice heard is
+    the moderator "M", the others "R" (or "R<label>" with moderator_first).
+    """
+
+    def __init__(self, language: str = "arabic", moderator_first: bool = False, speakers: int = 1,
+                 sample_format: str = "s16le", config: Optional[LiveConfig] = None):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format: {sample_format}")
+        english = language.lower().startswith("en")
+        self.model = "large_whisper" if english else "levantine_whisper"
+        self.language = "en" if english else "ar"
+        self.moderator_first = moderator_first
+        self.dtype = np.dtype(SAMPLE_FORMATS[sample_format])
+        self.segmenter = LiveSegmenter(config)
+        self.speakers = OnlineSpeakers(speakers)
+        self.beam_size = whisper_settings(self.model, current_device()).beam_size
+        self._partial = b""
+        self._prompt = ""
+        self.latencies: Dict[str, List[float]] = {"final": [], "interim": []}
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.segmenter.seconds(self.segmenter.frames)
+
+    def _stamp(self, events: List[Dict], received_at: float) -> List[Dict]:
+        for event in events:
+            event["received_at"] = received_at
+        return events
+
+    def feed(self, data: bytes, received_at: Optional[float] = None) -> List[Dict]:
+        """Decode a chunk of 16 kHz mono PCM bytes and endpoint it."""
+        data = self._partial + data
+        usable = len(data) - len(data) % self.dtype.itemsize
+        self._partial = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype)
+        if self.dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        return self._stamp(self.segmenter.feed(samples), received_at or time.perf_counter())
+
+    def flush(self, received_at: Optional[float] = None) -> List[Dict]:
+        return self._stamp(self.segmenter.flush(), received_at or time.perf_counter())
+
+    def _speaker(self, clip: np.ndarray) -> str:
+        if self.speakers.max_speakers == 1:
+            idx = 0
+        else:
+            lease = use_model("pyannote") if SPEAKER_EMBEDDING == "pyannote" else nullcontext(None)
+            with lease as pipeline:
+                emb, kind = embed_clips([clip], pipeline)
+            idx, _ = self.speakers.assign(emb[0], kind)
+        labels = [f"SPEAKER_{i:02d}" for i in range(max(idx + 1, len(self.speakers.centroids)))]
+        code, names = relabel(np.array([idx]), labels, self.moderator_first, moderator_label="SPEAKER_00")
+        return names[int(code[0])]
+
+    def process(self, event: Dict) -> Dict:
+        """Transcribe one interim or final event into the message sent to the client."""
+        final = event["type"] == "final"
+        with use_model(self.model) as model:
+            if final:
+                text = _transcribe(model, event["clip"], self.language, self.beam_size,
+                                   initial_prompt=self._prompt or None)
+            else:  # greedy and without timestamps: fast, and replaced by the final anyway
+                text = _transcribe(model, event["clip"], self.language, 1, without_timestamps=True)
+        message = {"type": event["type"], "segment": event["segment"], "start": event["start"],
+                   "end": event["end"], "text": text}
+        if final:
+            message["speaker"] = self._speaker(event["clip"])
+            if text:
+                self._prompt = text[-PROMPT_CHARS:]
+        latency = time.perf_counter() - event["received_at"]
+        self.latencies[event["type"]].append(latency)
+        LIVE_LATENCY.observe(latency, kind=event["type"], language=self.language)
+        message["latency_ms"] = round(latency * 1000, 1)
+        return message
+
+    def stats(self) -> Dict:
+        return {"audio_seconds": round(self.audio_seconds, 3), "segments": self.segmenter.segments,
+                "speakers": len(self.speakers.centroids) or (1 if self.segmenter.segments else 0),
+                "latency": {kind: _percentiles(v) for kind, v in self.latencies.items()}}
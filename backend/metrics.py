@@ -0,0 +1,258 @@
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import bisect
+import json
+import os
+import threading
+import time
+
+# --- Global config ---
+SLOW_JOB_SECONDS = float(os.environ.get("AREN_SLOW_JOB_SECONDS", "600"))
+SLOW_JOB_RTF = float(os.environ.get("AREN_SLOW_JOB_RTF", "1.0"))  # processing s per audio s
+SLOW_JOB_LOG = os.environ.get("AREN_SLOW_JOB_LOG", "/tmp/aren_transcriber/slow_jobs.jsonl")
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus data model."""
+
+    def __init__(self, name: str, help: str, buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, n: int = 1, **labels):
+        """Record value n times (n > 1 for per-item times shared out of one batch)."""
+        key = _labels(**labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            idx = bisect.bisect_left(self.buckets, value)
+            if idx < len(self.buckets):
+                series[idx] += n
+            series[-2] += value * n
+            series[-1] += n
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', _fmt_value(bound)))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(series[-2])}")
+                lines.append(f"{self.name}_count{_fmt_labels(key)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _labels(**labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in sorted(self._values.items())]
+        return lines
+
+
+class GaugeCallback:
+    """Gauge whose values are read at scrape time; fn returns {labels dict as tuple: value}."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Dict[Labels, float]]):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in sorted(self.fn().items())]
+        return lines
+
+
+class Metrics:
+    """Named metric collection rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name: str, help: str, buckets=STAGE_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, buckets))
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._add(Counter(name, help))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], Dict[Labels, float]]) -> GaugeCallback:
+        with self._lock:
+            self._metrics[name] = GaugeCallback(name, help, fn)  # re-registering replaces the callback
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+# --------------------------
+# Default metrics and per-job traces
+# --------------------------
+_metrics = Metrics()
+STAGE_SECONDS = _metrics.histogram("aren_stage_seconds", "Wall time of pipeline stages and sub-steps.")
+SEGMENT_SECONDS = _metrics.histogram(
+    "aren_segment_transcribe_seconds", "Transcription time per diarized segment (batch time shared per segment).")
+CHUNK_SECONDS = _metrics.histogram(
+    "aren_translation_chunk_seconds", "Translation time per chunk (batch time shared per chunk).")
+JOB_SECONDS = _metrics.histogram("aren_job_seconds", "End-to-end processing time per job.")
+JOB_RTF = _metrics.histogram("aren_job_rtf", "Real-time factor: processing seconds per audio second.", RTF_BUCKETS)
+AUDIO_SECONDS = _metrics.counter("aren_audio_seconds_total", "Seconds of audio processed.")
+JOBS_TOTAL = _metrics.counter("aren_jobs_total", "Finished jobs.")
+SLOW_JOBS = _metrics.counter("aren_slow_jobs_total", "Jobs written to the slow-job log.")
+VAD_REMOVED_SECONDS = _metrics.counter("aren_vad_removed_seconds_total", "Non-speech audio cut before Whisper.")
+TRANSLATION_CALLS = _metrics.counter(
+    "aren_translation_llm_calls_total", "Chunk generations sent to the translation model, retries included.")
+TRANSLATION_TOKENS = _metrics.counter(
+    "aren_translation_generated_tokens_total", "Tokens generated by the translation model.")
+LIVE_LATENCY = _metrics.histogram(
+    "aren_live_latency_seconds", "Live captioning: time from the audio chunk that produced a result to sending it.")
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+class Trace:
+    """Per-job timing spans, aggregated into a per-stage breakdown."""
+
+    def __init__(self, job_id: str, language: str):
+        self.job_id = job_id
+        self.language = language
+        self.started = time.perf_counter()
+        self.spans: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, items: int = 0):
+        with self._lock:
+            span = self.spans.setdefault(stage, {"seconds": 0.0, "calls": 0, "items": 0})
+            span["seconds"] += seconds
+            span["calls"] += 1
+            span["items"] += items
+
+    def breakdown(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: {**span, "seconds": round(span["seconds"], 3)} for name, span in self.spans.items()}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+_local = threading.local()
+
+
+def current_trace() -> Optional[Trace]:
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]):
+    """Make trace the target of span() calls on this thread (pass it on to helper threads explicitly)."""
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def language_path(language: str) -> str:
+    return "arabic" if language.lower().startswith("ar") else "english"
+
+
+@contextmanager
+def span(stage: str, items: int = 0, per_item: Optional[Histogram] = None) -> Iterator[None]:
+    """
+    Time a block into aren_stage_seconds and the current job's trace.
+
+    Args:
+        stage (str): Stage or sub-step name ("decode", "pyannote", "transcribe_batch", ...).
+        items (int): Work items in the block (segments, chunks, ...).
+        per_item (Histogram, optional): Also observe the block time shared per item here.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        trace = current_trace()
+        language = trace.language if trace else "none"
+        STAGE_SECONDS.observe(elapsed, stage=stage, language=language)
+        if per_item is not None and items:
+            per_item.observe(elapsed / items, n=items, language=language)
+        if trace:
+            trace.add(stage, elapsed, items)
+
+
+def finish_job(trace: Trace, audio_seconds: float, state: str) -> Dict:
+    """
+    Record job-level metrics and write the job to the slow-job log if it was slow.
+
+    Returns:
+        Dict: Timing summary (wall seconds, RTF, per-stage breakdown).
+    """
+    wall = trace.elapsed()
+    rtf = wall / audio_seconds if audio_seconds > 0 else 0.0
+    JOB_SECONDS.observe(wall, language=trace.language, state=state)
+    JOBS_TOTAL.inc(language=trace.language, state=state)
+    if state == "done" and audio_seconds > 0:
+        JOB_RTF.observe(rtf, language=trace.language)
+        AUDIO_SECONDS.inc(audio_seconds, language=trace.language)
+
+    summary = {
+        "wall_seconds": round(wall, 3),
+        "audio_seconds": round(audio_seconds, 3),
+        "rtf": round(rtf, 4),
+        "stages": trace.breakdown(),
+    }
+    if wall >= SLOW_JOB_SECONDS or (audio_seconds > 0 and rtf >= SLOW_JOB_RTF):
+        SLOW_JOBS.inc(language=trace.language)
+        record = {"job_id": trace.job_id, "language": trace.language, "state": state, "at": time.time(), **summary}
+        os.makedirs(os.path.dirname(SLOW_JOB_LOG) or ".", exist_ok=True)
+        with open(SLOW_JOB_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"🐢 Slow job {trace.job_id}: {wall:.1f}s for {audio_seconds:.1f}s of audio (RTF {rtf:.2f})")
+    return summary
@@ -0,0 +1,163 @@
+from typing import Dict, Optional, Tuple
+import hashlib
+import os
+import subprocess
+import uuid
+import numpy as np
+
+# --- Global config ---
+SAMPLE_RATE = 16000  # Whisper and pyannote both expect 16 kHz mono
+PCM_CACHE_DIR = os.environ.get("AREN_PCM_CACHE_DIR", "/tmp/aren_transcriber/pcm")
+PCM_CACHE_BYTES = int(os.environ.get("AREN_PCM_CACHE_BYTES", str(20 * 1024 ** 3)))
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def load_pcm(audio_path: str) -> np.ndarray:
+    """
+    Decode an audio file into 16 kHz mono float32 PCM.
+
+    Args:
+        audio_path (str): Path to the input audio file (MP3/M4A/etc.).
+
+    Returns:
+        np.ndarray: 1-D float32 array with samples in [-1.0, 1.0].
+    """
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(audio_path)
+    audio = audio.set_channels(1).set_frame_rate(SAMPLE_RATE)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    return samples / float(1 << (8 * audio.sample_width - 1))
+
+
+def segment_view(pcm: np.ndarray, seg: Dict, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Return the samples covered by a diarized segment as a view (no copy)."""
+    start = max(0, int(seg["start"] * sample_rate))
+    end = min(len(pcm), int(seg["end"] * sample_rate))
+    return pcm[start:max(start, end)]
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents, read in 1 MiB chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def decode_to_file(audio_path: str, out_path: str) -> None:
+    """Decode any ffmpeg-readable file into raw float32 16 kHz mono PCM at out_path."""
+    tmp_path = f"{out_path}.{uuid.uuid4().hex[:8]}.part"
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-i", audio_path,
+        "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "f32le", "-acodec", "pcm_f32le",
+        tmp_path,
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+        os.replace(tmp_path, out_path)  # atomic: readers never see a partial file
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg failed to decode {audio_path}: {e.stderr.decode(errors='replace')}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def open_pcm(pcm_path: str) -> np.ndarray:
+    """Memory-map a cached PCM file (copy-on-write, so torch can wrap it without copying)."""
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(pcm_path, dtype=np.float32, mode="c")
+
+
+def cached_pcm_path(digest: str, cache_dir: str = PCM_CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"{digest}.f32")
+
+
+def evict_pcm_cache(cache_dir: str = PCM_CACHE_DIR, max_bytes: int = PCM_CACHE_BYTES,
+                    keep: Optional[str] = None) -> int:
+    """
+    Delete the least recently used decoded files until the cache fits max_bytes.
+
+    Recency is the file's mtime, refreshed on every cache hit. Files already
+    memory-mapped stay readable after deletion. Returns the bytes freed.
+    """
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".f32") and entry.path != keep:
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    if keep and os.path.exists(keep):
+        total += os.path.getsize(keep)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+    if freed:
+        print(f"🧹 Evicted {freed / 1024 ** 2:.0f} MiB of decoded audio")
+    return freed
+
+
+def get_cached_pcm(
+    audio_path: str,
+    cache_dir: str = PCM_CACHE_DIR,
+    digest: Optional[str] = None,
+) -> Tuple[str, np.ndarray]:
+    """
+    Decode an upload once and share the PCM across every pipeline stage.
+
+    The decoded samples are stored as ``<sha256>.f32`` under cache_dir, so a
+    repeat upload of the same recording skips ffmpeg entirely. The cache is
+    kept under PCM_CACHE_BYTES by evicting the least recently used files.
+
+    Args:
+        audio_path (str): Path to the uploaded audio file.
+        cache_dir (str): Directory holding decoded PCM files.
+        digest (str, optional): Precomputed content hash of audio_path.
+
+    Returns:
+        Tuple[str, np.ndarray]: (content hash, memory-mapped float32 PCM).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = digest or file_digest(audio_path)
+    pcm_path = cached_pcm_path(digest, cache_dir)
+    if os.path.exists(pcm_path):
+        print(f"♻️ Reusing decoded audio {digest[:12]}")
+        os.utime(pcm_path)  # mark as recently used
+    else:
+        print("🔁 Decoding audio to 16 kHz PCM...")
+        decode_to_file(audio_path, pcm_path)
+        evict_pcm_cache(cache_dir, keep=pcm_path)
+    return digest, open_pcm(pcm_path)
+
+
+def probe_duration(audio_path: str, digest: Optional[str] = None, cache_dir: str = PCM_CACHE_DIR) -> float:
+    """Audio duration in seconds, from the PCM cache if present, else via ffprobe (no decode)."""
+    if digest:
+        pcm_path = cached_pcm_path(digest, cache_dir)
+        if os.path.exists(pcm_path):
+            return os.path.getsize(pcm_path) / 4 / SAMPLE_RATE
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        audio_path,
+    ]
+    try:
+        out = subprocess.run(cmd, check=True, capture_output=True).stdout.decode().strip()
+        return float(out)
+    except (subprocess.CalledProcessError, ValueError):
+        return 0.0
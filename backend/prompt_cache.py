@@ -0,0 +1,156 @@
+from typing import Dict, List, Optional, Tuple
+import copy
+import threading
+import weakref
+from backend.metrics import span
+
+# Stands in for the dialogue while the chat template is rendered, to find where the fixed prefix ends
+DIALOGUE_SENTINEL = "\u0000DIALOGUE\u0000"
+
+
+def split_prompt(tokenizer, prompt_template: str) -> Tuple[str, str]:
+    """
+    Rendered prompt text before and after the dialogue.
+
+    The chat template is applied once with a sentinel in place of the
+    dialogue; everything before it is the same for every chunk.
+    """
+    messages = [{"role": "user", "content": prompt_template.format(dialogue=DIALOGUE_SENTINEL)}]
+    if getattr(tokenizer, "chat_template", None):
+        text = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    else:
+        text = messages[0]["content"]
+    prefix, _, suffix = text.partition(DIALOGUE_SENTINEL)
+    return prefix, suffix
+
+
+def _repeat_cache(cache, n: int):
+    """Repeat a batch-of-one key/value cache n times along the batch dimension."""
+    if hasattr(cache, "batch_repeat_interleave"):
+        cache.batch_repeat_interleave(n)
+        return cache
+    return tuple(tuple(t.repeat_interleave(n, dim=0) for t in layer) for layer in cache)  # legacy tuples
+
+
+class PrefixCachedGenerator:
+    """
+    Greedy generation that reuses the key/value cache of a fixed prompt prefix.
+
+    The prefix is prefilled once; each batch then prefills only its own
+    dialogue tokens on top of a copy of that cache and decodes from there.
+    Prompts are tokenized whole, as the text-generation pipeline does, and
+    the cache is only reused when that tokenization starts with the prefix
+    tokens (a merge across the boundary falls back to a full prefill).
+    Rows of different length are padded between the prefix and the
+    dialogue, with position ids taken from the attention mask, so each row
+    sees the same positions as it would unpadded.
+    """
+
+    def __init__(self, model, tokenizer, prompt_template: str):
+        import torch
+        from transformers import DynamicCache
+
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prompt_template = prompt_template
+        self.chat = bool(getattr(tokenizer, "chat_template", None))
+        self.prefix_text, self.suffix_text = split_prompt(tokenizer, prompt_template)
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        eos = model.generation_config.eos_token_id if model.generation_config else None
+        eos = eos if eos is not None else tokenizer.eos_token_id
+        self.eos_ids = set(eos if isinstance(eos, (list, tuple)) else [eos])
+        self.prefix_ids = tokenizer(self.prefix_text, add_special_tokens=not self.chat)["input_ids"]
+        with torch.no_grad(), span("translate_prefix_prefill", items=1):
+            ids = torch.tensor([self.prefix_ids], device=model.device)
+            # an explicit cache object: older transformers would otherwise return legacy tuples
+            self.prefix_cache = model(input_ids=ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+
+    def prompt_ids(self, dialogue: str) -> List[int]:
+        """Token ids of the whole prompt for dialogue, tokenized as the text-generation pipeline does."""
+        content = self.prompt_template.format(dialogue=dialogue)
+        if not self.chat:
+            return self.tokenizer(content)["input_ids"]
+        ids = self.tokenizer.apply_chat_template([{"role": "user", "content": content}], tokenize=True,
+                                                 add_generation_prompt=True)
+        return list(ids["input_ids"] if hasattr(ids, "keys") else ids)
+
+    def generate(self, dialogues: List[str], max_new_tokens: int, reuse_prefix: bool = True) -> List[str]:
+        """
+        Greedy-decode a translation for each dialogue.
+
+        Args:
+            dialogues (List[str]): "SPEAKER: text" chunks, decoded as one batch.
+            max_new_tokens (int): Generation budget per chunk.
+            reuse_prefix (bool): Start from the cached prefix; False prefills the whole prompt (for comparison).
+
+        Returns:
+            List[str]: Generated text per dialogue, special tokens removed.
+        """
+        import torch
+        from transformers import DynamicCache
+
+        if not dialogues:
+            return []
+        full = [self.prompt_ids(d) for d in dialogues]
+        p = len(self.prefix_ids)
+        reuse_prefix = reuse_prefix and all(r[:p] == self.prefix_ids and len(r) > p for r in full)
+        rows = [r[p:] for r in full] if reuse_prefix else full
+        width = max(len(r) for r in rows)
+        device = self.model.device
+        lead = [1] * p if reuse_prefix else []
+        ids = torch.tensor([[self.pad_id] * (width - len(r)) + r for r in rows], device=device)
+        mask = torch.tensor([lead + [0] * (width - len(r)) + [1] * len(r) for r in rows], device=device)
+        positions = (mask.cumsum(-1) - 1).clamp(min=0)
+
+        if reuse_prefix:
+            cache = copy.deepcopy(self.prefix_cache)
+            if len(rows) > 1:
+                cache = _repeat_cache(cache, len(rows))
+            input_positions = positions[:, p:]
+        else:
+            cache, input_positions = DynamicCache(), positions
+
+        out_ids = [[] for _ in rows]
+        done = [False] * len(rows)
+        with torch.no_grad():
+            with span("translate_prefill", items=len(rows)):
+                out = self.model(input_ids=ids, attention_mask=mask, position_ids=input_positions,
+                                 past_key_values=cache, use_cache=True)
+            with span("translate_decode", items=len(rows)):
+                for step in range(max_new_tokens):
+                    next_ids = out.logits[:, -1, :].argmax(dim=-1)
+                    for i, tok in enumerate(next_ids.tolist()):
+                        if not done[i]:
+                            if tok in self.eos_ids:
+                                done[i] = True
+                            else:
+                                out_ids[i].append(tok)
+                    if all(done) or step == max_new_tokens - 1:
+                        break
+                    mask = torch.cat([mask, mask.new_ones((len(rows), 1))], dim=1)
+                    positions = positions[:, -1:] + 1
+                    out = self.model(input_ids=next_ids[:, None], attention_mask=mask, position_ids=positions,
+                                     past_key_values=out.past_key_values, use_cache=True)
+        return [self.tokenizer.decode(o, skip_special_tokens=True) for o in out_ids]
+
+
+_generators: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def prefix_generator(pipe, prompt_template: str) -> Optional[PrefixCachedGenerator]:
+    """
+    The prefix-cached generator for a loaded text-generation pipeline, built on first use.
+
+    Kept per model object, so it lives exactly as long as the registry keeps
+    the model loaded. Returns None for pipelines without a causal LM behind
+    them (such as the benchmark stand-ins).
+    """
+    model = getattr(pipe, "model", None)
+    if model is None or not hasattr(model, "generation_config"):
+        return None
+    with _lock:
+        entry: Dict = _generators.setdefault(model, {})
+        if prompt_template not in entry:
+            entry[prompt_template] = PrefixCachedGenerator(model, pipe.tokenizer, prompt_template)
+        return entry[prompt_template]
@@ -0,0 +1,184 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import gc
+import sys
+import threading
+import time
+
+GB = 1024 ** 3
+
+
+@dataclass
+class ModelEntry:
+    name: str
+    factory: Callable[[], Any]
+    size_bytes: int
+    model: Any = None
+    leases: int = 0
+    loading: bool = False  # size reserved in the budget while the factory runs
+    last_used: float = 0.0
+    loads: int = 0
+    hits: int = 0
+    evictions: int = 0
+    load_seconds: float = 0.0
+    load_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class ModelBudgetExceeded(RuntimeError):
+    pass
+
+
+class ModelRegistry:
+    """
+    Lazily loaded models with memory accounting and LRU eviction.
+
+    Each model is registered with a factory and an estimated resident size.
+    Loading a model that would push the total over budget_bytes first evicts
+    the least recently used models that are not currently leased. A budget
+    of 0 means unlimited.
+    """
+
+    def __init__(self, budget_bytes: int = 0):
+        self.budget_bytes = budget_bytes
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any], size_bytes: int = 0):
+        with self._lock:
+            self._entries[name] = ModelEntry(name=name, factory=factory, size_bytes=size_bytes)
+
+    def register_once(self, name: str, factory: Callable[[], Any], size_bytes: int = 0):
+        """Register name unless it already is (safe under concurrent first use)."""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = ModelEntry(name=name, factory=factory, size_bytes=size_bytes)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.size_bytes for e in self._entries.values() if e.model is not None or e.loading)
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entries[name].model is not None
+
+    def get(self, name: str) -> Any:
+        """Return the model, loading it (and evicting idle ones) if needed."""
+        entry = self._entries[name]
+        with self._lock:
+            if entry.model is not None:
+                entry.hits += 1
+                entry.last_used = time.time()
+                return entry.model
+
+        # Per-model lock: concurrent first requests load once, other models stay available
+        with entry.load_lock:
+            with self._lock:
+                if entry.model is not None:
+                    entry.hits += 1
+                    entry.last_used = time.time()
+                    return entry.model
+                self._make_room(entry)
+                entry.loading = True
+
+            print(f"⏳ Loading model {name}...")
+            t0 = time.perf_counter()
+            try:
+                model = entry.factory()
+            except BaseException:
+                with self._lock:
+                    entry.loading = False
+                raise
+            elapsed = time.perf_counter() - t0
+
+            with self._lock:
+                entry.model = model
+                entry.loading = False
+                entry.loads += 1
+                entry.load_seconds += elapsed
+                entry.last_used = time.time()
+            print(f"✅ Loaded {name} in {elapsed:.1f}s")
+            return model
+
+    @contextmanager
+    def use(self, name: str):
+        """Lease a model for the duration of a block; leased models are never evicted."""
+        with self._lock:
+            self._entries[name].leases += 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                self._entries[name].leases -= 1
+                self._entries[name].last_used = time.time()
+
+    def _make_room(self, entry: ModelEntry):
+        if not self.budget_bytes:
+            return
+        needed = self.resident_bytes() + entry.size_bytes - self.budget_bytes
+        idle = sorted(
+            (e for e in self._entries.values() if e.model is not None and e.leases == 0 and e is not entry),
+            key=lambda e: e.last_used,
+        )
+        for victim in idle:
+            if needed <= 0:
+                break
+            needed -= victim.size_bytes
+            self._unload(victim)
+        if needed > 0:
+            raise ModelBudgetExceeded(
+                f"cannot load {entry.name}: {needed / GB:.1f} GB over budget with leased models resident"
+            )
+
+    def _unload(self, entry: ModelEntry):
+        print(f"♻️ Evicting model {entry.name}")
+        entry.model = None
+        entry.evictions += 1
+        gc.collect()
+        torch = sys.modules.get("torch")  # only free the CUDA cache if torch is already in use
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            entry = self._entries[name]
+            if entry.model is None or entry.leases:
+                return False
+            self._unload(entry)
+            return True
+
+    def evict_all_except(self, keep: Iterable[str] = ()):
+        keep = set(keep)
+        for name in list(self._entries):
+            if name not in keep:
+                self.evict(name)
+
+    def prewarm(self, names: Iterable[str]):
+        for name in names:
+            if name in self._entries:
+                self.get(name)
+            else:
+                print(f"⚠️ Unknown model in prewarm list: {name}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": self.resident_bytes(),
+                "models": {
+                    e.name: {
+                        "loaded": e.model is not None,
+                        "loading": e.loading,
+                        "size_bytes": e.size_bytes,
+                        "leases": e.leases,
+                        "loads": e.loads,
+                        "hits": e.hits,
+                        "evictions": e.evictions,
+                        "load_seconds": round(e.load_seconds, 3),
+                        "last_used": e.last_used or None,
+                    }
+                    for e in self._entries.values()
+                },
+            }
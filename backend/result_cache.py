@@ -0,0 +1,103 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- Global config ---
+RESULT_CACHE_DIR = os.environ.get("AREN_RESULT_CACHE_DIR", "/tmp/aren_transcriber/results")
+RESULT_CACHE_BYTES = int(os.environ.get("AREN_RESULT_CACHE_BYTES", str(2 * 1024 ** 3)))
+
+
+def make_key(**parts) -> str:
+    """Stable key for a stage result: SHA-256 of the parameters it depends on."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent, size-bounded cache of pipeline stage results.
+
+    Entries are JSON values in a SQLite file, grouped by stage
+    ("diarization", "transcript", "translation"). When the total size
+    exceeds max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, "results.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, stage TEXT, value TEXT, size INTEGER, last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self._db.commit()
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, stage: str, field: str):
+        self._stats.setdefault(stage, {"hits": 0, "misses": 0, "writes": 0, "evictions": 0})[field] += 1
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count(stage, "misses")
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self._count(stage, "hits")
+        return json.loads(row[0])
+
+    def put(self, stage: str, key: str, value: Any):
+        blob = json.dumps(value, ensure_ascii=False)
+        size = len(blob.encode("utf-8"))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, stage, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, blob, size, time.time()),
+            )
+            self._total += size - (old[0] if old else 0)
+            self._count(stage, "writes")
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        while self._total > self.max_bytes:
+            row = self._db.execute(
+                "SELECT key, stage, size FROM entries ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            self._total -= row[2]
+            self._count(row[1], "evictions")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stages = {}
+            for stage, s in self._stats.items():
+                lookups = s["hits"] + s["misses"]
+                stages[stage] = {**s, "hit_rate": round(s["hits"] / lookups, 4) if lookups else None}
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"bytes": self._total, "max_bytes": self.max_bytes, "entries": entries, "stages": stages}
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+    return _result_cache
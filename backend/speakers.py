@@ -0,0 +1,124 @@
+from typing import List, Optional, Tuple
+from functools import lru_cache
+import os
+import numpy as np
+from backend.pcm import SAMPLE_RATE
+
+# Speaker embeddings for short clips, without running the full pyannote pipeline.
+# The pyannote pipeline's own embedding model (WeSpeaker ResNet34) is used when the
+# pipeline exposes it; otherwise, or with AREN_SPEAKER_EMBEDDING=spectral, a cepstral
+# summary of the clip is used, which is CPU-only and needs no model at all.
+
+# --- Global config ---
+SPEAKER_EMBEDDING = os.environ.get("AREN_SPEAKER_EMBEDDING", "pyannote")  # "pyannote" or "spectral"
+# Cosine similarity above which a clip joins an existing speaker, per embedding kind
+SAME_SPEAKER_SIMILARITY = {"pyannote": 0.5, "spectral": 0.97}
+N_MELS = 40
+N_CEPS = 20
+FRAME_MS = 25.0
+HOP_MS = 10.0
+
+
+@lru_cache(maxsize=4)
+def _mel_filterbank(n_fft: int, n_mels: int, sample_rate: int) -> np.ndarray:
+    """Triangular filters on the mel scale, shape (n_mels, n_fft // 2 + 1)."""
+    mel = lambda hz: 2595.0 * np.log10(1.0 + hz / 700.0)
+    hz = lambda m: 700.0 * (10 ** (m / 2595.0) - 1.0)
+    edges = hz(np.linspace(mel(60.0), mel(sample_rate / 2 * 0.95), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lo, mid, hi = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lo) / (mid - lo)
+    falling = (hi - bins) / (hi - mid)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n_in: int, n_out: int) -> np.ndarray:
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    return np.cos(np.pi / n_in * (n + 0.5) * k).astype(np.float32)
+
+
+def cepstra(clip: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """MFCC-style cepstra per 25 ms frame (10 ms hop), shape (frames, N_CEPS); c0 is log energy."""
+    frame = int(FRAME_MS * sample_rate / 1000)
+    hop = int(HOP_MS * sample_rate / 1000)
+    if len(clip) < frame:
+        return np.empty((0, N_CEPS), dtype=np.float32)
+    n = 1 + (len(clip) - frame) // hop
+    idx = np.arange(frame)[None, :] + hop * np.arange(n)[:, None]
+    frames = np.asarray(clip, dtype=np.float32)[idx] * np.hanning(frame).astype(np.float32)
+    n_fft = 1 << (frame - 1).bit_length()
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2
+    log_mel = np.log(power @ _mel_filterbank(n_fft, N_MELS, sample_rate).T + 1e-10)
+    return log_mel @ _dct_matrix(N_MELS, N_CEPS).T
+
+
+def spectral_embedding(clip: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Mean and spread of the cepstra over the clip's louder frames (c0 dropped), unit length."""
+    ceps = cepstra(clip, sample_rate)
+    if not len(ceps):
+        return np.zeros(2 * (N_CEPS - 1), dtype=np.float32)
+    voiced = ceps[ceps[:, 0] >= np.percentile(ceps[:, 0], 30)]
+    vec = np.concatenate([voiced[:, 1:].mean(axis=0), voiced[:, 1:].std(axis=0)])
+    return (vec / (np.linalg.norm(vec) + 1e-9)).astype(np.float32)
+
+
+def embedding_kind(pipeline=None) -> str:
+    """"pyannote" when the pipeline exposes its embedding model and it is enabled, else "spectral"."""
+    if SPEAKER_EMBEDDING == "pyannote" and getattr(pipeline, "_embedding", None) is not None:
+        return "pyannote"
+    return "spectral"
+
+
+def embed_clips(clips: List[np.ndarray], pipeline=None, sample_rate: int = SAMPLE_RATE) -> Tuple[np.ndarray, str]:
+    """
+    One unit-length speaker embedding per clip.
+
+    Args:
+        clips (List[np.ndarray]): 16 kHz mono float32 clips (a second or more works best).
+        pipeline: Loaded pyannote diarization pipeline whose embedding model is reused; spectral if None.
+
+    Returns:
+        Tuple[np.ndarray, str]: (embeddings of shape (len(clips), dim), embedding kind).
+    """
+    kind = embedding_kind(pipeline)
+    if kind == "spectral" or not clips:
+        return np.stack([spectral_embedding(c, sample_rate) for c in clips]) if clips else np.empty((0, 0)), kind
+    import torch
+    longest = max(len(c) for c in clips)
+    batch = np.zeros((len(clips), 1, longest), dtype=np.float32)
+    masks = np.zeros((len(clips), longest), dtype=np.float32)
+    for i, c in enumerate(clips):
+        batch[i, 0, :len(c)] = c
+        masks[i, :len(c)] = 1.0
+    emb = np.asarray(pipeline._embedding(torch.from_numpy(batch), masks=torch.from_numpy(masks)))
+    emb = np.nan_to_num(emb)
+    return emb / (np.linalg.norm(emb, axis=1, keepdims=True) + 1e-9), kind
+
+
+class OnlineSpeakers:
+    """
+    Incremental speaker assignment: each clip joins the most similar speaker
+    centroid, or opens a new speaker while fewer than max_speakers exist.
+    """
+
+    def __init__(self, max_speakers: int = 2, threshold: Optional[float] = None):
+        self.max_speakers = max(1, max_speakers)
+        self.threshold = threshold
+        self.centroids: List[np.ndarray] = []
+        self.counts: List[int] = []
+
+    def assign(self, embedding: np.ndarray, kind: str = "spectral") -> Tuple[int, float]:
+        """Speaker index for embedding and its similarity to that speaker (1.0 for a new one)."""
+        threshold = self.threshold if self.threshold is not None else SAME_SPEAKER_SIMILARITY[kind]
+        if self.centroids:
+            sims = np.array([float(c @ embedding) / (np.linalg.norm(c) + 1e-9) for c in self.centroids])
+            best = int(sims.argmax())
+            if sims[best] >= threshold or len(self.centroids) >= self.max_speakers:
+                self.counts[best] += 1
+                self.centroids[best] += (embedding - self.centroids[best]) / self.counts[best]
+                return best, float(sims[best])
+        self.centroids.append(embedding.astype(np.float32).copy())
+        self.counts.append(1)
+        return len(self.centroids) - 1, 1.0
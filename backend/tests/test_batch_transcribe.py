@@ -0,0 +1,81 @@
+"""Batched segment transcription yields the same turns as one transcribe() call per segment."""
+import os
+import numpy as np
+import pytest
+from backend import batch_transcribe
+from backend.batch_transcribe import _timestamped_text, split_clips, transcribe_segment_texts
+from backend.benchmarks.stubs import SAMPLE_RATE, StubWhisperModel, read_wav, synthetic_pcm, synthetic_segments
+
+
+class FakeTokenizer:
+    timestamp_begin = 100
+
+    def decode(self, tokens):
+        return "".join(f" t{t}" for t in tokens if t < self.timestamp_begin)
+
+
+def per_segment_texts(model, pcm, segments, language):
+    texts = []
+    for seg in segments:
+        clip = pcm[int(seg["start"] * SAMPLE_RATE):int(seg["end"] * SAMPLE_RATE)]
+        w_segments, _ = model.transcribe(clip, language=language, beam_size=5)
+        texts.append(" ".join(s.text.strip() for s in w_segments).strip())
+    return texts
+
+
+def test_timestamped_text_joins_segments_like_transcribe():
+    tok = FakeTokenizer()
+    assert _timestamped_text(tok, [100, 1, 2, 150, 150, 3, 200]) == "t1 t2 t3"
+    assert _timestamped_text(tok, [100, 1, 2, 150]) == "t1 t2"
+
+
+def test_timestamped_text_defers_when_transcribe_would_seek():
+    # ends on a timestamp pair followed by text: transcribe() decodes the rest again from there
+    assert _timestamped_text(FakeTokenizer(), [100, 1, 150, 150, 2, 3]) is None
+
+
+def test_long_segments_are_not_cut():
+    pcm = synthetic_pcm(90)
+    segments = [{"start": 0.0, "end": 75.0, "speaker": "M"}, {"start": 75.0, "end": 90.0, "speaker": "R"}]
+    clips = split_clips(pcm, segments)
+    assert [len(c) for _, c in clips] == [75 * SAMPLE_RATE, 15 * SAMPLE_RATE]
+
+
+def test_long_segments_go_through_transcribe(monkeypatch):
+    model = StubWhisperModel()
+    model.feature_extractor, model.model = object(), type("CT2", (), {"generate": None})()
+    batched_lengths = []
+
+    def fake_batch(model, clips, language, beam_size):
+        batched_lengths.extend(len(c) for c in clips)
+        return ["batched"] * len(clips)
+
+    monkeypatch.setattr(batch_transcribe, "_decode_batch_ct2", fake_batch)
+    pcm = synthetic_pcm(100)
+    segments = [{"start": 0.0, "end": 20.0, "speaker": "M"}, {"start": 20.0, "end": 80.0, "speaker": "R"},
+                {"start": 80.0, "end": 100.0, "speaker": "M"}]
+    texts = transcribe_segment_texts(model, pcm, segments, "en")
+    assert texts[0] == texts[2] == "batched"
+    assert texts[1] == per_segment_texts(StubWhisperModel(), pcm, segments[1:2], "en")[0]
+    assert batched_lengths == [20 * SAMPLE_RATE, 20 * SAMPLE_RATE]
+
+
+def test_stub_model_turns_match_per_segment_path():
+    pcm = synthetic_pcm(300)
+    segments = synthetic_segments(300)
+    model = StubWhisperModel()
+    assert transcribe_segment_texts(model, pcm, segments, "en") == per_segment_texts(model, pcm, segments, "en")
+
+
+@pytest.mark.skipif(not os.environ.get("AREN_TEST_WHISPER_MODEL") or not os.environ.get("AREN_TEST_AUDIO"),
+                    reason="set AREN_TEST_WHISPER_MODEL (faster-whisper model) and AREN_TEST_AUDIO (16 kHz WAV)")
+def test_real_model_turns_match_per_segment_path():
+    faster_whisper = pytest.importorskip("faster_whisper")
+    model = faster_whisper.WhisperModel(os.environ["AREN_TEST_WHISPER_MODEL"], device="cpu", compute_type="int8")
+    pcm = read_wav(os.environ["AREN_TEST_AUDIO"])
+    seconds = len(pcm) / SAMPLE_RATE
+    segments = synthetic_segments(seconds)  # turn boundaries need not match speech for this comparison
+    language = os.environ.get("AREN_TEST_LANGUAGE", "en")
+    assert batch_transcribe.supports_batching(model)
+    batched = transcribe_segment_texts(model, pcm, segments, language, batch_size=8)
+    assert batched == per_segment_texts(model, pcm, segments, language)
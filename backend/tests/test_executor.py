@@ -0,0 +1,113 @@
+"""PipelinedExecutor: stage ordering, backpressure between stages, and error propagation."""
+import threading
+import time
+from backend.executor import PipelinedExecutor, Stage
+
+
+def run(executor, jobs, timeout=5.0):
+    """Submit jobs and wait until every one has left the pipeline."""
+    for ctx in jobs:
+        executor.submit(ctx)
+    for ctx in jobs:
+        assert ctx["done"].wait(timeout)
+
+
+def make_job(uid):
+    return {"uid": uid, "trail": [], "done": threading.Event()}
+
+
+def record(name):
+    def fn(ctx):
+        ctx["trail"].append(name)
+    return fn
+
+
+def test_each_job_runs_every_stage_in_order():
+    finished = []
+    executor = PipelinedExecutor(
+        [Stage("decode", record("decode")), Stage("diarize", record("diarize"), workers=2),
+         Stage("transcribe", record("transcribe"))],
+        on_done=lambda ctx: (finished.append(ctx["uid"]), ctx["done"].set()),
+    )
+    executor.start()
+    jobs = [make_job(i) for i in range(6)]
+    run(executor, jobs)
+    executor.shutdown()
+    assert all(ctx["trail"] == ["decode", "diarize", "transcribe"] for ctx in jobs)
+    assert sorted(finished) == list(range(6))
+    assert executor.stats()["stages"]["diarize"]["processed"] == 6
+
+
+def test_single_worker_stages_keep_submission_order():
+    finished = []
+    executor = PipelinedExecutor([Stage("a", record("a")), Stage("b", record("b"))],
+                                 on_done=lambda ctx: (finished.append(ctx["uid"]), ctx["done"].set()))
+    executor.start()
+    jobs = [make_job(i) for i in range(10)]
+    run(executor, jobs)
+    executor.shutdown()
+    assert finished == list(range(10))
+
+
+def test_slow_stage_backs_up_its_predecessor():
+    release = threading.Event()
+    executor = PipelinedExecutor(
+        [Stage("fast", record("fast"), queue_size=1), Stage("slow", lambda ctx: release.wait(), queue_size=1)],
+        on_done=lambda ctx: ctx["done"].set(),
+    )
+    executor.start()
+    jobs = [make_job(i) for i in range(6)]
+    # slow holds 1, its queue 1, fast blocked on a put 1, fast's queue 1: the fifth submit must block
+    submitted = []
+    submitter = threading.Thread(target=lambda: [(executor.submit(ctx), submitted.append(ctx)) for ctx in jobs])
+    submitter.start()
+    time.sleep(0.3)
+    assert len(submitted) < len(jobs)
+    assert executor.capacity() == 4
+    release.set()
+    submitter.join(5)
+    for ctx in jobs:
+        assert ctx["done"].wait(5)
+    executor.shutdown()
+    assert executor.stats()["stages"]["fast"]["blocked_seconds"] > 0
+
+
+def test_failed_stage_sets_error_and_skips_the_rest():
+    def explode(ctx):
+        if ctx["uid"] == 1:
+            raise ValueError("bad audio")
+        ctx["trail"].append("diarize")
+
+    executor = PipelinedExecutor([Stage("diarize", explode), Stage("transcribe", record("transcribe"))],
+                                 on_done=lambda ctx: ctx["done"].set())
+    executor.start()
+    jobs = [make_job(i) for i in range(3)]
+    run(executor, jobs)
+    executor.shutdown()
+    assert jobs[1]["error"] == "diarize: bad audio"
+    assert jobs[1]["trail"] == []
+    assert all("error" not in jobs[i] and jobs[i]["trail"] == ["diarize", "transcribe"] for i in (0, 2))
+    assert executor.stats()["stages"]["diarize"]["failed"] == 1
+    assert executor.stats()["stages"]["transcribe"]["processed"] == 2
+
+
+def test_device_context_wraps_each_call_on_its_worker():
+    seen, active = [], threading.local()
+
+    class Device:
+        def __init__(self, device):
+            self.device = device
+
+        def __enter__(self):
+            active.device = self.device
+
+        def __exit__(self, *exc):
+            active.device = None
+
+    executor = PipelinedExecutor([Stage("gpu", lambda ctx: seen.append(active.device), workers=2,
+                                        devices=["cuda:0", "cuda:1"])],
+                                 on_done=lambda ctx: ctx["done"].set(), device_context=Device)
+    executor.start()
+    run(executor, [make_job(i) for i in range(8)])
+    executor.shutdown()
+    assert set(seen) <= {"cuda:0", "cuda:1"} and len(seen) == 8
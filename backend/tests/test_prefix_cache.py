@@ -0,0 +1,72 @@
+"""Greedy outputs with the cached prompt prefix match a full prefill, generate() and the text-generation pipeline."""
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("tokenizers")
+
+from backend.prompt_cache import PrefixCachedGenerator
+from backend.translate_ar import PROMPT_TEMPLATE, chunk_turns_by_tokens, llm_translate_batch
+from backend.benchmarks.bench_prefix_cache import tiny_model, tiny_tokenizer
+from backend.benchmarks.bench_translate_batch import synthetic_turns
+
+MAX_NEW_TOKENS = 12
+
+
+@pytest.fixture(scope="module")
+def setup():
+    turns = synthetic_turns(24)
+    corpus = [PROMPT_TEMPLATE, *(f"{sp}: {txt}" for sp, txt in turns)]
+    tokenizer = tiny_tokenizer(corpus)
+    tokenizer.pad_token = tokenizer.eos_token
+    # uneven chunk sizes, so batched rows are padded
+    dialogues = ["\n".join(f"{sp}: {txt}" for sp, txt in chunk)
+                 for chunk, _, _ in chunk_turns_by_tokens(turns, tokenizer, 120)][:5]
+    model = tiny_model(tokenizer)
+    return model, tokenizer, PrefixCachedGenerator(model, tokenizer, PROMPT_TEMPLATE), dialogues
+
+
+def reference_generate(model, tokenizer, ids):
+    out = model.generate(input_ids=torch.tensor([ids]), max_new_tokens=MAX_NEW_TOKENS,
+                         do_sample=False, pad_token_id=tokenizer.eos_token_id)
+    return tokenizer.decode(out[0, len(ids):], skip_special_tokens=True)
+
+
+def test_prefix_cache_matches_full_prefill(setup):
+    _, _, generator, dialogues = setup
+    cached = generator.generate(dialogues, MAX_NEW_TOKENS, reuse_prefix=True)
+    full = generator.generate(dialogues, MAX_NEW_TOKENS, reuse_prefix=False)
+    assert cached == full
+
+
+def test_prefix_cache_matches_generate(setup):
+    model, tokenizer, generator, dialogues = setup
+    cached = generator.generate(dialogues, MAX_NEW_TOKENS, reuse_prefix=True)
+    assert cached == [reference_generate(model, tokenizer, generator.prompt_ids(d)) for d in dialogues]
+
+
+def test_prefix_cache_matches_text_generation_pipeline(setup):
+    model, tokenizer, _, dialogues = setup
+    pipe = transformers.pipeline("text-generation", model=model, tokenizer=tokenizer)
+    cached = llm_translate_batch(pipe, dialogues, batch_size=4, max_new_tokens=MAX_NEW_TOKENS, prefix_cache=True)
+    plain = [llm_translate_batch(pipe, [d], batch_size=1, max_new_tokens=MAX_NEW_TOKENS, prefix_cache=False)[0]
+             for d in dialogues]
+    assert cached == plain
+
+
+def test_boundary_merge_falls_back_to_whole_prompt_tokenization(setup):
+    model, tokenizer, _, _ = setup
+    template = "Now transl{dialogue}"  # the dialogue's first word joins the prefix's last one
+    generator = PrefixCachedGenerator(model, tokenizer, template)
+    dialogues = ["ate this part: " + PROMPT_TEMPLATE[:40], "ate: " + PROMPT_TEMPLATE[:60]]
+    whole = [generator.prompt_ids(d) for d in dialogues]
+    assert any(ids[:len(generator.prefix_ids)] != generator.prefix_ids for ids in whole)
+    assert generator.generate(dialogues, MAX_NEW_TOKENS) == [reference_generate(model, tokenizer, ids)
+                                                              for ids in whole]
+
+
+def test_prefix_cache_is_not_mutated_between_batches(setup):
+    _, _, generator, dialogues = setup
+    first = generator.generate(dialogues[:2], MAX_NEW_TOKENS)
+    generator.generate(dialogues[2:], MAX_NEW_TOKENS)
+    assert generator.generate(dialogues[:2], MAX_NEW_TOKENS) == first
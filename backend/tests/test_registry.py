@@ -0,0 +1,126 @@
+"""ModelRegistry: budget accounting, LRU eviction around leases, and concurrent loads."""
+import threading
+import time
+import pytest
+from backend.registry import ModelBudgetExceeded, ModelRegistry
+
+
+def counting_factory(name, loads, delay=0.0):
+    def load():
+        time.sleep(delay)
+        loads.append(name)
+        return object()
+    return load
+
+
+def make_registry(budget, sizes, loads, delay=0.0):
+    registry = ModelRegistry(budget_bytes=budget)
+    for name, size in sizes.items():
+        registry.register(name, counting_factory(name, loads, delay), size_bytes=size)
+    return registry
+
+
+def test_budget_accounting_counts_resident_models_only():
+    loads = []
+    registry = make_registry(100, {"a": 30, "b": 50}, loads)
+    assert registry.resident_bytes() == 0
+    registry.get("a")
+    registry.get("b")
+    assert registry.resident_bytes() == 80
+    assert registry.evict("a")
+    assert registry.resident_bytes() == 50
+    assert registry.stats()["models"]["a"]["evictions"] == 1
+
+
+def test_get_hits_without_reloading():
+    loads = []
+    registry = make_registry(0, {"a": 10}, loads)
+    assert registry.get("a") is registry.get("a")
+    assert loads == ["a"]
+    assert registry.stats()["models"]["a"]["hits"] == 1
+
+
+def test_lru_eviction_skips_leased_models():
+    loads = []
+    registry = make_registry(100, {"a": 40, "b": 40, "c": 40}, loads)
+    with registry.use("a"):
+        registry.get("b")
+        time.sleep(0.01)
+        registry.get("c")  # over budget: b is the only idle model
+        assert registry.is_loaded("a") and registry.is_loaded("c")
+        assert not registry.is_loaded("b")
+
+
+def test_eviction_order_is_least_recently_used():
+    loads = []
+    registry = make_registry(100, {"a": 40, "b": 40, "c": 40}, loads)
+    registry.get("a")
+    time.sleep(0.01)
+    registry.get("b")
+    time.sleep(0.01)
+    registry.get("a")  # a is now more recent than b
+    registry.get("c")
+    assert registry.is_loaded("a") and not registry.is_loaded("b")
+
+
+def test_budget_exceeded_when_only_leased_models_resident():
+    loads = []
+    registry = make_registry(100, {"a": 60, "b": 60}, loads)
+    with registry.use("a"):
+        with pytest.raises(ModelBudgetExceeded):
+            registry.get("b")
+    assert registry.resident_bytes() == 60
+
+
+def test_leased_model_is_not_evicted_explicitly():
+    registry = make_registry(0, {"a": 10}, [])
+    with registry.use("a"):
+        assert not registry.evict("a")
+    assert registry.evict("a")
+
+
+def test_concurrent_get_of_same_model_loads_once():
+    loads = []
+    registry = make_registry(0, {"a": 10}, loads, delay=0.05)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("a"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == ["a"]
+    assert len(results) == 8 and all(r is results[0] for r in results)
+
+
+def test_concurrent_loads_of_different_models_stay_within_budget():
+    loads = []
+    registry = make_registry(100, {"a": 60, "b": 60}, loads, delay=0.2)
+    errors = []
+
+    def load(name):
+        try:
+            with registry.use(name):
+                assert registry.resident_bytes() <= 100
+        except ModelBudgetExceeded as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(errors) == 1  # the second load saw the first one's reservation
+    assert registry.resident_bytes() <= 100
+
+
+def test_failed_load_releases_its_reservation():
+    registry = ModelRegistry(budget_bytes=100)
+
+    def broken():
+        raise RuntimeError("no weights")
+
+    registry.register("a", broken, size_bytes=80)
+    with pytest.raises(RuntimeError):
+        registry.get("a")
+    assert registry.resident_bytes() == 0
+    assert not registry.stats()["models"]["a"]["loading"]
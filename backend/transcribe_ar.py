@@ -1,69 +1,81 @@
-from typing import List, Tuple
-import json
-from pydub import AudioSegment
-from faster_whisper import WhisperModel
-import torch
-import os
-from backend import get_levantine_whisper
+from typing import Callable, List, Dict, Tuple, Optional
+import numpy as np
+from backend import use_model, current_device, LEVANTINE_WHISPER_ID
+from backend.autotune import whisper_settings
+from backend.result_cache import get_result_cache
+from backend.pcm import load_pcm
+from backend.journal import Journal
+from backend.vad import VadConfig
+from backend.batch_transcribe import transcribe_segment_texts, DEFAULT_BATCH_SIZE
 
-# --- Load audio and prepare ---
-audio = AudioSegment.from_file(audio_path)
-audio = audio.set_channels(1).set_frame_rate(16000)
-
-# --- Load Whisper model ---
-model = get_levantine_whisper()
 
 def transcribe_arabic(
     audio_path: str,
     segments: List[Dict],
     device: str = "cuda",
     compute_type: str = "float16",
-    beam_size: int = 5,
+    beam_size: Optional[int] = None,
+    pcm: Optional[np.ndarray] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_segment: Optional[Callable[[int, Dict, str], None]] = None,
+    audio_hash: Optional[str] = None,
+    journal: Optional[Journal] = None,
+    pack: bool = False,
+    vad: Optional[VadConfig] = None,
 ) -> List[Tuple[str, str]]:
     """
     Transcribe Arabic audio with speaker diarization.
 
     Args:
         audio_path (str): Path to the input audio file (MP3/M4A/etc.).
-        diarization_json (str): Path to the JSON file containing diarization segments.
+        segments (List[Dict]): Diarization output (list of {start, end, speaker} dicts).
         device (str): Device for Whisper model ("cuda" or "cpu").
         compute_type (str): Compute type for Whisper model ("float16", "int8", etc.).
-        beam_size (int): Beam size for transcription.
+        beam_size (int, optional): Beam size; the one tuned for this host (see backend.autotune) if None.
+        pcm (np.ndarray, optional): Already decoded 16 kHz mono PCM; decoded from audio_path if None.
+        batch_size (int): Number of segment clips per Whisper call.
+        on_segment (Callable, optional): Called as on_segment(index, segment, text) as each segment finishes.
+        audio_hash (str, optional): Content hash of the audio; enables the per-segment result cache.
+        journal (Journal, optional): Job journal; finished segments are appended and replayed on resume.
+        pack (bool): Pack short consecutive segments into ~30 s Whisper windows and split
+            the text back by word timestamps.
+        vad (VadConfig, optional): Cut non-speech inside segments before Whisper (see backend.vad).
 
     Returns:
         List[Tuple[str, str]]: List of tuples (speaker, transcribed text).
     """
 
-    turns: List[Tuple[str, str]] = []
-    total_segments = len(segments)
-
-    for idx, seg in enumerate(segments, start=1):
-        speaker = seg["speaker"]
-        start_ms = int(seg["start"] * 1000)
-        end_ms = int(seg["end"] * 1000)
-
-        print(f"[{idx}/{total_segments}] Processing segment... "
-              f"Speaker: {speaker}, Start: {seg['start']:.2f}s, End: {seg['end']:.2f}s")
+    # --- Load audio and prepare ---
+    if pcm is None:
+        pcm = load_pcm(audio_path)
 
-        snippet = audio[start_ms:end_ms]
-        snippet_path = f"segment_{idx:03d}.wav"
-        snippet.export(snippet_path, format="wav")
-
-        w_segments, _ = model.transcribe(
-            snippet_path,
-            language="ar",
-            beam_size=beam_size,
-        )
+    total_segments = len(segments)
+    mode = "packed windows" if pack else f"batch size {batch_size}"
+    print(f"🧠 Transcribing {total_segments} segments ({mode})...")
 
-        text = " ".join(s.text.strip() for s in w_segments).strip()
+    def report(idx: int, text: str):
+        seg = segments[idx]
+        print(f"[{idx + 1}/{total_segments}] Speaker: {seg['speaker']}, "
+              f"Start: {seg['start']:.2f}s, End: {seg['end']:.2f}s")
         if text:
-            turns.append((speaker, text))
             print(f"   ✅ Done, text length: {len(text)} chars")
         else:
             print("   ⚠️ No text detected")
+        if on_segment:
+            on_segment(idx, seg, text)
 
-        # Optional: clean up snippet file to save space
-        os.remove(snippet_path)
+    settings = whisper_settings("levantine_whisper", current_device())
+    beam_size = beam_size or settings.beam_size
+    cache_scope = {"audio": audio_hash, "model": LEVANTINE_WHISPER_ID, "language": "ar", "beam_size": beam_size,
+                   "compute_type": settings.compute_type}
+    # --- Load Whisper model (leased for the whole pass) ---
+    with use_model("levantine_whisper") as model:
+        texts = transcribe_segment_texts(
+            model, pcm, segments, language="ar", beam_size=beam_size, batch_size=batch_size, on_segment=report,
+            cache=get_result_cache() if audio_hash else None, cache_scope=cache_scope, journal=journal,
+            pack=pack, vad=vad,
+        )
+    turns: List[Tuple[str, str]] = [(seg["speaker"], text) for seg, text in zip(segments, texts) if text]
 
     print(f"\n📄 Transcription completed | total turns: {len(turns)}")
     return turns
@@ -1,39 +1,56 @@
-from typing import List, Dict, Tuple
-import json
-from pydub import AudioSegment
-from faster_whisper import WhisperModel
-from docx import Document
-from docx.shared import RGBColor, Pt
-from your_package_name import get_large_whisper
+from typing import Callable, List, Dict, Tuple, Optional
+import numpy as np
+from backend import use_model, current_device, LARGE_WHISPER_ID
+from backend.autotune import whisper_settings
+from backend.result_cache import get_result_cache
+from backend.pcm import load_pcm
+from backend.journal import Journal
+from backend.vad import VadConfig
+from backend.metrics import span
+from backend.docx_render import render_docx
+from backend.batch_transcribe import transcribe_segments, DEFAULT_BATCH_SIZE
 
-# ——— Helpers ———
-def delete_paragraph(paragraph):
-    """Hard-delete a paragraph from the doc body."""
-    p = paragraph._element
-    p.getparent().remove(p)
-    paragraph._p = paragraph._element = None
+def save_transcript_docx(turns: List[Tuple[str, str]], template_path: str, output_docx: str) -> str:
+    """Write (speaker, text) turns into a copy of the DOCX template (see backend.docx_render)."""
+    with span("docx", items=len(turns)):
+        render_docx(turns, template_path, output_docx)
+    print(f"📄 Transcription saved to: {output_docx} | total turns: {len(turns)}")
+    return output_docx
 
-def add_turn(doc, speaker, text):
-    """
-    Add one dialogue line like:
-    M: Hello there
-    - whole line red if M
-    - blank line (0.6 spacing) before each M entry
+def transcribe_en_turns(
+    audio_path: str,
+    segments: List[Dict],
+    beam_size: Optional[int] = None,
+    pcm: Optional[np.ndarray] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_segment: Optional[Callable[[int, Dict, str], None]] = None,
+    audio_hash: Optional[str] = None,
+    journal: Optional[Journal] = None,
+    pack: bool = False,
+    vad: Optional[VadConfig] = None,
+) -> List[Tuple[str, str]]:
     """
-    if speaker == "M":
-        blank = doc.add_paragraph()
-        blank.paragraph_format.line_spacing = 0.6
+    Transcribe English diarized segments into (speaker, text) turns.
 
-    para = doc.add_paragraph()
-    para.paragraph_format.space_after = Pt(6)
-
-    run = para.add_run(f"{speaker}: {text}")
-
-    if speaker == "M":
-        run.font.color.rgb = RGBColor(255, 0, 0)  # whole line red
+    Arguments are as for ``transcribe_en``; usable on partial segment lists
+    (e.g. blocks from windowed diarization).
+    """
+    # Load audio
+    if pcm is None:
+        pcm = load_pcm(audio_path)
 
-# Load Whisper model
-model = get_large_whisper()
+    # Transcribe diarized segments in batches, straight from memory
+    report = (lambda idx, text: on_segment(idx, segments[idx], text)) if on_segment else None
+    settings = whisper_settings("large_whisper", current_device())
+    beam_size = beam_size or settings.beam_size
+    cache_scope = {"audio": audio_hash, "model": LARGE_WHISPER_ID, "language": "en", "beam_size": beam_size,
+                   "compute_type": settings.compute_type}
+    with use_model("large_whisper") as model:
+        return transcribe_segments(
+            model, pcm, segments, language="en", beam_size=beam_size, batch_size=batch_size, on_segment=report,
+            cache=get_result_cache() if audio_hash else None, cache_scope=cache_scope, journal=journal,
+            pack=pack, vad=vad,
+        )
 
 # ——— Main function ———
 def transcribe_en(
@@ -42,7 +59,14 @@ def transcribe_en(
     template_path: str,
     output_docx: str,
     device: str = "cuda",
-    beam_size: int = 5
+    beam_size: Optional[int] = None,
+    pcm: Optional[np.ndarray] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_segment: Optional[Callable[[int, Dict, str], None]] = None,
+    audio_hash: Optional[str] = None,
+    journal: Optional[Journal] = None,
+    pack: bool = False,
+    vad: Optional[VadConfig] = None,
 ) -> str:
     """
     Transcribe English audio with diarization and save directly to DOCX.
@@ -53,43 +77,20 @@ def transcribe_en(
         template_path (str): Path to DOCX template (header/footer preserved)
         output_docx (str): Path where final DOCX will be saved
         device (str): Device for Whisper model
-        beam_size (int): Beam size for Whisper
+        beam_size (int, optional): Beam size for Whisper; the tuned one for this host if None
+        pcm (np.ndarray, optional): Already decoded 16 kHz mono PCM; decoded from audio_path if None
+        batch_size (int): Number of segment clips per Whisper call
+        on_segment (Callable, optional): Called as on_segment(index, segment, text) as each segment finishes
+        audio_hash (str, optional): Content hash of the audio; enables the per-segment result cache
+        journal (Journal, optional): Job journal; finished segments are appended and replayed on resume
+        pack (bool): Pack short consecutive segments into ~30 s Whisper windows and split
+            the text back by word timestamps
+        vad (VadConfig, optional): Cut non-speech inside segments before Whisper (see backend.vad)
 
     Returns:
         str: Path to saved DOCX
     """
-    # Load audio
-    audio = AudioSegment.from_file(audio_path)
-    audio = audio.set_channels(1).set_frame_rate(16000)
-
-    # Transcribe each diarized segment
-    turns: List[Tuple[str, str]] = []
-    for idx, seg in enumerate(segments, start=1):
-        start_ms = int(seg["start"] * 1000)
-        end_ms = int(seg["end"] * 1000)
-        speaker = seg["speaker"]
-
-        snippet = audio[start_ms:end_ms]
-        snippet_path = f"segment_{idx:03d}.wav"
-        snippet.export(snippet_path, format="wav")
-
-        w_segments, _ = model.transcribe(
-            snippet_path,
-            language="en",
-            beam_size=beam_size,
-        )
-        text = " ".join(s.text.strip() for s in w_segments).strip()
-        if text:
-            turns.append((speaker, text))
-
-    # Build the DOCX
-    doc = Document(template_path)
-    for p in list(doc.paragraphs):
-        delete_paragraph(p)
-
-    for speaker, text in turns:
-        add_turn(doc, speaker, text)
-
-    doc.save(output_docx)
-    print(f"📄 Transcription saved to: {output_docx} | total turns: {len(turns)}")
-    return output_docx
+    turns = transcribe_en_turns(audio_path, segments, beam_size=beam_size, pcm=pcm, batch_size=batch_size,
+                                on_segment=on_segment, audio_hash=audio_hash, journal=journal, pack=pack,
+                                vad=vad)
+    return save_transcript_docx(turns, template_path, output_docx)
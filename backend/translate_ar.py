@@ -1,56 +1,27 @@
-from typing import List, Tuple
-import re
-from docx import Document
-from docx.shared import RGBColor, Pt
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline, BitsAndBytesConfig
+from typing import Callable, Dict, List, Optional, Tuple
+import math
 import os
-import pickle
-from your_package_name import get_text_gen_pipeline
+from backend import use_model, TEXT_GEN_MODEL_ID
+from backend.result_cache import get_result_cache, make_key
+from backend.journal import Journal
+from backend.metrics import CHUNK_SECONDS, TRANSLATION_CALLS, TRANSLATION_TOKENS, span
+from backend.docx_render import render_docx
+from backend.prompt_cache import prefix_generator
 
 
 # --- Global config ---
-CHUNK_SIZE_WORDS = 300   # smaller chunks to ensure full translation fits
-
-# --- Load model once globally ---
-pipe = get_text_gen_pipeline()
-
-# --- Helpers ---
-def delete_paragraph(paragraph):
-    p = paragraph._element
-    p.getparent().remove(p)
-    paragraph._p = paragraph._element = None
-
-def add_turn(doc, speaker, text):
-    """Add formatted dialogue line to doc."""
-    if speaker == "M":
-        blank = doc.add_paragraph()
-        blank.paragraph_format.line_spacing = 0.6
-
-    para = doc.add_paragraph()
-    para.paragraph_format.space_after = Pt(6)
-    run = para.add_run(f"{speaker}: {text}")
-    run.font.size = Pt(12)
-
-    if speaker == "M":
-        run.font.color.rgb = RGBColor(255, 0, 0)
-
-def chunk_turns(turns, max_words=CHUNK_SIZE_WORDS):
-    """Group turns into word-limited chunks, ending only after a speaker label."""
-    chunks, current_chunk, current_len = [], [], 0
-    for speaker, text in turns:
-        words = text.split()
-        current_chunk.append((speaker, text))
-        current_len += len(words)
-        if current_len >= max_words:
-            chunks.append(current_chunk)
-            current_chunk, current_len = [], 0
-    if current_chunk:
-        chunks.append(current_chunk)
-    return chunks
-
-def llm_translate(dialogue: str, context_summary: str = "") -> str:
-    """Translate dialogue chunk using ALLaM model."""
-    prompt = f"""
+MAX_NEW_TOKENS = 1024    # ceiling for a first attempt; retries may go up to the context window
+CONTEXT_TOKENS = int(os.environ.get("AREN_TRANSLATION_CONTEXT_TOKENS", "4096"))  # ALLaM-7B context window
+OUTPUT_TOKEN_RATIO = float(os.environ.get("AREN_TRANSLATION_OUTPUT_RATIO", "1.3"))  # English tokens per Arabic token
+OUTPUT_TOKEN_MARGIN = 32  # headroom for speaker labels and the end-of-sequence token
+TRUNCATION_SLACK = 2      # re-tokenizing the output can differ from generation by a token or two
+RETRY_TOKEN_FACTOR = 2
+BUDGET_STEP = 64          # budgets are rounded up to this so similar chunks share a generate call
+TRANSLATION_BATCH_SIZE = int(os.environ.get("AREN_TRANSLATION_BATCH_SIZE", "4"))  # chunks per generate call
+PREFIX_CACHE = os.environ.get("AREN_PREFIX_CACHE", "1") != "0"  # reuse the instruction prompt's KV cache
+DOCX_FONT_SIZE_PT = 12
+
+PROMPT_TEMPLATE = """
 You are translating a conversation from Arabic to English.
 Preserve speaker labels ("M:" and "R:").
 Translate faithfully and naturally into English.
@@ -58,15 +29,227 @@ Do not include Arabic in the output.
 
 Now translate this part:
 {dialogue}
-    """.strip()
+""".strip()
+
+def count_tokens(tokenizer, text: str) -> int:
+    """Token length of text, without special tokens."""
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+def prompt_overhead_tokens(tokenizer) -> int:
+    """Tokens the chat template and instructions add around an empty dialogue."""
+    messages = [{"role": "user", "content": PROMPT_TEMPLATE.format(dialogue="")}]
+    try:
+        return len(tokenizer.apply_chat_template(messages, tokenize=True, add_generation_prompt=True))
+    except (AttributeError, ValueError):  # no chat template: plain prompt
+        return count_tokens(tokenizer, messages[0]["content"])
+
+def expected_output_tokens(dialogue_tokens: int) -> int:
+    """Generation budget for a chunk of dialogue_tokens source tokens."""
+    needed = math.ceil(dialogue_tokens * OUTPUT_TOKEN_RATIO) + OUTPUT_TOKEN_MARGIN
+    return min(MAX_NEW_TOKENS, -(-needed // BUDGET_STEP) * BUDGET_STEP)
+
+def dialogue_token_budget(overhead: int, context_tokens: int = CONTEXT_TOKENS) -> int:
+    """Largest chunk whose prompt plus expected translation still fits the context and MAX_NEW_TOKENS."""
+    by_context = (context_tokens - overhead - OUTPUT_TOKEN_MARGIN - BUDGET_STEP) / (1 + OUTPUT_TOKEN_RATIO)
+    by_output = (MAX_NEW_TOKENS - OUTPUT_TOKEN_MARGIN) / OUTPUT_TOKEN_RATIO
+    return max(1, int(min(by_context, by_output)))
+
+def _split_turn(tokenizer, speaker: str, text: str, budget: int) -> List[Tuple[str, str, int]]:
+    """Cut a turn longer than budget tokens into same-speaker pieces on word boundaries."""
+    pieces, words, current = [], [], 0
+    for word in text.split():
+        n = count_tokens(tokenizer, " " + word)
+        if words and current + n > budget:
+            pieces.append((speaker, " ".join(words), current))
+            words, current = [], 0
+        words.append(word)
+        current += n
+    if words:
+        pieces.append((speaker, " ".join(words), current))
+    return pieces
+
+def chunk_turns_by_tokens(turns, tokenizer, budget: int) -> List[Tuple[List[Tuple[str, str]], int, List[int]]]:
+    """
+    Pack whole turns into chunks of at most budget dialogue tokens.
+
+    Turns are measured as the "SPEAKER: text" lines the prompt carries, so
+    chunks fill the context window however unevenly the Arabic tokenizes.
+    A single turn over budget is split into same-speaker pieces.
+
+    Returns:
+        List[Tuple[List[Tuple[str, str]], int, List[int]]]: (chunk turns, dialogue tokens,
+        index in ``turns`` of each chunk turn) per chunk.
+    """
+    chunks, current, sources, current_len = [], [], [], 0
+    for turn_idx, (speaker, text) in enumerate(turns):
+        n = count_tokens(tokenizer, f"{speaker}: {text}\n")
+        pieces = [(speaker, text, n)] if n <= budget else _split_turn(tokenizer, speaker, text, budget)
+        for sp, txt, n in pieces:
+            if current and current_len + n > budget:
+                chunks.append((current, current_len, sources))
+                current, sources, current_len = [], [], 0
+            current.append((sp, txt))
+            sources.append(turn_idx)
+            current_len += n
+    if current:
+        chunks.append((current, current_len, sources))
+    return chunks
 
-    messages = [{"role": "user", "content": prompt}]
-    response = pipe(messages, max_new_tokens=1024, do_sample=False, temperature=0.0)
+def align_chunk(source_chunk: List[Tuple[str, str]], translated_chunk: List[Tuple[str, str]]) -> List[str]:
+    """
+    Translation text for each source turn of a chunk.
 
-    # Some HF pipelines return plain string, some return dicts with "generated_text"
-    if isinstance(response[0], dict) and "generated_text" in response[0]:
-        return response[0]["generated_text"]
-    return str(response[0])
+    Lines usually come back one per source turn; when the model merges or
+    splits lines, each translated line goes to the next source turn of the
+    same speaker, and lines with no such turn are appended to the last one matched.
+    """
+    if [sp for sp, _ in translated_chunk] == [sp for sp, _ in source_chunk]:
+        return [text for _, text in translated_chunk]
+    aligned = [""] * len(source_chunk)
+    pos = 0
+    for speaker, text in translated_chunk:
+        match = next((i for i in range(pos, len(source_chunk)) if source_chunk[i][0] == speaker), None)
+        if match is not None:
+            pos = match + 1
+        target = match if match is not None else max(0, pos - 1)
+        aligned[target] = f"{aligned[target]} {text}".strip()
+    return aligned
+
+def looks_truncated(generated_tokens: int, max_new_tokens: int) -> bool:
+    """True when an output used up its generation budget, i.e. it was cut off rather than finished."""
+    return generated_tokens >= max_new_tokens - TRUNCATION_SLACK
+
+def _prepare_for_batching(pipe):
+    """Decoder-only models must be left-padded to generate in batches."""
+    tokenizer = pipe.tokenizer
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+
+def _generated_text(output) -> str:
+    """Pull the assistant reply out of one text-generation pipeline result."""
+    if isinstance(output, list):
+        output = output[0]
+    if isinstance(output, dict) and "generated_text" in output:
+        output = output["generated_text"]
+    # Chat inputs come back as the full message list; the reply is the last message
+    if isinstance(output, list) and output and isinstance(output[-1], dict):
+        return output[-1].get("content", "")
+    return str(output)
+
+def llm_translate_batch(pipe, dialogues: List[str], batch_size: int = TRANSLATION_BATCH_SIZE,
+                        max_new_tokens: int = MAX_NEW_TOKENS, prefix_cache: bool = PREFIX_CACHE) -> List[str]:
+    """
+    Translate several dialogue chunks in one text-generation pipeline call.
+
+    With prefix_cache, generation starts from the model's cached key/values
+    for the fixed instruction prompt, so only the dialogue is prefilled.
+
+    Args:
+        pipe: HuggingFace text-generation pipeline.
+        dialogues (List[str]): "SPEAKER: text" chunks.
+        batch_size (int): Chunks per forward pass.
+        max_new_tokens (int): Generation budget per chunk.
+        prefix_cache (bool): Reuse the instruction prompt's KV cache when the pipeline allows it.
+
+    Returns:
+        List[str]: Raw translations, in the same order as ``dialogues``.
+    """
+    if not dialogues:
+        return []
+    _prepare_for_batching(pipe)
+    generator = prefix_generator(pipe, PROMPT_TEMPLATE) if prefix_cache else None
+    if generator is not None:
+        step = max(1, batch_size)
+        return [text for lo in range(0, len(dialogues), step)
+                for text in generator.generate(dialogues[lo:lo + step], max_new_tokens)]
+    conversations = [[{"role": "user", "content": PROMPT_TEMPLATE.format(dialogue=d)}] for d in dialogues]
+    outputs = pipe(
+        conversations,
+        batch_size=max(1, batch_size),
+        max_new_tokens=max_new_tokens,
+        do_sample=False,
+        return_full_text=False,
+    )
+    return [_generated_text(out) for out in outputs]
+
+def _by_budget(budgets: Dict[int, int]) -> Dict[int, List[int]]:
+    """Chunk indices grouped by generation budget, so each generate call uses its chunks' own budget."""
+    buckets: Dict[int, List[int]] = {}
+    for idx, budget in budgets.items():
+        buckets.setdefault(budget, []).append(idx)
+    return buckets
+
+def _generate_calls(chunks: int, batch_size: int) -> int:
+    """generate() invocations llm_translate_batch makes for chunks chunks."""
+    return math.ceil(chunks / max(1, batch_size))
+
+def _translate_pending(pipe, tokenizer, dialogues: Dict[int, str], budgets: Dict[int, int],
+                       prompt_tokens: Dict[int, int], batch_size: int, stats: Dict) -> Tuple[Dict[int, str], List[int]]:
+    """
+    Translate chunks batched by their generation budget, then retry only the outputs that hit it.
+
+    Returns:
+        Tuple[Dict[int, str], List[int]]: Output per chunk index, and the chunks still truncated after the retry.
+    """
+    outputs, lengths = {}, {}
+    for budget, group in _by_budget(budgets).items():
+        with span("translate_batch", items=len(group), per_item=CHUNK_SECONDS):
+            texts = llm_translate_batch(pipe, [dialogues[idx] for idx in group], batch_size=batch_size,
+                                        max_new_tokens=budget)
+        outputs.update(zip(group, texts))
+        lengths.update((idx, count_tokens(tokenizer, text)) for idx, text in zip(group, texts))
+        stats["llm_calls"] += _generate_calls(len(group), batch_size)
+    stats["generated_tokens"] += sum(lengths.values())
+    truncated = [idx for idx in outputs if looks_truncated(lengths[idx], budgets[idx])]
+
+    retry_budgets = {idx: min(budgets[idx] * RETRY_TOKEN_FACTOR, CONTEXT_TOKENS - prompt_tokens[idx])
+                     for idx in truncated}
+    retry_budgets = {idx: b for idx, b in retry_budgets.items() if b > budgets[idx]}
+    for budget, group in _by_budget(retry_budgets).items():
+        with span("translate_retry", items=len(group), per_item=CHUNK_SECONDS):
+            texts = llm_translate_batch(pipe, [dialogues[idx] for idx in group], batch_size=batch_size,
+                                        max_new_tokens=budget)
+        outputs.update(zip(group, texts))
+        lengths.update((idx, count_tokens(tokenizer, text)) for idx, text in zip(group, texts))
+        stats["llm_calls"] += _generate_calls(len(group), batch_size)
+        stats["retries"] += len(group)
+        stats["generated_tokens"] += sum(lengths[idx] for idx in group)
+    truncated = [idx for idx in truncated if looks_truncated(lengths[idx], retry_budgets.get(idx, budgets[idx]))]
+    return outputs, truncated
+
+def _record_translation_stats(stats: Dict, journal: Optional[Journal] = None):
+    """Log, count and journal the LLM work one transcript took."""
+    print(f"🧮 Translation used {stats['llm_calls']} LLM calls ({stats['retries']} retries, "
+          f"{stats['cached']}/{stats['chunks']} chunks cached), {stats['generated_tokens']} tokens generated")
+    TRANSLATION_CALLS.inc(stats["llm_calls"], language="arabic")
+    TRANSLATION_TOKENS.inc(stats["generated_tokens"], language="arabic")
+    if journal is not None:
+        journal.append("translation", **stats)
+
+def parse_translation(translated_text: str) -> List[Tuple[str, str]]:
+    """Split raw LLM output into (speaker, text) turns, dropping runaway repeated lines."""
+    translated_chunk = []
+    last_line, repeat_count = None, 0
+    for line in translated_text.splitlines():
+        if line == last_line:
+            repeat_count += 1
+            if repeat_count > 2:
+                continue
+        else:
+            repeat_count = 0
+        last_line = line
+
+        if ":" in line:
+            sp, txt = line.split(":", 1)
+            translated_chunk.append((sp.strip(), txt.strip()))
+        else:
+            if translated_chunk:
+                translated_chunk[-1] = (
+                    translated_chunk[-1][0],
+                    translated_chunk[-1][1] + " " + line.strip()
+                )
+    return translated_chunk
 
 def validate_translation(input_turns, final_turns):
     """Compare word counts between source and translated transcripts."""
@@ -94,9 +277,14 @@ def validate_translation(input_turns, final_turns):
 def translate_ar(
     turns: List[Tuple[str, str]],
     template_path: str,
-    output_docx: str,
+    output_docx: Optional[str],
     resume_progress: bool = False,
-    progress_path: str = "/tmp/translation_progress.pkl"
+    journal: Optional[Journal] = None,
+    on_chunk: Optional[Callable[[int, int, List[Tuple[str, str]]], None]] = None,
+    on_translation: Optional[Callable[[int, str], None]] = None,
+    use_cache: bool = True,
+    batch_size: int = TRANSLATION_BATCH_SIZE,
+    tokenizer=None,
 ) -> List[Tuple[str, str]]:
     """
     Translate Arabic transcript turns into English and save to DOCX.
@@ -104,90 +292,106 @@ def translate_ar(
     Args:
         turns (List[Tuple[str, str]]): Transcript as (speaker, text).
         template_path (str): Path to DOCX template.
-        output_docx (str): Where to save final translated DOCX.
-        resume_progress (bool): Resume from saved progress if True.
-        progress_path (str): Path to save progress pickle.
+        output_docx (str): Where to save final translated DOCX; None skips the DOCX (render it separately).
+        resume_progress (bool): Replay chunks already recorded in the journal instead of re-translating them.
+        journal (Journal, optional): Job journal; each translated chunk is appended to it.
+        on_chunk (Callable, optional): Called as on_chunk(index, total, translated_turns) per chunk.
+        on_translation (Callable, optional): Called as on_translation(turn_index, text) with the
+            translation aligned to each source turn; a turn split across chunks is reported in pieces.
+        use_cache (bool): Reuse raw LLM output for chunks translated before with the same settings.
+        batch_size (int): Chunks sent to the model per generation batch.
+        tokenizer (optional): Tokenizer that sizes the chunks; defaults to the translation model's.
 
     Returns:
         List[Tuple[str, str]]: Translated turns.
     """
 
+    if tokenizer is None:
+        # Leased for the whole run, so the registry cannot evict it between chunking and retries
+        with use_model("text_gen_tokenizer") as tokenizer:
+            return translate_ar(turns, template_path, output_docx, resume_progress, journal, on_chunk,
+                                on_translation, use_cache, batch_size, tokenizer)
+
     final_turns = []
-    context_summary = ""
     start_chunk = 0
 
-    # Step 1: Split into chunks
-    chunks = chunk_turns(turns)
-    print(f"🔹 Split transcript into {len(chunks)} chunks")
-
-    # Resume logic
-    if resume_progress and os.path.exists(progress_path):
-        with open(progress_path, "rb") as f:
-            progress = pickle.load(f)
-        final_turns = progress.get("final_turns", [])
-        context_summary = progress.get("context_summary", "")
-        start_chunk = progress.get("last_chunk", 0) + 1
-        print(f"⏩ Resuming from chunk {start_chunk+1}")
-
-    # Step 2: Translate sequentially
-    for idx, chunk in enumerate(chunks[start_chunk:], start=start_chunk):
-        dialogue = "\n".join([f"{sp}: {txt}" for sp, txt in chunk])
+    # Step 1: Split into chunks sized by the tokenizer, each with its own generation budget
+    overhead = prompt_overhead_tokens(tokenizer)
+    budget = dialogue_token_budget(overhead)
+    sized = chunk_turns_by_tokens(turns, tokenizer, budget)
+    chunks = [chunk for chunk, _, _ in sized]
+    prompt_tokens = [overhead + n for _, n, _ in sized]
+    new_tokens = [expected_output_tokens(n) for _, n, _ in sized]
+
+    def report(idx: int, translated_chunk: List[Tuple[str, str]]):
+        if on_chunk:
+            on_chunk(idx, len(chunks), translated_chunk)
+        if on_translation:
+            for turn_idx, text in zip(sized[idx][2], align_chunk(chunks[idx], translated_chunk)):
+                on_translation(turn_idx, text)
+    print(f"🔹 Split transcript into {len(chunks)} chunks of up to {budget} tokens")
+    stats = {"chunks": len(chunks), "cached": 0, "llm_calls": 0, "retries": 0, "generated_tokens": 0,
+             "truncated": 0}
+
+    # Step 2: Translate in batches of chunks, reassembling outputs in order
+    cache = get_result_cache() if use_cache else None
+    chunk_keys = [make_key(stage="translation", model=TEXT_GEN_MODEL_ID, prompt=PROMPT_TEMPLATE,
+                           max_new_tokens=new_tokens[i], dialogue="\n".join(f"{sp}: {txt}" for sp, txt in chunk))
+                  for i, chunk in enumerate(chunks)]
+
+    # Resume logic: replay the journaled prefix whose source chunks are unchanged
+    if resume_progress and journal is not None:
+        journaled = {r["index"]: r for r in journal.chunks()}
+        while start_chunk in journaled and journaled[start_chunk].get("key") == chunk_keys[start_chunk]:
+            translated_chunk = [tuple(turn) for turn in journaled[start_chunk]["turns"]]
+            final_turns.extend(translated_chunk)
+            report(start_chunk, translated_chunk)
+            start_chunk += 1
+        if start_chunk:
+            print(f"⏩ Resuming from chunk {start_chunk+1}")
+
+    for group_start in range(start_chunk, len(chunks), max(1, batch_size)):
+        group = list(range(group_start, min(group_start + batch_size, len(chunks))))
+        dialogues = {idx: "\n".join([f"{sp}: {txt}" for sp, txt in chunks[idx]]) for idx in group}
+        keys = {idx: chunk_keys[idx] for idx in group}
+        outputs = {idx: cache.get("translation", keys[idx]) for idx in group} if cache else {}
+        pending = [idx for idx in group if outputs.get(idx) is None]
+        stats["cached"] += len(group) - len(pending)
 
         try:
-            translated_text = llm_translate(dialogue, context_summary)
+            if pending:
+                with use_model("text_gen") as pipe:
+                    texts, truncated = _translate_pending(
+                        pipe, tokenizer, {idx: dialogues[idx] for idx in pending},
+                        {idx: new_tokens[idx] for idx in pending}, {idx: prompt_tokens[idx] for idx in pending},
+                        batch_size, stats)
+                for idx in truncated:
+                    print(f"⚠️ Chunk {idx+1}/{len(chunks)} still looks truncated after retrying")
+                stats["truncated"] += len(truncated)
+                for idx, text in texts.items():
+                    outputs[idx] = text
+                    if cache and idx not in truncated:  # a later run should get another go at it
+                        cache.put("translation", keys[idx], text)
         except Exception as e:
-            print(f"❌ Error during translation of chunk {idx+1}: {e}")
-            with open(progress_path, "wb") as f:
-                pickle.dump({
-                    "final_turns": final_turns,
-                    "context_summary": context_summary,
-                    "last_chunk": idx - 1
-                }, f)
+            print(f"❌ Error during translation of chunks {group[0]+1}-{group[-1]+1}: {e}")
             raise
 
-        # Parse translated lines
-        translated_chunk = []
-        last_line, repeat_count = None, 0
-        for line in translated_text.splitlines():
-            if line == last_line:
-                repeat_count += 1
-                if repeat_count > 2:
-                    continue
-            else:
-                repeat_count = 0
-            last_line = line
-
-            if ":" in line:
-                sp, txt = line.split(":", 1)
-                translated_chunk.append((sp.strip(), txt.strip()))
-            else:
-                if translated_chunk:
-                    translated_chunk[-1] = (
-                        translated_chunk[-1][0],
-                        translated_chunk[-1][1] + " " + line.strip()
-                    )
-
-        final_turns.extend(translated_chunk)
-        print(f"✅ Translated chunk {idx+1}/{len(chunks)}")
-
-        # Save progress
-        with open(progress_path, "wb") as f:
-            pickle.dump({
-                "final_turns": final_turns,
-                "context_summary": context_summary,
-                "last_chunk": idx
-            }, f)
+        for idx in group:
+            translated_chunk = parse_translation(outputs[idx])
+            final_turns.extend(translated_chunk)
+            print(f"✅ Translated chunk {idx+1}/{len(chunks)}")
+            report(idx, translated_chunk)
 
-    # Step 3: Build DOCX
-    doc = Document(template_path)
-    for p in list(doc.paragraphs):
-        delete_paragraph(p)
-
-    for speaker, text in final_turns:
-        add_turn(doc, speaker, text)
+            # Save progress: one appended record per chunk
+            if journal is not None:
+                journal.append("chunk", index=idx, key=keys[idx], turns=translated_chunk)
+    _record_translation_stats(stats, journal)
 
-    doc.save(output_docx)
-    print(f"📄 English transcription saved to: {output_docx}")
+    # Step 3: Build DOCX
+    if output_docx:
+        with span("docx", items=len(final_turns)):
+            render_docx(final_turns, template_path, output_docx, font_size_pt=DOCX_FONT_SIZE_PT)
+        print(f"📄 English transcription saved to: {output_docx}")
 
     validate_translation(turns, final_turns)
     return final_turns
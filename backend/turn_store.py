@@ -0,0 +1,175 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+import os
+import threading
+from backend.docx_render import render_docx
+
+# --- Global config ---
+TRANSCRIPT_DIR = os.environ.get("AREN_TRANSCRIPT_DIR", "/tmp/aren_transcriber/transcripts")
+FIELDS = ["speaker", "start", "end", "text", "translation"]
+
+MEDIA_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "txt": "text/plain; charset=utf-8",
+    "srt": "application/x-subrip; charset=utf-8",
+    "vtt": "text/vtt; charset=utf-8",
+    "json": "application/json",
+}
+
+
+class TranscriptStore:
+    """
+    One compact JSON file of timed turns per job, plus lazily built exports.
+
+    Rows are stored as arrays under a shared field list rather than as one
+    object per turn. Exports (DOCX, TXT, SRT, VTT, JSON) are written next to
+    the store the first time they are asked for and reused until the turns
+    are saved again.
+    """
+
+    def __init__(self, root: str = TRANSCRIPT_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, job_id: str) -> str:
+        return os.path.join(self.root, f"{job_id}.turns.json")
+
+    def export_path(self, job_id: str, fmt: str, variant: str) -> str:
+        return os.path.join(self.root, f"{job_id}.{variant}.{fmt}")
+
+    def save(self, job_id: str, rows: List[Dict], **meta) -> str:
+        """Write a job's turns atomically; exports built from an older version go stale."""
+        record = {"job_id": job_id, **meta, "fields": FIELDS,
+                  "rows": [[row.get(f) for f in FIELDS] for row in rows]}
+        path = self.path(job_id)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+        return path
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        """Stored record with rows as dicts, or None if the job has no transcript."""
+        try:
+            with open(self.path(job_id), encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        fields = record.pop("fields")
+        record["rows"] = [dict(zip(fields, row)) for row in record["rows"]]
+        return record
+
+    def save_manifest(self, batch_id: str, manifest: Dict) -> str:
+        path = os.path.join(self.root, f"{batch_id}.manifest.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    def load_manifest(self, batch_id: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.root, f"{os.path.basename(batch_id)}.manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def export(self, job_id: str, fmt: str, variant: str = "default", template_path: Optional[str] = None,
+               font_size_pt: Optional[float] = None) -> Optional[str]:
+        """
+        Path of a job's transcript in fmt, building it on first request.
+
+        Args:
+            fmt (str): One of MEDIA_TYPES.
+            variant (str): "default" (the translation where there is one), "source" or "translation".
+            template_path (str, optional): DOCX template; required for fmt="docx".
+            font_size_pt (float, optional): Explicit DOCX font size.
+
+        Returns:
+            Optional[str]: File path, or None if the job has no stored transcript.
+        """
+        if fmt not in EXPORTERS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        store_path, out_path = self.path(job_id), self.export_path(job_id, fmt, variant)
+        with self._lock:
+            if not os.path.exists(store_path):
+                return None
+            if os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(store_path):
+                return out_path
+            record = self.load(job_id)
+            tmp = f"{out_path}.tmp"
+            EXPORTERS[fmt](record, select_turns(record["rows"], variant), tmp, template_path, font_size_pt)
+            os.replace(tmp, out_path)
+            return out_path
+
+
+def select_turns(rows: List[Dict], variant: str = "default") -> List[Dict]:
+    """Rows with "text" set to the requested side; rows with nothing to show are dropped."""
+    translated = any(row.get("translation") for row in rows)
+    use_translation = variant == "translation" or (variant == "default" and translated)
+    out = []
+    for row in rows:
+        text = row.get("translation") if use_translation else row.get("text")
+        if text:
+            out.append({**row, "text": text})
+    return out
+
+
+def _timestamp(seconds: float, sep: str) -> str:
+    ms = int(round((seconds or 0.0) * 1000))
+    h, rem = divmod(ms, 3600000)
+    m, rem = divmod(rem, 60000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+def to_txt(turns: List[Dict]) -> str:
+    return "".join(f"{t['speaker']}: {t['text']}\n" for t in turns)
+
+
+def to_srt(turns: List[Dict]) -> str:
+    return "".join(f"{i}\n{_timestamp(t['start'], ',')} --> {_timestamp(t['end'], ',')}\n{t['speaker']}: {t['text']}\n\n"
+                   for i, t in enumerate(turns, 1))
+
+
+def to_vtt(turns: List[Dict]) -> str:
+    return "WEBVTT\n\n" + "".join(
+        f"{_timestamp(t['start'], '.')} --> {_timestamp(t['end'], '.')}\n<v {t['speaker']}>{t['text']}\n\n"
+        for t in turns)
+
+
+def _write_text(text: str, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _export_json(record: Dict, turns: List[Dict], path: str, template_path, font_size_pt):
+    meta = {k: v for k, v in record.items() if k != "rows"}
+    _write_text(json.dumps({**meta, "turns": record["rows"]}, ensure_ascii=False), path)
+
+
+def _export_docx(record: Dict, turns: List[Dict], path: str, template_path, font_size_pt):
+    if template_path is None:
+        raise ValueError("DOCX export needs a template")
+    render_docx([(t["speaker"], t["text"]) for t in turns], template_path, path, font_size_pt=font_size_pt)
+
+
+EXPORTERS: Dict[str, Callable] = {
+    "docx": _export_docx,
+    "txt": lambda record, turns, path, *_: _write_text(to_txt(turns), path),
+    "srt": lambda record, turns, path, *_: _write_text(to_srt(turns), path),
+    "vtt": lambda record, turns, path, *_: _write_text(to_vtt(turns), path),
+    "json": _export_json,
+}
+
+_store: Optional[TranscriptStore] = None
+_store_lock = threading.Lock()
+
+
+def get_transcript_store() -> TranscriptStore:
+    """Return the process-wide transcript store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TranscriptStore()
+        return _store
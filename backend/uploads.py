@@ -0,0 +1,267 @@
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+import uuid
+from backend.pcm import SAMPLE_RATE, PCM_CACHE_DIR, HASH_CHUNK_BYTES, cached_pcm_path, evict_pcm_cache
+
+# --- Global config ---
+UPLOAD_DIR = os.environ.get("AREN_UPLOAD_DIR", "/tmp/aren_transcriber/uploads")
+EARLY_DECODE = os.environ.get("AREN_EARLY_DECODE", "1") != "0"  # decode the head while the tail uploads
+UPLOAD_IDLE_SECONDS = float(os.environ.get("AREN_UPLOAD_IDLE_SECONDS", "900"))  # then the session is closed
+MAX_OPEN_UPLOADS = int(os.environ.get("AREN_MAX_OPEN_UPLOADS", "32"))
+
+
+class OffsetMismatch(Exception):
+    """A chunk was sent for a different offset than the upload has reached."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class TooManyUploads(Exception):
+    pass
+
+
+class UploadBusy(Exception):
+    """The upload is still being opened by another request."""
+
+
+class StreamingDecoder:
+    """
+    ffmpeg decoding an upload from a pipe as its bytes arrive.
+
+    Works for streamable formats (WAV, MP3, FLAC, OGG, ...). Containers that
+    keep their index at the end (some MP4/M4A) make ffmpeg fail; the decoder
+    then reports failure and the job decodes the finished file as usual.
+    """
+
+    def __init__(self, out_path: str):
+        self.out_path = out_path
+        self.failed = False
+        self._log = open(f"{out_path}.log", "w+b")
+        try:
+            self._proc = subprocess.Popen(
+                ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", "pipe:0",
+                 "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "f32le", "-acodec", "pcm_f32le", out_path],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._log,
+            )
+        except OSError:
+            self._log.close()
+            os.remove(self._log.name)
+            raise
+
+    def feed(self, data: bytes):
+        if self.failed:
+            return
+        try:
+            self._proc.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            self.failed = True  # ffmpeg gave up; the file is decoded after the upload instead
+
+    def finish(self) -> bool:
+        """Close the input and wait for ffmpeg; True if the PCM at out_path is complete."""
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            self.failed = True
+        ok = self._proc.wait() == 0 and not self.failed
+        self._log.close()
+        os.remove(self._log.name)
+        return ok
+
+    def abort(self):
+        self._proc.kill()
+        self.finish()
+        if os.path.exists(self.out_path):
+            os.remove(self.out_path)
+
+
+class UploadSession:
+    """
+    One resumable upload: bytes appended at a known offset, hashed as they land.
+
+    The session's metadata (file name, declared size) is kept next to the
+    data file, so a client can ask for the offset and continue after a
+    dropped connection. If the process restarted in between, the hash of
+    the bytes already on disk is rebuilt once on reopen.
+    """
+
+    def __init__(self, upload_id: str, filename: str, size: Optional[int], root: str = UPLOAD_DIR):
+        self.id = upload_id
+        self.filename = filename
+        self.size = size
+        self.root = root
+        self.path = os.path.join(root, f"{upload_id}_{filename}")
+        self._lock = threading.Lock()
+        self._hash = hashlib.sha256()
+        self._decoder: Optional[StreamingDecoder] = None
+        if os.path.exists(self.path):
+            stale = os.path.join(root, f"{upload_id}.f32.part")  # early decode of a previous process
+            if os.path.exists(stale):
+                os.remove(stale)
+            with open(self.path, "rb") as f:
+                for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                    self._hash.update(block)
+        else:
+            open(self.path, "wb").close()
+            if EARLY_DECODE:
+                try:
+                    self._decoder = StreamingDecoder(os.path.join(root, f"{upload_id}.f32.part"))
+                except OSError:  # no ffmpeg on PATH: decode after the upload as before
+                    self._decoder = None
+        self.offset = os.path.getsize(self.path)
+        self.completed = False
+        self.last_active = time.time()
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.root, f"{self.id}.json")
+
+    def save_meta(self):
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump({"id": self.id, "filename": self.filename, "size": self.size}, f)
+
+    def write(self, offset: int, data: bytes) -> int:
+        """Append data, which must start at the current offset; returns the new offset."""
+        with self._lock:
+            if offset != self.offset or self.completed:
+                raise OffsetMismatch(self.offset)
+            if self.size is not None and self.offset + len(data) > self.size:
+                raise ValueError(f"Upload would exceed its declared size of {self.size} bytes")
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self._hash.update(data)
+            if self._decoder is not None:
+                self._decoder.feed(data)
+            self.offset += len(data)
+            self.last_active = time.time()
+            return self.offset
+
+    def complete(self, cache_dir: str = PCM_CACHE_DIR) -> str:
+        """
+        Finish the upload and return its content hash.
+
+        The hash is already known, so nothing is re-read. An early decode that
+        ran to completion becomes the cached PCM for that hash. Calling it
+        again (e.g. after the job could not be queued) returns the same hash.
+        """
+        with self._lock:
+            if self.size is not None and self.offset != self.size:
+                raise OffsetMismatch(self.offset)
+            self.completed = True
+            self.last_active = time.time()
+            digest = self._hash.hexdigest()
+            decoder, self._decoder = self._decoder, None
+        if decoder is not None:
+            pcm_path = cached_pcm_path(digest, cache_dir)
+            if os.path.exists(pcm_path):
+                decoder.abort()  # this recording was decoded before
+            elif decoder.finish():
+                os.makedirs(cache_dir, exist_ok=True)
+                os.replace(decoder.out_path, pcm_path)
+                print(f"⚡ Decoded {digest[:12]} while it was uploading")
+                evict_pcm_cache(cache_dir, keep=pcm_path)
+            elif os.path.exists(decoder.out_path):
+                os.remove(decoder.out_path)
+        return digest
+
+    def close(self):
+        """Stop the early decode and delete its partial PCM; the uploaded bytes stay for a resume."""
+        with self._lock:
+            decoder, self._decoder = self._decoder, None
+        if decoder is not None:
+            decoder.abort()
+
+    def status(self) -> Dict:
+        return {"upload_id": self.id, "filename": self.filename, "size": self.size, "offset": self.offset,
+                "completed": self.completed}
+
+
+class UploadManager:
+    """
+    Open upload sessions by id, reopened from disk after a restart.
+
+    A session idle for idle_seconds is closed (its early decode killed) and
+    forgotten; a later request for it reopens it from disk like after a
+    restart. At most max_open sessions are open at once.
+    """
+
+    def __init__(self, root: str = UPLOAD_DIR, idle_seconds: float = UPLOAD_IDLE_SECONDS,
+                 max_open: int = MAX_OPEN_UPLOADS):
+        self.root = root
+        self.idle_seconds = idle_seconds
+        self.max_open = max_open
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _expire_idle(self):
+        """Close sessions idle for longer than idle_seconds."""
+        cutoff = time.time() - self.idle_seconds
+        with self._lock:
+            idle = [s for s in self._sessions.values() if s is not None and s.last_active < cutoff]
+            for session in idle:
+                del self._sessions[session.id]
+        for session in idle:
+            session.close()
+            print(f"⏳ Closed idle upload {session.id}")
+
+    def create(self, filename: str, size: Optional[int] = None) -> UploadSession:
+        self._expire_idle()
+        upload_id = uuid.uuid4().hex[:8]
+        with self._lock:
+            if len(self._sessions) >= self.max_open:
+                raise TooManyUploads(f"{len(self._sessions)} uploads already open")
+            self._sessions[upload_id] = None  # hold the slot while the decoder starts
+        try:
+            session = UploadSession(upload_id, os.path.basename(filename or "audio"), size, self.root)
+            session.save_meta()
+        except BaseException:
+            with self._lock:
+                del self._sessions[upload_id]
+            raise
+        with self._lock:
+            self._sessions[upload_id] = session
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        """Open session for upload_id, reopened from disk if needed; None if there is no such upload."""
+        self._expire_idle()
+        with self._lock:
+            if upload_id in self._sessions and self._sessions[upload_id] is None:
+                raise UploadBusy(f"Upload {upload_id} is still being opened")  # create() holds the slot
+            session = self._sessions.get(upload_id)
+            if session is None:
+                meta_path = os.path.join(self.root, f"{os.path.basename(upload_id)}.json")
+                if not os.path.exists(meta_path):
+                    return None
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                session = self._sessions[upload_id] = UploadSession(meta["id"], meta["filename"], meta["size"],
+                                                                    self.root)
+            return session
+
+    def discard(self, upload_id: str):
+        """Forget a session whose job was queued; the uploaded file itself stays for the job."""
+        with self._lock:
+            session = self._sessions.pop(upload_id, None)
+        if session is not None and os.path.exists(session.meta_path):
+            os.remove(session.meta_path)
+
+
+_uploads: Optional[UploadManager] = None
+_uploads_lock = threading.Lock()
+
+
+def get_upload_manager() -> UploadManager:
+    """Return the process-wide upload manager."""
+    global _uploads
+    with _uploads_lock:
+        if _uploads is None:
+            _uploads = UploadManager()
+        return _uploads
@@ -0,0 +1,165 @@
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import os
+import numpy as np
+from backend.pcm import SAMPLE_RATE
+
+# Energy-based voice activity detection on decoded PCM.
+# Runs on CPU in a few vectorized passes: frame RMS in dBFS, an adaptive threshold
+# above the recording's noise floor, then run-length smoothing per diarized segment.
+# The compute saving comes with segment packing: Whisper pads every input to a 30 s window,
+# so a trimmed clip decoded on its own costs the same as the untrimmed one, and per-segment
+# mode only gains the segments that are silent throughout. Packed windows fill up with
+# speech instead, so fewer of them are decoded.
+
+Spans = List[Tuple[float, float]]
+
+
+@dataclass
+class VadConfig:
+    frame_ms: float = 30.0          # analysis frame length
+    margin_db: float = 12.0         # speech must be this far above the noise floor
+    min_threshold_db: float = -55.0  # threshold never drops below this (near-digital silence)
+    max_threshold_db: float = -30.0  # ...nor rises above this (noisy recordings)
+    noise_percentile: float = 10.0  # frame-energy percentile taken as the noise floor
+    min_speech_ms: float = 200.0    # shorter bursts are treated as noise
+    min_silence_ms: float = 600.0   # shorter pauses are kept inside speech
+    pad_ms: float = 200.0           # context kept around each speech span
+
+
+VAD_CONFIG = VadConfig(
+    margin_db=float(os.environ.get("AREN_VAD_MARGIN_DB", "12")),
+    min_silence_ms=float(os.environ.get("AREN_VAD_MIN_SILENCE_MS", "600")),
+    pad_ms=float(os.environ.get("AREN_VAD_PAD_MS", "200")),
+)
+
+
+def frame_db(pcm: np.ndarray, frame: int) -> np.ndarray:
+    """RMS energy of consecutive frames in dBFS (a trailing partial frame is dropped)."""
+    n = len(pcm) // frame
+    if n == 0:
+        return np.empty(0)
+    frames = np.asarray(pcm[:n * frame], dtype=np.float32).reshape(n, frame)
+    power = np.einsum("ij,ij->i", frames, frames) / frame
+    return 10.0 * np.log10(power + 1e-12)
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start (inclusive) and end (exclusive) indices of True runs."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _speech_frames(active: np.ndarray, min_speech: int, min_silence: int, pad: int) -> List[Tuple[int, int]]:
+    """Smooth a per-frame activity mask into (start, end) frame ranges of speech."""
+    starts, ends = _runs(active)
+    if not len(starts):
+        return []
+    # Bridge short pauses, then drop bursts that are still too short
+    keep_gap = starts[1:] - ends[:-1] >= min_silence
+    starts = starts[np.concatenate(([True], keep_gap))]
+    ends = ends[np.concatenate((keep_gap, [True]))]
+    long_enough = ends - starts >= min_speech
+    starts, ends = starts[long_enough], ends[long_enough]
+    if not len(starts):
+        return []
+    starts = np.maximum(starts - pad, 0)
+    ends = np.minimum(ends + pad, len(active))
+    # Padding can make neighbours touch
+    spans = [(int(starts[0]), int(ends[0]))]
+    for s, e in zip(starts[1:].tolist(), ends[1:].tolist()):
+        if s <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], e))
+        else:
+            spans.append((s, e))
+    return spans
+
+
+def detect_speech(
+    pcm: np.ndarray,
+    segments: List[Dict],
+    config: Optional[VadConfig] = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> Tuple[List[Spans], Dict]:
+    """
+    Find the speech inside each diarized segment.
+
+    Args:
+        pcm (np.ndarray): 16 kHz mono float32 samples.
+        segments (List[Dict]): {start, end, speaker} segments, in time order.
+        config (VadConfig, optional): Thresholds; defaults to VAD_CONFIG.
+
+    Returns:
+        Tuple[List[Spans], Dict]: Per segment, the (start, end) speech spans in seconds on the
+            original timeline (empty if the segment is silent), and a report of what was removed.
+    """
+    config = config or VAD_CONFIG
+    frame = max(1, int(config.frame_ms * sample_rate / 1000))
+    frame_s = frame / sample_rate
+    to_frames = lambda ms: max(1, int(round(ms / config.frame_ms)))
+
+    if not segments:
+        return [], {"segments": 0, "dropped": 0, "input_seconds": 0.0, "speech_seconds": 0.0,
+                    "removed_seconds": 0.0, "threshold_db": None, "removed": []}
+
+    # Frame energies over the covered range only; the noise floor is taken from the same range
+    lo = int(segments[0]["start"] / frame_s)
+    hi = int(np.ceil(max(seg["end"] for seg in segments) / frame_s))
+    energy = frame_db(pcm[lo * frame:hi * frame], frame)
+    if len(energy):
+        floor = float(np.percentile(energy, config.noise_percentile))
+    else:
+        floor = config.min_threshold_db
+    threshold = float(np.clip(floor + config.margin_db, config.min_threshold_db, config.max_threshold_db))
+    active = energy > threshold
+
+    speech: List[Spans] = []
+    removed: List[Dict] = []
+    input_s = speech_s = 0.0
+    for idx, seg in enumerate(segments):
+        f0 = max(0, int(seg["start"] / frame_s) - lo)
+        f1 = min(len(active), int(np.ceil(seg["end"] / frame_s)) - lo)
+        ranges = _speech_frames(active[f0:f1], to_frames(config.min_speech_ms),
+                                to_frames(config.min_silence_ms), to_frames(config.pad_ms)) if f1 > f0 else []
+        spans = [(max(seg["start"], (lo + f0 + s) * frame_s), min(seg["end"], (lo + f0 + e) * frame_s))
+                 for s, e in ranges]
+        speech.append(spans)
+
+        duration = seg["end"] - seg["start"]
+        kept = sum(e - s for s, e in spans)
+        input_s += duration
+        speech_s += kept
+        if duration - kept > 1e-6:
+            removed.append({"index": idx, "start": seg["start"], "end": seg["end"],
+                            "removed_seconds": round(duration - kept, 3), "dropped": not spans})
+
+    report = {
+        "segments": len(segments),
+        "dropped": sum(1 for spans in speech if not spans),
+        "input_seconds": round(input_s, 3),
+        "speech_seconds": round(speech_s, 3),
+        "removed_seconds": round(input_s - speech_s, 3),
+        "threshold_db": round(threshold, 1),
+        "removed": removed,
+    }
+    return speech, report
+
+
+def speech_clip(pcm: np.ndarray, spans: Spans, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """The speech spans of one segment joined into one clip (a view when there is a single span)."""
+    pieces = [pcm[int(s * sample_rate):int(e * sample_rate)] for s, e in spans]
+    if len(pieces) == 1:
+        return pieces[0]
+    return np.concatenate(pieces) if pieces else pcm[:0]
+
+
+def to_original_time(t: np.ndarray, spans: Spans) -> np.ndarray:
+    """Map times on the joined-clip timeline of spans back onto the original timeline."""
+    t = np.asarray(t, dtype=np.float64)
+    if not spans:
+        return t
+    starts = np.array([s for s, _ in spans])
+    lengths = np.array([e - s for s, e in spans])
+    offsets = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    k = np.clip(np.searchsorted(offsets, t, side="right") - 1, 0, len(spans) - 1)
+    return starts[k] + (t - offsets[k])
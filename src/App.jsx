@@ -9,6 +9,39 @@ import pyannoteLogo from "@/assets/logopyannote.png";
 import humainLogo from "@/assets/HUMAIN.svg.png";
 
 const API_BASE = import.meta.env.VITE_API_URL || ""; // e.g. http://localhost:8000
+const UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024;
+const UPLOAD_RETRIES = 5;
+
+// Send the file in chunks; after a dropped connection, ask the server for its offset and continue
+async function uploadResumable(file) {
+  const form = new FormData();
+  form.append("filename", file.name);
+  form.append("size", file.size);
+  const res = await fetch(`${API_BASE}/uploads`, { method: "POST", body: form });
+  if (!res.ok) throw new Error((await res.text()) || "Upload failed");
+  const { upload_id, upload_url } = await res.json();
+
+  let offset = 0;
+  let failures = 0;
+  while (offset < file.size) {
+    try {
+      const chunk = await fetch(API_BASE + upload_url, {
+        method: "PATCH",
+        headers: { "Upload-Offset": String(offset) },
+        body: file.slice(offset, offset + UPLOAD_CHUNK_BYTES),
+      });
+      if (!chunk.ok && chunk.status !== 409) throw new Error((await chunk.text()) || "Upload failed");
+      offset = Number(chunk.headers.get("Upload-Offset") ?? offset);
+      failures = 0;
+    } catch (err) {
+      if (++failures > UPLOAD_RETRIES) throw err;
+      await new Promise((r) => setTimeout(r, 1000 * failures));
+      const status = await fetch(API_BASE + upload_url).catch(() => null);
+      if (status?.ok) offset = (await status.json()).offset;
+    }
+  }
+  return upload_id;
+}
 
 export default function App() {
   const [step, setStep] = useState("upload"); // upload | progress | results
@@ -26,24 +59,13 @@ export default function App() {
     setProgress({ transcription: 0, translation: 0 });
 
     const formData = new FormData();
-    formData.append("file", file);
     formData.append("language", language);
     formData.append("moderator_first", moderatorFirst ? "true" : "false");
     formData.append("speakers", speakers);
 
     try {
-      // simulate frontend progress bar while backend works
-      let t = 0;
-      const interval = setInterval(() => {
-        t += 8;
-        setProgress({
-          transcription: Math.min(t, 95),
-          translation: language === "arabic" ? Math.min(t / 2, 95) : 0,
-        });
-        if (t >= 95) clearInterval(interval);
-      }, 700);
-
-      const res = await fetch(`${API_BASE}/process`, {
+      const uploadId = await uploadResumable(file);
+      const res = await fetch(`${API_BASE}/uploads/${uploadId}/complete`, {
         method: "POST",
         body: formData,
       });
@@ -53,14 +75,49 @@ export default function App() {
         throw new Error(err || "Server error");
       }
 
-      const data = await res.json();
-      setTranscript(data.text || "");
-      setDownloadUrl(API_BASE + data.download_url);
-      setProgress({
-        transcription: 100,
-        translation: language === "arabic" ? 100 : 0,
-      });
+      const { events_url } = await res.json();
+      setTranscript("");
       setStep("results");
+      setDownloadUrl("");
+
+      // Render the transcript as segments / translated chunks arrive
+      const source = new EventSource(API_BASE + events_url);
+      const translated = [];
+
+      source.addEventListener("segment", (e) => {
+        const ev = JSON.parse(e.data);
+        if (ev.text) {
+          setTranscript((prev) => prev + `${ev.speaker}: ${ev.text}\n`);
+        }
+        setProgress((p) => ({ ...p, transcription: Math.round(((ev.index + 1) / ev.total) * 100) }));
+      });
+
+      source.addEventListener("chunk", (e) => {
+        const ev = JSON.parse(e.data);
+        ev.turns.forEach((t) => translated.push(`${t.speaker}: ${t.text}`));
+        setTranscript(translated.join("\n"));
+        setProgress((p) => ({ ...p, translation: Math.round(((ev.index + 1) / ev.total) * 100) }));
+      });
+
+      source.addEventListener("done", (e) => {
+        const ev = JSON.parse(e.data);
+        setTranscript(ev.result.text || "");
+        setDownloadUrl(API_BASE + ev.result.download_url);
+        setProgress({
+          transcription: 100,
+          translation: language === "arabic" ? 100 : 0,
+        });
+        source.close();
+      });
+
+      source.addEventListener("error", (e) => {
+        source.close();
+        if (e.data) {
+          const ev = JSON.parse(e.data);
+          alert("Processing failed: " + ev.error);
+          setStep("upload");
+        }
+      });
     } catch (err) {
       console.error(err);
       alert("Processing failed: " + (err.message || err));
@@ -142,20 +199,29 @@ export default function App() {
           {/* Results Step */}
           {step === "results" && (
             <div className="space-y-4">
-              <h1 className="text-2xl font-bold">Completed!</h1>
-              <p className="text-green-600">Your transcript is ready.</p>
+              <h1 className="text-2xl font-bold">{downloadUrl ? "Completed!" : "Processing..."}</h1>
+              {downloadUrl ? (
+                <p className="text-green-600">Your transcript is ready.</p>
+              ) : (
+                <div className="space-y-2">
+                  <Progress value={progress.transcription} />
+                  {language === "arabic" && <Progress value={progress.translation} />}
+                </div>
+              )}
               <textarea
                 value={transcript}
                 readOnly
                 className="w-full h-40 border p-2 rounded-lg"
               />
-              <a
-                href={downloadUrl}
-                download="transcript.docx"
-                className="block w-full text-center bg-blue-600 text-white py-2 rounded-lg font-semibold hover:bg-blue-700 transition"
-              >
-                Download Transcript
-              </a>
+              {downloadUrl && (
+                <a
+                  href={downloadUrl}
+                  download="transcript.docx"
+                  className="block w-full text-center bg-blue-600 text-white py-2 rounded-lg font-semibold hover:bg-blue-700 transition"
+                >
+                  Download Transcript
+                </a>
+              )}
             </div>
           )}
         </CardContent>